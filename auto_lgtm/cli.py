@@ -1,42 +1,121 @@
 from typing import Dict, List, Any
 import argparse
+import os
 import sys
-from common.rich_logger import RichLogger
 from rich.table import Table
-from lgtm import review_pr
+from auto_lgtm.common.rich_logger import RichLogger
+from auto_lgtm.lgtm import review_pr
+from auto_lgtm.services.bulk_review import (
+    DEFAULT_BULK_WORKERS, BulkResult, BulkReviewer, parse_repo_spec, write_report
+)
+from auto_lgtm.services.secret_service import get_secret_provider
+
+
+def run_bulk(args: argparse.Namespace, logger: RichLogger) -> None:
+    """Review every open PR of the `--bulk` repositories and write the report."""
+    repos = [parse_repo_spec(spec, args.owner) for spec in args.bulk]
+    token = get_secret_provider(args.project_id).get_secret(os.getenv("SECRET_ID"), "github_token")
+    reviewer = BulkReviewer(token, review_pr, args.project_id, max_workers=args.workers)
+
+    targets = reviewer.discover(repos)
+    logger.print_info(f"Found {len(targets)} open pull requests in {len(repos)} repositories")
+
+    def on_result(result: BulkResult, done: int, total: int) -> None:
+        line = f"[{done}/{total}] {result.owner}/{result.repo}#{result.pr_number}: {result.status} ({result.seconds:.1f}s)"
+        if result.status == "failed":
+            logger.print_warning(f"{line} {result.error}")
+        else:
+            logger.print_info(line)
+
+    results = reviewer.run(targets, on_result)
+    write_report(results, args.report)
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    logger.print_table("Bulk Review", ["Status", "Pull Requests"],
+                       [[status, str(count)] for status, count in sorted(counts.items())])
+    logger.print_success(f"Report written to {args.report}")
+
+
+def run_local(args: argparse.Namespace, logger: RichLogger) -> None:
+    """Review changes of a local checkout and print or save the comments."""
+    from auto_lgtm.lgtm_local import review_local_checkout, write_comments
+    from auto_lgtm.services.local_git import DiffTarget
+
+    mode = "staged" if args.staged else "worktree" if args.worktree else "base"
+    target = DiffTarget(mode, args.base)
+    logger.print_info(f"Reviewing {target.describe()} in {os.path.abspath(args.local)}")
+    comments = review_local_checkout(target, args.local, llm_base_url=args.llm_base_url,
+                                     llm_model=args.llm_model, project_id=args.project_id)
+    write_comments(comments, args.output)
+    if args.output:
+        logger.print_success(f"{len(comments)} comments written to {args.output}")
+    else:
+        logger.print_success(f"{len(comments)} comments")
 
 
 def main():
     logger = RichLogger()
-    
+
     try:
         logger.print_title("Auto LGTM", "Automated Code Review")
-        
+
         # Parse command line arguments
         parser = argparse.ArgumentParser(description="Auto LGTM - Automated Code Review")
-        parser.add_argument("--repo", type=str, required=True, help="Repository name")
-        parser.add_argument("--pr", type=int, required=True, help="Pull request number")
-        parser.add_argument("--project-id", type=str, required=True, help="Google Cloud project ID")
+        parser.add_argument("--repo", type=str, help="Repository name")
+        parser.add_argument("--pr", type=int, help="Pull request number")
+        parser.add_argument("--owner", type=str, help="Repository owner (user or organization)")
+        parser.add_argument("--project-id", type=str, default=os.getenv("GOOGLE_CLOUD_PROJECT"),
+                            help="Google Cloud project ID")
+        parser.add_argument("--bulk", nargs="+", metavar="OWNER/REPO",
+                            help="Review every open PR of these repositories")
+        parser.add_argument("--workers", type=int, default=DEFAULT_BULK_WORKERS,
+                            help="Concurrent reviews in bulk mode")
+        parser.add_argument("--report", type=str, default="bulk_review_report.json",
+                            help="Bulk report path; .csv for CSV, anything else for JSON")
+        local = parser.add_argument_group("offline review of a local git checkout")
+        local.add_argument("--local", nargs="?", const=".", metavar="PATH",
+                           help="Review a local checkout (default: the current directory) without GitHub")
+        local.add_argument("--base", metavar="REF", help="Review the commits since HEAD forked from REF")
+        local.add_argument("--staged", action="store_true", help="Review the staged changes")
+        local.add_argument("--worktree", action="store_true", help="Review every uncommitted change")
+        local.add_argument("--output", metavar="FILE",
+                           help="Write the comments to FILE (.json for JSON, anything else for text) instead of stdout")
+        local.add_argument("--llm-base-url", metavar="URL",
+                           help="OpenAI-compatible endpoint to use instead of Gemini, e.g. a local model server")
+        local.add_argument("--llm-model", metavar="NAME", help="Model name to request from the LLM endpoint")
         args = parser.parse_args()
 
+        if args.local:
+            if sum(bool(choice) for choice in (args.base, args.staged, args.worktree)) != 1:
+                parser.error("--local needs exactly one of --base REF, --staged or --worktree")
+            run_local(args, logger)
+            return
+        if args.bulk:
+            run_bulk(args, logger)
+            return
+        if not (args.repo and args.pr and args.owner):
+            parser.error("--repo, --pr and --owner are required unless --bulk is given")
+
         repo: str = args.repo
         pr_number: int = args.pr
         project_id: str = args.project_id
-        
+
         # Display PR details
         pr_table = Table(title="Pull Request Details")
         pr_table.add_column("Property", style="cyan")
         pr_table.add_column("Value", style="green")
-        pr_table.add_row("Repository", repo)
+        pr_table.add_row("Repository", f"{args.owner}/{repo}")
         pr_table.add_row("PR Number", str(pr_number))
-        pr_table.add_row("Project ID", project_id)
+        pr_table.add_row("Project ID", str(project_id))
         logger.console.print(pr_table)
 
-        review_pr(repo, pr_number, project_id)
-        
+        review_pr(repo, pr_number, args.owner, project_id)
+
     except Exception as e:
         logger.print_error(f"Error: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
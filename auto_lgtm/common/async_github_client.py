@@ -0,0 +1,226 @@
+import asyncio
+import json
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from auto_lgtm.common.conditional_cache import CachedResponse, ConditionalCache, get_default_cache
+from auto_lgtm.common.event_loop import aiter_items
+from auto_lgtm.common.github_client import GITHUB_API_URL, RATE_LIMIT_RETRIES
+from auto_lgtm.common.http_transport import IDEMPOTENT_METHODS, RETRY_STATUS_CODES, TransportSettings, backoff_delay
+from auto_lgtm.common.metrics import GITHUB_REQUESTS, status_class
+from auto_lgtm.common.rate_limiter import GitHubRateLimiter, Priority, get_rate_limiter
+
+
+class AsyncHttpTransport:
+    """
+    asyncio counterpart of `HttpTransport`: one keep-alive `httpx.AsyncClient`
+    with the same timeouts and retry policy (idempotent requests on connection
+    errors, timeouts and 5xx; others only when no connection was made).
+    """
+
+    def __init__(self, settings: Optional[TransportSettings] = None):
+        self.settings = settings or TransportSettings()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.settings.read_timeout, connect=self.settings.connect_timeout),
+            limits=httpx.Limits(max_connections=self.settings.pool_maxsize,
+                                max_keepalive_connections=self.settings.pool_maxsize),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        return backoff_delay(self.settings, attempt)
+
+    async def send(self, method: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """
+        Send a request with retries. With `stream=True` the body is not read;
+        the caller must read or close the response.
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                request = self.client.build_request(method, url, **kwargs)
+                response = await self.client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # Nothing reached the server, so even a POST is safe to resend
+                if attempt >= self.settings.max_retries:
+                    raise
+                logger.warning(f"{method} {url} failed ({e.__class__.__name__}), retrying")
+            except httpx.TransportError as e:
+                if not idempotent or attempt >= self.settings.max_retries:
+                    raise
+                logger.warning(f"{method} {url} failed ({e.__class__.__name__}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or not idempotent \
+                        or attempt >= self.settings.max_retries:
+                    return response
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying")
+                await response.aclose()
+            delay = self.backoff(attempt)
+            attempt += 1
+            logger.debug(f"Retry {attempt}/{self.settings.max_retries} for {method} {url} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncHttpTransport]" = weakref.WeakKeyDictionary()
+
+
+def get_async_transport() -> AsyncHttpTransport:
+    """
+    Return the transport shared by every async GitHub client on the running
+    event loop; httpx connections cannot be shared across loops.
+    """
+    loop = asyncio.get_running_loop()
+    transport = _transports.get(loop)
+    if transport is None:
+        transport = _transports[loop] = AsyncHttpTransport(TransportSettings.from_env())
+    return transport
+
+
+class AsyncGitHubApiClient:
+    """
+    asyncio counterpart of `GitHubApiClient`.
+
+    It shares the process-wide rate limiter and conditional cache with the
+    sync client. Headers are passed per call rather than through
+    `with_headers`, so concurrent requests on one client cannot see each
+    other's Accept header. HTTP errors raise `httpx.HTTPStatusError`.
+    """
+
+    def __init__(self, token: str, owner: str, transport: Optional[AsyncHttpTransport] = None,
+                 base_url: str = GITHUB_API_URL, rate_limiter: Optional[GitHubRateLimiter] = None,
+                 cache: Optional[ConditionalCache] = None):
+        self.base_url = base_url.rstrip("/")
+        self.owner = owner
+        self.transport: AsyncHttpTransport = transport or get_async_transport()
+        self.rate_limiter: GitHubRateLimiter = rate_limiter or get_rate_limiter()
+        self.cache: ConditionalCache = cache if cache is not None else get_default_cache()
+        self.headers: Dict[str, str] = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github.v3+json",
+            "X-GitHub-Api-Version": "2022-11-28"
+        }
+
+    def _headers(self, accept: Optional[str], extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = dict(self.headers)
+        if accept:
+            headers["Accept"] = accept
+        if extra:
+            headers.update(extra)
+        return headers
+
+    async def _send(self, method: str, url: str, priority: Priority, headers: Dict[str, str],
+                    stream: bool = False, **kwargs) -> httpx.Response:
+        """Send a request once the rate limiter allows it, re-sending after rate-limit pauses."""
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.rate_limiter.acquire_async(priority)
+            try:
+                response = await self.transport.send(method, url, stream=stream, headers=headers, **kwargs)
+            except Exception:
+                GITHUB_REQUESTS.inc(method=method, status=status_class(None))
+                raise
+            GITHUB_REQUESTS.inc(method=method, status=status_class(response.status_code))
+            if stream and response.status_code in (403, 429):
+                # The limiter inspects the body of throttling responses
+                await response.aread()
+            if not self.rate_limiter.record(response) or attempt == RATE_LIMIT_RETRIES:
+                return response
+            if stream:
+                await response.aclose()
+            logger.info(f"Retrying {method} {url} after rate-limit pause")
+
+    async def _cache_call(self, method, *args):
+        """Call the conditional cache, in a thread when it is backed by disk (GITHUB_CACHE_DIR)."""
+        if self.cache.disk_path:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get(self, endpoint: str, return_text: bool = False, params: Optional[Dict[str, Any]] = None,
+                  priority: Priority = Priority.READ, accept: Optional[str] = None):
+        url = f"{self.base_url}{endpoint}"
+        headers = self._headers(accept)
+        cache_key = self.cache.make_key(url, params, headers)
+        cached = await self._cache_call(self.cache.get, cache_key)
+        response = await self._send("GET", url, priority,
+                                    self._headers(accept, cached.conditional_headers() if cached else None),
+                                    params=params)
+        logger.info(f"GET {url} status: {response.status_code}")
+        if response.status_code == 304 and cached is not None:
+            body = cached.body
+        else:
+            if response.status_code == 404:
+                logger.debug(f"Not found: {url}")
+            elif response.status_code != 200:
+                logger.error(f"Error response: {response.text}")
+            response.raise_for_status()
+            body = response.text
+            await self._cache_call(self.cache.put, cache_key, CachedResponse(
+                body=body,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            ))
+        if return_text:
+            return body
+        return json.loads(body)
+
+    async def stream_text(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                          priority: Priority = Priority.READ, accept: Optional[str] = None,
+                          conditional: bool = True) -> AsyncIterator[str]:
+        """
+        Send a GET and return an async iterator over the decoded body. The
+        request is sent (and errors raised) before the iterator is returned.
+        `conditional` works as in `GitHubApiClient.stream_text`.
+        """
+        url = f"{self.base_url}{endpoint}"
+        headers = self._headers(accept)
+        cache_key = self.cache.make_key(url, params, headers) if conditional else None
+        cached = await self._cache_call(self.cache.get, cache_key) if cache_key else None
+        response = await self._send("GET", url, priority,
+                                    self._headers(accept, cached.conditional_headers() if cached else None),
+                                    stream=True, params=params)
+        logger.info(f"GET {url} status: {response.status_code}")
+        if response.status_code == 304 and cached is not None:
+            await response.aclose()
+            return aiter_items([cached.body])
+        if response.status_code != 200:
+            await response.aread()
+            await response.aclose()
+            if response.status_code != 404:
+                logger.error(f"Error response: {response.text}")
+            response.raise_for_status()
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+        async def chunks():
+            # Cached like `ConditionalCache.tee` does for sync streams
+            parts: Optional[List[str]] = [] if cache_key and (etag or last_modified) else None
+            size = 0
+            try:
+                async for chunk in response.aiter_text():
+                    if parts is not None:
+                        size += len(chunk)
+                        if size > self.cache.max_entry_bytes:
+                            parts = None
+                        else:
+                            parts.append(chunk)
+                    yield chunk
+            finally:
+                await response.aclose()
+            if parts is not None:
+                await self._cache_call(self.cache.put, cache_key, CachedResponse("".join(parts), etag, last_modified))
+        return chunks()
+
+    async def post(self, endpoint: str, data=None, priority: Priority = Priority.WRITE,
+                   accept: Optional[str] = None):
+        url = f"{self.base_url}{endpoint}"
+        response = await self._send("POST", url, priority, self._headers(accept), json=data)
+        logger.info(f"POST {url} status: {response.status_code}")
+        if response.status_code != 200:
+            logger.error(f"Error response: {response.text}")
+        response.raise_for_status()
+        return response.json()
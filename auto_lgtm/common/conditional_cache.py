@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlencode
+
+from loguru import logger
+
+DEFAULT_MAX_ENTRIES = 256
+# Bodies larger than this are not cached; huge diffs are cheaper to refetch than to hold
+DEFAULT_MAX_ENTRY_BYTES = 5 * 1024 * 1024
+
+
+@dataclass
+class CachedResponse:
+    body: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators to send so GitHub can answer 304 Not Modified."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ConditionalCache:
+    """
+    ETag/Last-Modified cache for GitHub GET responses.
+
+    Entries are keyed by URL, query params, Accept header and a hash of the
+    credentials, kept in a bounded in-memory LRU and optionally mirrored to a
+    directory so validators survive restarts. The directory is bounded like
+    the LRU: an evicted entry's file is deleted, and on startup only the
+    `max_entries` most recently written files are kept. A 304 answer is
+    served from the cached body and does not count against GitHub's rate
+    limit.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, disk_path: Optional[str] = None,
+                 max_entry_bytes: int = DEFAULT_MAX_ENTRY_BYTES):
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.disk_path = disk_path
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._prune_disk()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]) -> str:
+        query = urlencode(sorted((params or {}).items()))
+        credentials = hashlib.sha256(headers.get("Authorization", "").encode()).hexdigest()[:16]
+        return f"{url}?{query}|{headers.get('Accept', '')}|{credentials}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        if not (entry.etag or entry.last_modified) or len(entry.body) > self.max_entry_bytes:
+            return
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def tee(self, key: str, chunks: Iterator[str], etag: Optional[str],
+            last_modified: Optional[str]) -> Iterator[str]:
+        """
+        Yield a streamed body and cache it once it was read to the end. A
+        body that outgrows `max_entry_bytes` or is abandoned midway is not kept.
+        """
+        if not (etag or last_modified):
+            yield from chunks
+            return
+        parts: Optional[List[str]] = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_entry_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None:
+            self.put(key, CachedResponse("".join(parts), etag, last_modified))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        if self.disk_path:
+            for evicted_key in evicted:
+                self._remove_file(self._disk_file(evicted_key))
+
+    def _disk_file(self, key: str) -> str:
+        return os.path.join(self.disk_path, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _read_disk(self, key: str) -> Optional[CachedResponse]:
+        if not self.disk_path:
+            return None
+        try:
+            with open(self._disk_file(key), "r", encoding="utf-8") as f:
+                return CachedResponse(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {key}: {e}")
+            return None
+
+    def _prune_disk(self) -> None:
+        """Keep the `max_entries` newest files of a previous run; drop the rest and leftover temp files."""
+        files = []
+        for name in os.listdir(self.disk_path):
+            path = os.path.join(self.disk_path, name)
+            if name.endswith(".json"):
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+            elif name.endswith(".tmp"):
+                self._remove_file(path)
+        files.sort(reverse=True)
+        for _, path in files[self.max_entries:]:
+            self._remove_file(path)
+        if len(files) > self.max_entries:
+            logger.info(f"Pruned {len(files) - self.max_entries} old entries from the GitHub cache directory")
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove cache file {path}: {e}")
+
+    def _write_disk(self, key: str, entry: CachedResponse) -> None:
+        if not self.disk_path:
+            return
+        path = self._disk_file(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist cache entry for {key}: {e}")
+
+
+_default_cache: Optional[ConditionalCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ConditionalCache:
+    """Process-wide cache; set GITHUB_CACHE_DIR to also keep validators on disk."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ConditionalCache(
+                    max_entries=int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    disk_path=os.getenv("GITHUB_CACHE_DIR") or None,
+                )
+    return _default_cache
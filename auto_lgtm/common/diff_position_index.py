@@ -0,0 +1,91 @@
+from typing import Any, Dict, Iterable, Literal, Optional, Tuple
+
+Side = Literal["LEFT", "RIGHT"]
+
+
+class DiffPositionIndex:
+    """
+    Lookup table from (path, line, side) to the diff position GitHub expects
+    for review comments.
+
+    The index is built once per PR from the patches returned by the
+    `/pulls/{n}/files` endpoint so mapping comments never touches the network.
+    Positions follow GitHub's definition: the line just below the first "@@"
+    header is position 1 and the count keeps increasing through every
+    following line, including the headers of later hunks.
+
+    `blob_shas` keeps the head blob SHA of every file that still exists, as
+    listed by the same endpoint, for fetching file contents by SHA.
+    """
+
+    def __init__(self):
+        self._positions: Dict[Tuple[str, int, str], int] = {}
+        self._files: set[str] = set()
+        self.blob_shas: Dict[str, str] = {}
+
+    @classmethod
+    def from_files(cls, files: Iterable[Dict[str, Any]]) -> "DiffPositionIndex":
+        """
+        Build an index from the JSON entries of the `/pulls/{n}/files` listing.
+
+        Args:
+            files: File entries, each with a `filename` and optional `patch`, `sha` and `status`
+
+        Returns:
+            A populated DiffPositionIndex
+        """
+        index = cls()
+        for f in files:
+            if f.get("sha") and f.get("status") != "removed":
+                index.blob_shas[f["filename"]] = f["sha"]
+            patch = f.get("patch")
+            if patch:
+                index.add_patch(f["filename"], patch)
+        return index
+
+    def add_patch(self, path: str, patch: str) -> None:
+        """Index every commentable line of a single file patch."""
+        self._files.add(path)
+        position = 0
+        old_line = 0
+        new_line = 0
+        seen_first_hunk = False
+        for line in patch.splitlines():
+            if line.startswith("@@"):
+                if seen_first_hunk:
+                    position += 1
+                seen_first_hunk = True
+                parts = line.split(" ")
+                old_line = int(parts[1].split(",")[0][1:])
+                new_line = int(parts[2].split(",")[0][1:])
+                continue
+            if not seen_first_hunk:
+                continue
+            position += 1
+            if line.startswith("+"):
+                self._positions[(path, new_line, "RIGHT")] = position
+                new_line += 1
+            elif line.startswith("-"):
+                self._positions[(path, old_line, "LEFT")] = position
+                old_line += 1
+            elif line.startswith("\\"):
+                # "\ No newline at end of file" occupies a position but no line
+                continue
+            else:
+                self._positions[(path, new_line, "RIGHT")] = position
+                self._positions.setdefault((path, old_line, "LEFT"), position)
+                old_line += 1
+                new_line += 1
+
+    def position_for(self, path: str, line_number: int, side: Side = "RIGHT") -> Optional[int]:
+        """
+        Return the diff position of `line_number` in `path`, or None if the
+        line is not part of the diff.
+        """
+        return self._positions.get((path, line_number, side))
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._files
+
+    def __len__(self) -> int:
+        return len(self._positions)
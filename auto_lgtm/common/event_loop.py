@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Iterable, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running forever in a daemon thread.
+
+    Sync callers (the review coordinator's threads, the CLI, bulk reviews)
+    submit coroutines with `run`, so every review in the process shares one
+    loop and with it the per-loop HTTP connection pools.
+    """
+
+    def __init__(self, name: str = "auto-lgtm-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Run `awaitable` on the loop and block the calling thread until it finishes.
+
+        Raises:
+            RuntimeError: If called from the loop's own thread, which would deadlock
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from its own event loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(awaitable, self.loop).result(timeout)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+_default_loop: Optional[BackgroundLoop] = None
+_default_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Return the process-wide background event loop, starting it on first use."""
+    global _default_loop
+    if _default_loop is None:
+        with _default_loop_lock:
+            if _default_loop is None:
+                _default_loop = BackgroundLoop()
+    return _default_loop
+
+
+class Prefetch:
+    """
+    Consume an async iterable in a background task, up to `size` items ahead
+    of the reader, so its I/O starts right away and overlaps with other work.
+    Iterate it like the source; `aclose` cancels the background task.
+    """
+
+    def __init__(self, source: AsyncIterable[T], size: int = 8):
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=size)
+        self._task = asyncio.create_task(self._fill(source))
+
+    async def _fill(self, source: AsyncIterable[T]) -> None:
+        try:
+            async for item in source:
+                await self._queue.put(item)
+        except Exception as e:
+            await self._queue.put(e)
+        else:
+            await self._queue.put(_DONE)
+
+    def __aiter__(self) -> "Prefetch":
+        return self
+
+    async def __anext__(self) -> T:
+        item = await self._queue.get()
+        if item is _DONE:
+            await self._queue.put(_DONE)
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def aclose(self) -> None:
+        self._task.cancel()
+
+
+async def aiter_items(items: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    """Iterate a plain or async iterable asynchronously."""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
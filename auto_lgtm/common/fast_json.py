@@ -0,0 +1,22 @@
+import json
+import os
+from typing import Any, Callable, Tuple, Union
+
+JsonLoads = Callable[[Union[bytes, str]], Any]
+
+
+def _select_backend() -> Tuple[str, JsonLoads]:
+    """
+    Pick the JSON decoder: orjson when it is installed (the `fast-json`
+    extra) unless JSON_BACKEND=stdlib, otherwise the standard library.
+    """
+    if os.getenv("JSON_BACKEND", "auto").lower() != "stdlib":
+        try:
+            import orjson
+            return "orjson", orjson.loads
+        except ImportError:
+            pass
+    return "json", json.loads
+
+
+BACKEND, loads = _select_backend()
@@ -1,12 +1,26 @@
-import requests
+import json
+import os
 from loguru import logger
 from contextlib import contextmanager
-from typing import Dict, Optional
+from typing import Any, Dict, Iterator, Optional
+from auto_lgtm.common.http_transport import HttpTransport, get_default_transport
+from auto_lgtm.common.metrics import GITHUB_REQUESTS, status_class
+from auto_lgtm.common.rate_limiter import GitHubRateLimiter, Priority, get_rate_limiter
+from auto_lgtm.common.conditional_cache import CachedResponse, ConditionalCache, get_default_cache
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# How often a call rejected by a rate limit is re-sent after the limiter's pause
+RATE_LIMIT_RETRIES = 2
 
 class GitHubApiClient:
-    def __init__(self, token: str, owner: str):
-        self.base_url = "https://api.github.com"
+    def __init__(self, token: str, owner: str, transport: Optional[HttpTransport] = None,
+                 base_url: str = GITHUB_API_URL, rate_limiter: Optional[GitHubRateLimiter] = None,
+                 cache: Optional[ConditionalCache] = None):
+        self.base_url = base_url.rstrip("/")
         self.owner = owner
+        self.transport: HttpTransport = transport or get_default_transport()
+        self.rate_limiter: GitHubRateLimiter = rate_limiter or get_rate_limiter()
+        self.cache: ConditionalCache = cache if cache is not None else get_default_cache()
         self.headers: dict[str, str] = {
             "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github.v3+json",
@@ -29,21 +43,89 @@ class GitHubApiClient:
             self.headers = original_headers
             logger.debug("Restored original headers")
 
-    def get(self, endpoint: str, return_text: bool = False):
+    def _send(self, method: str, url: str, priority: Priority, extra_headers: Optional[Dict[str, str]] = None,
+              **kwargs):
+        """Send a request once the rate limiter allows it, re-sending after rate-limit pauses."""
+        headers = {**self.headers, **extra_headers} if extra_headers else self.headers
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.rate_limiter.acquire(priority)
+            try:
+                response = self.transport.request(method, url, headers=headers, **kwargs)
+            except Exception:
+                GITHUB_REQUESTS.inc(method=method, status=status_class(None))
+                raise
+            GITHUB_REQUESTS.inc(method=method, status=status_class(response.status_code))
+            if not self.rate_limiter.record(response) or attempt == RATE_LIMIT_RETRIES:
+                return response
+            logger.info(f"Retrying {method} {url} after rate-limit pause")
+
+    def get(self, endpoint: str, return_text: bool = False, params: Optional[Dict[str, Any]] = None,
+            priority: Priority = Priority.READ):
         url = f"{self.base_url}{endpoint}"
         logger.debug(f"Making GET request to: {url}")
-        response = requests.get(url, headers=self.headers)
+        cache_key = self.cache.make_key(url, params, self.headers)
+        cached = self.cache.get(cache_key)
+        response = self._send("GET", url, priority, params=params,
+                              extra_headers=cached.conditional_headers() if cached else None)
         logger.info(f"GET {url} status: {response.status_code}")
+        if response.status_code == 304 and cached is not None:
+            body = cached.body
+        else:
+            if response.status_code == 404:
+                # Often expected (optional files, missing PRs); callers decide whether it is an error
+                logger.debug(f"Not found: {url}")
+            elif response.status_code != 200:
+                logger.error(f"Error response: {response.text}")
+            response.raise_for_status()
+            body = response.text
+            self.cache.put(cache_key, CachedResponse(
+                body=body,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            ))
+        if return_text:
+            return body
+        return json.loads(body)
+
+    def stream_text(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                    priority: Priority = Priority.READ, chunk_size: int = 64 * 1024,
+                    conditional: bool = True) -> Iterator[str]:
+        """
+        Send a GET and return an iterator over the decoded response body in
+        chunks, without loading it into memory. The request is sent (and
+        errors raised) before the iterator is returned.
+
+        With `conditional`, the request carries the validators of a cached
+        copy and a 304 replays it; a body read to the end is cached if it
+        fits the conditional cache's entry limit.
+        """
+        url = f"{self.base_url}{endpoint}"
+        logger.debug(f"Making streaming GET request to: {url}")
+        cache_key = self.cache.make_key(url, params, self.headers) if conditional else None
+        cached = self.cache.get(cache_key) if cache_key else None
+        response = self._send("GET", url, priority, params=params, stream=True,
+                              extra_headers=cached.conditional_headers() if cached else None)
+        logger.info(f"GET {url} status: {response.status_code}")
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            return iter([cached.body])
         if response.status_code != 200:
             logger.error(f"Error response: {response.text}")
         response.raise_for_status()
-        if return_text:
-            return response.text
-        return response.json()
+        if response.encoding is None:
+            response.encoding = "utf-8"
+
+        def chunks():
+            with response:
+                yield from response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+        if cache_key is None:
+            return chunks()
+        return self.cache.tee(cache_key, chunks(), response.headers.get("ETag"),
+                              response.headers.get("Last-Modified"))
 
-    def post(self, endpoint: str, data=None):
+    def post(self, endpoint: str, data=None, priority: Priority = Priority.WRITE):
         url = f"{self.base_url}{endpoint}"
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self._send("POST", url, priority, json=data)
         logger.info(f"POST {url} status: {response.status_code}")
         if response.status_code != 200:
             logger.error(f"Error response: {response.text}")
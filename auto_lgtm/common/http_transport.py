@@ -0,0 +1,129 @@
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+RETRY_STATUS_CODES = frozenset({500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+@dataclass
+class TransportSettings:
+    connect_timeout: float = 3.05
+    read_timeout: float = 30.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 20.0
+    pool_connections: int = 10
+    pool_maxsize: int = 32
+
+    @classmethod
+    def from_env(cls) -> "TransportSettings":
+        """Read overrides from GITHUB_HTTP_* environment variables."""
+        defaults = cls()
+        return cls(
+            connect_timeout=float(os.getenv("GITHUB_HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            read_timeout=float(os.getenv("GITHUB_HTTP_READ_TIMEOUT", defaults.read_timeout)),
+            max_retries=int(os.getenv("GITHUB_HTTP_MAX_RETRIES", defaults.max_retries)),
+            pool_maxsize=int(os.getenv("GITHUB_HTTP_POOL_SIZE", defaults.pool_maxsize)),
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class HttpTransport:
+    """
+    Shared HTTP transport with keep-alive connection pooling, connect/read
+    timeouts and jittered exponential retries.
+
+    Idempotent requests are retried on connection errors, timeouts and 5xx
+    responses. Other methods (POST, PATCH) are only retried when the
+    connection could not be established, so a review is never posted twice.
+    """
+
+    def __init__(self, settings: Optional[TransportSettings] = None):
+        self.settings = settings or TransportSettings()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.settings.pool_connections,
+            pool_maxsize=self.settings.pool_maxsize,
+            max_retries=0,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for the given retry attempt."""
+        return backoff_delay(self.settings, attempt)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        method = method.upper()
+        kwargs.setdefault("timeout", self.settings.timeout)
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # ConnectTimeout is a ConnectionError; a ReadTimeout is not
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout) or _is_connect_failure(e)
+                if not retryable or attempt >= self.settings.max_retries:
+                    raise
+                logger.warning(f"{method} {url} failed ({e.__class__.__name__}), retrying")
+            except requests.exceptions.Timeout:
+                if not idempotent or attempt >= self.settings.max_retries:
+                    raise
+                logger.warning(f"{method} {url} timed out, retrying")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or not idempotent \
+                        or attempt >= self.settings.max_retries:
+                    return response
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying")
+                response.close()
+            delay = self.backoff(attempt)
+            attempt += 1
+            logger.debug(f"Retry {attempt}/{self.settings.max_retries} for {method} {url} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def backoff_delay(settings: TransportSettings, attempt: int) -> float:
+    """Full-jitter exponential backoff delay for the given retry attempt."""
+    cap = min(settings.backoff_max, settings.backoff_base * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def _is_connect_failure(error: requests.exceptions.ConnectionError) -> bool:
+    """True when the request never reached the server (refused or unresolvable host)."""
+    reason = repr(error.args[0]) if error.args else ""
+    return "NewConnectionError" in reason or "NameResolutionError" in reason
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    """Return the process-wide transport shared by every GitHub client."""
+    global _default_transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport(TransportSettings.from_env())
+    return _default_transport
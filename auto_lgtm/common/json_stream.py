@@ -0,0 +1,76 @@
+import json
+from typing import Any, Dict, List
+
+from loguru import logger
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser that yields the objects of a JSON array as soon as each
+    one closes, while the rest of the document is still being generated.
+
+    Text before the first `[` outside a string is skipped, so both a bare
+    array and an object wrapping one (`{"comments": [...]}`) work. Objects that
+    fail to decode are logged and dropped without affecting the ones after.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._in_string = False
+        self._escaped = False
+        self._depth = 0
+        self._object: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the array has been seen."""
+        return self._finished
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume the next piece of the document; return the objects it completed."""
+        completed = []
+        capturing = bool(self._object)
+        start = 0
+        for i, char in enumerate(text):
+            if self._finished:
+                break
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif not self._started:
+                if char == "[":
+                    self._started = True
+                    self._depth = 1
+            elif char in "{[":
+                if self._depth == 1 and char == "{":
+                    capturing = True
+                    start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1 and capturing:
+                    self._object.append(text[start:i + 1])
+                    completed.extend(self._decode("".join(self._object)))
+                    self._object = []
+                    capturing = False
+                elif self._depth == 0:
+                    self._finished = True
+        if capturing:
+            self._object.append(text[start:])
+        return completed
+
+    @staticmethod
+    def _decode(raw: str) -> List[Dict[str, Any]]:
+        try:
+            return [json.loads(raw)]
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping malformed object in streamed JSON: {e}")
+            return []
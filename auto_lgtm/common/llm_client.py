@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+
+
+@dataclass
+class LLMClientSettings:
+    base_url: str = LLM_BASE_URL
+    connect_timeout: float = 5.0
+    # Longest wait for the next byte; streamed reviews send tokens continuously
+    read_timeout: float = 120.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0
+    max_retries: int = 2
+    pool_maxsize: int = 32
+    max_keepalive: int = 16
+
+    @classmethod
+    def from_env(cls) -> "LLMClientSettings":
+        """Read overrides from LLM_HTTP_* environment variables."""
+        defaults = cls()
+        return cls(
+            connect_timeout=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            read_timeout=float(os.getenv("LLM_HTTP_READ_TIMEOUT", defaults.read_timeout)),
+            max_retries=int(os.getenv("LLM_HTTP_MAX_RETRIES", defaults.max_retries)),
+            pool_maxsize=int(os.getenv("LLM_HTTP_POOL_SIZE", defaults.pool_maxsize)),
+        )
+
+    def timeout(self):
+        import httpx
+
+        return httpx.Timeout(connect=self.connect_timeout, read=self.read_timeout,
+                             write=self.write_timeout, pool=self.pool_timeout)
+
+    def limits(self):
+        import httpx
+
+        return httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.max_keepalive)
+
+
+class LLMClientPool:
+    """
+    Long-lived OpenAI-compatible clients sharing one keep-alive connection pool.
+
+    The sync `OpenAI` client is thread-safe, so every review thread in the
+    process shares the same instance per API key. `AsyncOpenAI` clients hold
+    connections bound to an event loop, so one is kept per running loop and
+    dropped with it. Clients are built on first use; openai and httpx are only
+    imported then.
+    """
+
+    def __init__(self, settings: Optional[LLMClientSettings] = None):
+        self.settings = settings or LLMClientSettings()
+        self._lock = threading.Lock()
+        self._http_client = None
+        # Keyed by API key so a rotated key (see SecretProvider) gets a fresh client on the same pool
+        self._clients: Dict[str, Any] = {}
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = \
+            weakref.WeakKeyDictionary()
+
+    def client(self, api_key: str):
+        """Return the shared sync client for `api_key`."""
+        client = self._clients.get(api_key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                import httpx
+                from openai import OpenAI
+
+                if self._http_client is None:
+                    self._http_client = httpx.Client(timeout=self.settings.timeout(), limits=self.settings.limits())
+                client = OpenAI(base_url=self.settings.base_url, api_key=api_key, http_client=self._http_client,
+                                timeout=self.settings.timeout(), max_retries=self.settings.max_retries)
+                self._clients[api_key] = client
+                logger.debug(f"Created pooled LLM client for {self.settings.base_url}")
+        return client
+
+    def async_client(self, api_key: str):
+        """
+        Return the async client for `api_key` on the running event loop.
+
+        Raises:
+            RuntimeError: If called outside a running event loop
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(api_key)
+            if client is None:
+                import httpx
+                from openai import AsyncOpenAI
+
+                http_client = httpx.AsyncClient(timeout=self.settings.timeout(), limits=self.settings.limits())
+                client = AsyncOpenAI(base_url=self.settings.base_url, api_key=api_key, http_client=http_client,
+                                     timeout=self.settings.timeout(), max_retries=self.settings.max_retries)
+                clients[api_key] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the async clients of the running event loop."""
+        with self._lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.close()
+
+    def close(self) -> None:
+        """Close the sync connection pool."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._clients.clear()
+
+
+_default_pool: Optional[LLMClientPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_llm_pool() -> LLMClientPool:
+    """Return the process-wide LLM client pool shared by every review."""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = LLMClientPool(LLMClientSettings.from_env())
+    return _default_pool
@@ -0,0 +1,262 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Seconds; spans webhook-fast GitHub calls up to multi-minute LLM reviews
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (+Inf last), sum, count
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(series[1][1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, (total, count)) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {int(count)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "auto_lgtm_stage_seconds", "Time spent in each stage of a review", ("stage", "repo"))
+REVIEWS = REGISTRY.counter(
+    "auto_lgtm_reviews_total", "Reviews by outcome", ("repo", "outcome"))
+REVIEW_SECONDS = REGISTRY.histogram(
+    "auto_lgtm_review_seconds", "End-to-end review time", ("repo", "outcome"))
+GITHUB_REQUESTS = REGISTRY.counter(
+    "auto_lgtm_github_requests_total", "GitHub API requests by method and status", ("method", "status"))
+LLM_REQUESTS = REGISTRY.counter(
+    "auto_lgtm_llm_requests_total", "LLM completions by mode and outcome", ("mode", "outcome"))
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "auto_lgtm_llm_request_seconds", "Duration of one LLM completion", ("mode",))
+LLM_TOKENS = REGISTRY.counter(
+    "auto_lgtm_llm_tokens_total", "Estimated LLM tokens sent and received", ("direction",))
+REVIEW_CACHE_LOOKUPS = REGISTRY.counter(
+    "auto_lgtm_review_cache_lookups_total", "LLM review cache lookups per hunk", ("result",))
+# Read from the durable job queue at scrape time, so they cover every worker process
+JOB_QUEUE_JOBS = REGISTRY.gauge(
+    "auto_lgtm_job_queue_jobs", "Review jobs in the durable queue by status", ("status",))
+JOB_QUEUE_OLDEST_SECONDS = REGISTRY.gauge(
+    "auto_lgtm_job_queue_oldest_seconds", "Age of the oldest review job waiting to be claimed")
+JOB_LATENCY_SECONDS = REGISTRY.gauge(
+    "auto_lgtm_job_latency_seconds", "Review job latency over the recent window", ("phase", "quantile"))
+JOB_THROUGHPUT = REGISTRY.gauge(
+    "auto_lgtm_job_throughput_per_minute", "Review jobs finished per minute over the recent window")
+BLOB_CACHE_LOOKUPS = REGISTRY.counter(
+    "auto_lgtm_blob_cache_lookups_total", "File content cache lookups by blob SHA", ("result",))
+DROPPED_COMMENTS = REGISTRY.counter(
+    "auto_lgtm_dropped_comments_total", "LLM comments that were not posted", ("reason",))
+
+
+@contextmanager
+def stage(name: str, repo: str) -> Iterator[None]:
+    """Time one stage of a review into `auto_lgtm_stage_seconds`."""
+    with STAGE_SECONDS.time(stage=name, repo=repo):
+        yield
+
+
+def timed_iter(iterable: Iterable[T], name: str, repo: str) -> Iterator[T]:
+    """
+    Yield from `iterable`, recording only the time spent producing items (not
+    the time the consumer holds each one) as one `stage` observation once it
+    is exhausted. Used for lazy stages such as streaming diff parsing.
+    """
+    elapsed = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        STAGE_SECONDS.observe(elapsed, stage=name, repo=repo)
+
+
+async def atimed_iter(iterable: AsyncIterable[T], name: str, repo: str) -> AsyncIterator[T]:
+    """`timed_iter` for async iterables, such as a diff parsed in a background task."""
+    elapsed = 0.0
+    iterator = iterable.__aiter__()
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        STAGE_SECONDS.observe(elapsed, stage=name, repo=repo)
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """Collapse an HTTP status into a low-cardinality label (`2xx`, `304`, `4xx`...)."""
+    if status_code is None:
+        return "error"
+    if status_code in (304, 403, 404, 429):
+        return str(status_code)
+    return f"{status_code // 100}xx"
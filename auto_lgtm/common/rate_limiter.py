@@ -0,0 +1,246 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import List, Optional, Tuple
+
+import requests
+from loguru import logger
+
+# Budget GitHub grants a token per hour before the first response tells us otherwise
+DEFAULT_HOURLY_LIMIT = 5000
+# Requests that may run back-to-back before pacing kicks in
+DEFAULT_BURST = 20
+# Remaining calls kept for writes; reads wait for the reset below this level
+DEFAULT_WRITE_RESERVE = 50
+# GitHub asks clients to wait at least a minute after a secondary limit without Retry-After
+SECONDARY_LIMIT_BACKOFF = 60.0
+# Upper bound on a single condition wait so sleepers re-check state regularly
+MAX_WAIT_SLICE = 1.0
+# Coroutines are not woken by the condition, so they re-check more often
+ASYNC_WAIT_SLICE = 0.1
+
+
+class Priority(IntEnum):
+    """Scheduling priority of a GitHub call; lower values are served first."""
+    WRITE = 0
+    READ = 1
+    OPTIONAL = 2
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not be scheduled within its timeout"""
+    pass
+
+
+@dataclass
+class RateLimitBudget:
+    limit: int
+    remaining: Optional[int]
+    reset_at: Optional[float]
+    tokens: float
+    paused_for: float
+    waiting: int
+
+
+class GitHubRateLimiter:
+    """
+    Process-wide token bucket that paces GitHub calls from every in-flight
+    review.
+
+    The refill rate follows the `X-RateLimit-Remaining`/`X-RateLimit-Reset`
+    headers so the remaining budget is spread evenly until the window resets,
+    `Retry-After` and secondary-limit responses pause every caller, and waiters
+    are served in priority order so writes such as `post_review` go ahead of
+    reads. Once the budget drops to the write reserve only writes proceed.
+    """
+
+    def __init__(self, hourly_limit: int = DEFAULT_HOURLY_LIMIT, burst: int = DEFAULT_BURST,
+                 write_reserve: int = DEFAULT_WRITE_RESERVE):
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self.burst = burst
+        self.write_reserve = write_reserve
+        self._limit = hourly_limit
+        self._remaining: Optional[int] = None
+        self._reset_at: Optional[float] = None
+        self._paused_until = 0.0
+        self._tokens = float(burst)
+        self._rate = hourly_limit / 3600.0
+        self._last_refill = time.monotonic()
+
+    def acquire(self, priority: Priority = Priority.READ, timeout: Optional[float] = None) -> None:
+        """
+        Block until a call of the given priority may be sent.
+
+        Raises:
+            RateLimitTimeout: If `timeout` seconds pass before a slot is free
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._try_take(ticket)
+                    if wait <= 0:
+                        return
+                    if deadline is not None:
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            raise RateLimitTimeout(f"No GitHub rate-limit budget within {timeout}s")
+                        wait = min(wait, left)
+                    self._cond.wait(min(wait, MAX_WAIT_SLICE))
+            finally:
+                self._dequeue(ticket)
+
+    async def acquire_async(self, priority: Priority = Priority.READ, timeout: Optional[float] = None) -> None:
+        """
+        `acquire` for coroutines: waits with `asyncio.sleep` in the same
+        priority queue as threads, so the event loop keeps running and a
+        cancelled caller leaves the queue without taking a slot.
+
+        Raises:
+            RateLimitTimeout: If `timeout` seconds pass before a slot is free
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(ticket)
+                if wait <= 0:
+                    return
+                if deadline is not None:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise RateLimitTimeout(f"No GitHub rate-limit budget within {timeout}s")
+                    wait = min(wait, left)
+                await asyncio.sleep(min(wait, ASYNC_WAIT_SLICE))
+        finally:
+            with self._cond:
+                self._dequeue(ticket)
+
+    def _enqueue(self, priority: Priority) -> Tuple[int, int]:
+        ticket = (int(priority), next(self._seq))
+        heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: Tuple[int, int]) -> None:
+        self._waiters.remove(ticket)
+        heapq.heapify(self._waiters)
+        self._cond.notify_all()
+
+    def _try_take(self, ticket: Tuple[int, int]) -> float:
+        """Take a slot for `ticket` if it may proceed (returning 0), else return how long to wait."""
+        self._refill()
+        wait = self._wait_time(ticket)
+        if wait <= 0:
+            self._tokens -= 1
+            if self._remaining is not None:
+                self._remaining -= 1
+        return wait
+
+    def record(self, response: requests.Response) -> bool:
+        """
+        Update the budget from a GitHub response.
+
+        Returns:
+            True if the response was rejected by a rate limit and should be retried
+        """
+        headers = response.headers
+        now = time.time()
+        with self._cond:
+            if "X-RateLimit-Limit" in headers:
+                self._limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                self._remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self._reset_at = float(headers["X-RateLimit-Reset"])
+            if self._remaining is not None and self._reset_at is not None:
+                window = max(self._reset_at - now, 1.0)
+                self._rate = max(self._remaining, 0) / window
+                self._tokens = min(self._tokens, float(self._remaining))
+
+            throttled = response.status_code in (403, 429) and (
+                "Retry-After" in headers
+                or self._remaining == 0
+                or "rate limit" in response.text.lower()
+            )
+            retry_after = headers.get("Retry-After")
+            if retry_after is not None:
+                self._pause(float(retry_after))
+            elif throttled:
+                if self._remaining == 0 and self._reset_at is not None:
+                    self._pause(max(self._reset_at - now, 1.0))
+                else:
+                    self._pause(SECONDARY_LIMIT_BACKOFF)
+            self._cond.notify_all()
+
+        if throttled:
+            logger.warning(f"GitHub rate limit hit ({response.status_code}); pausing calls for {self.budget().paused_for:.0f}s")
+        elif self._remaining is not None and self._remaining <= self.write_reserve:
+            logger.warning(f"GitHub rate-limit budget low: {self._remaining}/{self._limit} remaining")
+        return throttled
+
+    def budget(self) -> RateLimitBudget:
+        """Snapshot of the remaining GitHub budget and the scheduler state."""
+        with self._cond:
+            self._refill()
+            return RateLimitBudget(
+                limit=self._limit,
+                remaining=self._remaining,
+                reset_at=self._reset_at,
+                tokens=self._tokens,
+                paused_for=max(self._paused_until - time.monotonic(), 0.0),
+                waiting=len(self._waiters),
+            )
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self) -> None:
+        if self._reset_at is not None and time.time() >= self._reset_at:
+            # The window rolled over; pace at the nominal rate until fresh headers arrive
+            self._remaining = None
+            self._reset_at = None
+            self._rate = self._limit / 3600.0
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+    def _wait_time(self, ticket: Tuple[int, int]) -> float:
+        """Seconds `ticket` must still wait; 0 when it may proceed now."""
+        if self._waiters[0] != ticket:
+            return MAX_WAIT_SLICE
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if ticket[0] != Priority.WRITE and self._remaining is not None \
+                and self._remaining <= self.write_reserve and self._reset_at is not None:
+            until_reset = self._reset_at - time.time()
+            if until_reset > 0:
+                return until_reset
+        if self._tokens >= 1:
+            return 0.0
+        if self._rate <= 0:
+            return MAX_WAIT_SLICE
+        return (1 - self._tokens) / self._rate
+
+
+_default_limiter: Optional[GitHubRateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> GitHubRateLimiter:
+    """Return the rate limiter shared by every GitHub client in the process."""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                _default_limiter = GitHubRateLimiter()
+    return _default_limiter
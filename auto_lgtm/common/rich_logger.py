@@ -1,29 +1,35 @@
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
-from rich.table import Table
-from rich.text import Text
-from rich.logging import RichHandler
-import logging
-from loguru import logger
-import pyfiglet
 import traceback
 import sys
 from contextlib import contextmanager
+from functools import cached_property
+
+# rich and pyfiglet are imported on first use: the webhook service only ever
+# prints errors, and loading them at import time costs its cold start.
+
 
 class RichLogger:
-    def __init__(self):
-        self.console = Console()
-        self.progress = Progress(
+    @cached_property
+    def console(self):
+        from rich.console import Console
+        return Console()
+
+    @cached_property
+    def progress(self):
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+        return Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TaskProgressColumn(),
             console=self.console
         )
-        
+
     def print_title(self, title: str, subtitle: str = None):
         """Print a fancy ASCII art title using Pyfiglet"""
+        import pyfiglet
+        from rich.panel import Panel
+        from rich.text import Text
+
         ascii_art = pyfiglet.figlet_format(title, font='shadow')
         
         panel = Panel(
@@ -82,6 +88,8 @@ class RichLogger:
 
     def print_table(self, title: str, columns: list, rows: list):
         """Print a table"""
+        from rich.table import Table
+
         table = Table(title=title)
         for column in columns:
             table.add_column(column)
@@ -1,10 +1,12 @@
 from auto_lgtm.services.github_service import GitHubService
 from auto_lgtm.common.github_client import GitHubApiClient
+from auto_lgtm.common.http_transport import HttpTransport
 from loguru import logger
+from typing import Optional
 
 class GitHubServiceFactory:
     @staticmethod
-    def create(token: str, owner: str) -> GitHubService:
+    def create(token: str, owner: str, transport: Optional[HttpTransport] = None) -> GitHubService:
         logger.info(f"Creating GitHubService for owner: {owner}, token present: {bool(token)}")
-        api_client = GitHubApiClient(token, owner)
+        api_client = GitHubApiClient(token, owner, transport=transport)
         return GitHubService(api_client)
\ No newline at end of file
@@ -1,75 +1,392 @@
-from typing import Dict, List, Any
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Any, Optional, Tuple, Union
+import asyncio
 from auto_lgtm.services.llm_service import LLMService
 from auto_lgtm.factories.github_factory import GitHubServiceFactory
 from auto_lgtm.services.github_service import GitHubService, GitHubServiceError
+from auto_lgtm.services.async_github_service import AsyncGitHubService
+from auto_lgtm.common.async_github_client import AsyncGitHubApiClient
+from auto_lgtm.common.diff_position_index import DiffPositionIndex
+from auto_lgtm.common.event_loop import Prefetch, aiter_items, get_background_loop
 from auto_lgtm.services.review_service import ReviewService, DiffParser
 from auto_lgtm.models.review_models import ReviewResponse, ReviewComment, ReviewContext
-from auto_lgtm.services.secret_service import SecretService
+from auto_lgtm.services.secret_service import get_secret_provider
+from auto_lgtm.services.file_filter import FileFilter, FileFilterConfig
+from auto_lgtm.services.file_context import build_context_provider
+from auto_lgtm.services.incremental_review import count_changes, get_review_state_store, restrict_to_pr_diff
 import os
+import time
 from loguru import logger
+from auto_lgtm.common.metrics import DROPPED_COMMENTS, REVIEW_SECONDS, REVIEWS, atimed_iter, stage, timed_iter
 
-def review_pr(repo: str, pr_number: int, github_owner: str, project_id: str) -> None:
+REVIEW_PIPELINES = ("sync", "async")
+USER_QUERY = "Analyze the following changes with right line number and provide feedback on the code."
+
+def incremental_enabled() -> bool:
+    return os.getenv("REVIEW_INCREMENTAL", "true").lower() in ("1", "true", "yes")
+
+def review_pipeline() -> str:
+    """
+    The pipeline `review_pr` runs: "sync" (default) or "async" (REVIEW_PIPELINE).
+    Async stays opt-in until it measures faster than sync end to end.
+    """
+    pipeline = os.getenv("REVIEW_PIPELINE", "sync").lower()
+    if pipeline not in REVIEW_PIPELINES:
+        raise ValueError(f"REVIEW_PIPELINE must be one of {', '.join(REVIEW_PIPELINES)}, got '{pipeline}'")
+    return pipeline
+
+def load_review_secrets(project_id: str) -> Tuple[str, str]:
+    """Return the GitHub token and Gemini API key from the secret cache."""
+    secret_provider = get_secret_provider(project_id)
+    secret_id = os.getenv("SECRET_ID")
+    logger.info(f"Retrieving GitHub token from the secret cache (secret_id: {secret_id})")
+    token: str = secret_provider.get_secret(secret_id, "github_token")
+    gemini_api_key: str = secret_provider.get_secret(secret_id, "gemini_api_key")
+    if not token or not gemini_api_key:
+        raise ValueError("Failed to retrieve GitHub token or Gemini API key from secrets")
+    return token, gemini_api_key
+
+class CommentCollector:
+    """Maps generated comments onto diff positions and drops unmappable and duplicate ones."""
+
+    def __init__(self, position_index: DiffPositionIndex):
+        self.position_index = position_index
+        self.generated = 0
+        self._comments: List[Dict[str, Any]] = []
+        self._seen = set()
+
+    def add(self, comment: ReviewComment) -> None:
+        self.generated += 1
+        side = comment.change_type.diff_side
+        position = self.position_index.position_for(comment.file, comment.line_number, side)
+        if position is None:
+            logger.warning(f"Could not map {comment.file}:{comment.line_number} to a diff position. Skipping comment.")
+            DROPPED_COMMENTS.inc(reason="unmapped")
+            return
+        key = (comment.file, position, comment.comment.strip())
+        if key in self._seen:
+            DROPPED_COMMENTS.inc(reason="duplicate")
+            return
+        self._seen.add(key)
+        self._comments.append({
+            "path": comment.file,
+            "position": position,
+            "body": comment.comment
+        })
+
+    @property
+    def comments(self) -> List[Dict[str, Any]]:
+        return sorted(self._comments, key=lambda c: (c["path"], c["position"]))
+
+def select_diff(github_service: GitHubService, repo: str, pr_number: int, github_owner: str,
+                head_sha: str, incremental: bool) -> Optional[Iterable[Dict[str, Any]]]:
+    """
+    Return the structured diff to review: only the changes pushed since the
+    last reviewed head when possible, otherwise a stream of the whole PR
+    diff. Returns None when `head_sha` was already reviewed.
+    """
+    last_sha = get_review_state_store().last_reviewed_sha(github_owner, repo, pr_number) if incremental else None
+    if last_sha == head_sha:
+        return None
+    if last_sha:
+        try:
+            compare_diff = github_service.fetch_compare_diff(repo, last_sha, head_sha)
+            position_index = github_service.build_diff_position_index(repo, pr_number)
+            structured_diff = restrict_to_pr_diff(compare_diff, position_index)
+            files, lines = count_changes(structured_diff)
+            logger.info(f"Incremental review of {last_sha[:7]}..{head_sha[:7]}: {files} files, {lines} changed lines")
+            return structured_diff
+        except GitHubServiceError as e:
+            logger.warning(f"Falling back to a full review: {e}")
+    return github_service.iter_pr_diff(repo, pr_number)
+
+def build_file_filter(github_service: GitHubService, repo: str, ref: str) -> FileFilter:
+    """
+    File filter configured from the environment and the repository's
+    `.gitattributes` at `ref`. `.gitattributes` is optional input: when it
+    cannot be fetched the filter is built without it and the review goes on.
+    """
+    config = FileFilterConfig.from_env()
+    gitattributes = None
+    if config.use_gitattributes:
+        try:
+            gitattributes = github_service.fetch_file_text(repo, ".gitattributes", ref)
+        except GitHubServiceError as e:
+            logger.warning(f"Filtering files without .gitattributes: {e}")
+    return FileFilter(config, gitattributes)
+
+async def select_diff_async(github_service: AsyncGitHubService, repo: str, pr_number: int, github_owner: str,
+                            head_sha: str, incremental: bool, position_index: Awaitable[DiffPositionIndex]
+                            ) -> Optional[Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]]:
+    """
+    `select_diff` for the async pipeline. The full PR diff comes back as a
+    `Prefetch`, so downloading and parsing it has already started when this
+    returns.
+    """
+    last_sha = get_review_state_store().last_reviewed_sha(github_owner, repo, pr_number) if incremental else None
+    if last_sha == head_sha:
+        return None
+    if last_sha:
+        try:
+            compare_diff, index = await asyncio.gather(
+                github_service.fetch_compare_diff(repo, last_sha, head_sha), position_index)
+            structured_diff = restrict_to_pr_diff(compare_diff, index)
+            files, lines = count_changes(structured_diff)
+            logger.info(f"Incremental review of {last_sha[:7]}..{head_sha[:7]}: {files} files, {lines} changed lines")
+            return structured_diff
+        except GitHubServiceError as e:
+            logger.warning(f"Falling back to a full review: {e}")
+    return Prefetch(github_service.iter_pr_diff(repo, pr_number))
+
+async def build_file_filter_async(github_service: AsyncGitHubService, repo: str, ref: str) -> FileFilter:
+    """`build_file_filter` for the async pipeline."""
+    config = FileFilterConfig.from_env()
+    gitattributes = None
+    if config.use_gitattributes:
+        try:
+            gitattributes = await github_service.fetch_file_text(repo, ".gitattributes", ref)
+        except GitHubServiceError as e:
+            logger.warning(f"Filtering files without .gitattributes: {e}")
+    return FileFilter(config, gitattributes)
+
+async def _staged(name: str, repo_label: str, awaitable: Awaitable[Any]) -> Any:
+    with stage(name, repo_label):
+        return await awaitable
+
+def review_pr(repo: str, pr_number: int, github_owner: str, project_id: str,
+              head_sha: Optional[str] = None, is_current: Optional[Callable[[], bool]] = None,
+              incremental: Optional[bool] = None) -> bool:
     """
     Main function to review a pull request.
     Triggers the LLM review, maps comments to diff positions, and posts a single review.
+
+    When `is_current` is given it is checked before the LLM call and before
+    posting; once it returns False (a newer push superseded `head_sha`) the
+    review stops without posting anything.
+
+    In incremental mode (the default, see REVIEW_INCREMENTAL) a PR that was
+    reviewed before only sends the changes pushed since that review to the
+    LLM; comments are still mapped onto the full PR diff.
+
+    Each shard's prompt also shows surrounding code of its files (imports,
+    enclosing scopes, nearby lines) read from the head blobs, which are cached
+    by SHA across reviews; see REVIEW_CONTEXT and `FileContextProvider`.
+
+    Each stage is timed into `auto_lgtm_stage_seconds` and the review's
+    outcome into `auto_lgtm_reviews_total` (see common.metrics).
+
+    Returns True if a review was posted, False when there was nothing to
+    post: the head was already reviewed, no comments survived filtering and
+    mapping, or the review was superseded.
+
+    This is a blocking wrapper: by default (REVIEW_PIPELINE=sync) it runs
+    `review_pr_sync` in the calling thread. REVIEW_PIPELINE=async runs
+    `review_pr_async` on the process-wide background event loop, so reviews
+    started from any number of threads share one loop and its connection
+    pools.
+    """
+    if review_pipeline() == "sync":
+        return review_pr_sync(repo, pr_number, github_owner, project_id, head_sha, is_current, incremental)
+    return get_background_loop().run(
+        review_pr_async(repo, pr_number, github_owner, project_id, head_sha, is_current, incremental))
+
+async def review_pr_async(repo: str, pr_number: int, github_owner: str, project_id: str,
+                          head_sha: Optional[str] = None, is_current: Optional[Callable[[], bool]] = None,
+                          incremental: Optional[bool] = None) -> bool:
     """
+    Review a pull request without blocking the event loop; see `review_pr`.
+
+    The independent GitHub reads (PR details, the `/files` listing behind the
+    position index, `.gitattributes` and the diff stream) are all in flight
+    at once, and shards go to the LLM while the diff is still downloading.
+    Stage timings overlap accordingly.
+    """
+    repo_label = f"{github_owner}/{repo}"
+    started = time.perf_counter()
+    outcome = "error"
+    background: List[asyncio.Task] = []
+    structured_diff = None
+
+    def start(coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        background.append(task)
+        return task
+
     try:
-        secret_service = SecretService(project_id)
-        secret_id = os.getenv("SECRET_ID")
-        logger.info(f"Retrieving GitHub token from Secret Manager (secret_id: {secret_id})")
-        token: str = secret_service.get_secret(secret_id, "github_token")
-        gemini_api_key: str = secret_service.get_secret(secret_id, "gemini_api_key")
-        
-        if not token or not gemini_api_key:
-            raise ValueError("Failed to retrieve GitHub token or Gemini API key from secrets")
+        with stage("secrets", repo_label):
+            # Only the first call after a cold start or a refresh actually waits on the secret store
+            token, gemini_api_key = await asyncio.to_thread(load_review_secrets, project_id)
+
+        logger.info(f"Processing PR #{pr_number} in repository {repo}")
+        github_service = AsyncGitHubService(AsyncGitHubApiClient(token, github_owner))
+
+        logger.info("Fetching PR diff and context...")
+        pr_details_task = start(_staged("pr_context", repo_label, github_service.fetch_pr_context(repo, pr_number)))
+        position_index_task = start(_staged("position_index", repo_label,
+                                            github_service.build_diff_position_index(repo, pr_number)))
+        if head_sha is None:
+            head_sha = (await pr_details_task)["head"]["sha"]
+        file_filter_task = start(_staged("file_filter", repo_label,
+                                         build_file_filter_async(github_service, repo, head_sha)))
+        if incremental is None:
+            incremental = incremental_enabled()
+        with stage("diff_select", repo_label):
+            structured_diff = await select_diff_async(github_service, repo, pr_number, github_owner, head_sha,
+                                                      incremental, position_index_task)
+        if structured_diff is None:
+            logger.info(f"PR #{pr_number} at {head_sha[:7]} was already reviewed; nothing to do")
+            outcome = "already_reviewed"
+            return False
+
+        pr_details, file_filter = await asyncio.gather(pr_details_task, file_filter_task)
+
+        if is_current is not None and not is_current():
+            logger.info(f"PR #{pr_number} was updated since {head_sha}; abandoning superseded review")
+            outcome = "superseded"
+            return False
+
+        # Awaited before generation so each comment is mapped the moment it streams in
+        collector = CommentCollector(await position_index_task)
+        llm_service = LLMService(user_query=USER_QUERY, project_id=project_id, gemini_api_key=gemini_api_key)
+        review_service = ReviewService(DiffParser(), llm_service, pr_details, context_provider=build_context_provider(
+            github_service, repo, collector.position_index.blob_shas))
+
+        logger.info("Analyzing diff and generating review comments...")
+        with stage("generate", repo_label):
+            # Parsing runs in the Prefetch task; this times how long generation waited on it
+            files = atimed_iter(file_filter.afilter(aiter_items(structured_diff)), "diff_parse", repo_label)
+            async for comment in review_service.aiter_review(files):
+                collector.add(comment)
+        review_comments = collector.comments
+        logger.info(f"Generated {collector.generated} review comments")
+        logger.info(file_filter.report.summary())
+
+        if is_current is not None and not is_current():
+            logger.info(f"PR #{pr_number} was updated since {head_sha}; discarding superseded review")
+            outcome = "superseded"
+            return False
+
+        if review_comments:
+            logger.info(f"Posting review with {len(review_comments)} comments to PR #{pr_number}")
+            with stage("post_review", repo_label):
+                await github_service.post_review(
+                    repo=repo,
+                    pr_number=pr_number,
+                    body="Automated review by Auto-LGTM.",
+                    comments=review_comments,
+                    event="COMMENT",
+                    commit_id=head_sha
+                )
+            logger.info("Review posted successfully!")
+            outcome = "posted"
+        else:
+            logger.info("No valid review comments to post.")
+            outcome = "no_comments"
+        # The state file is written synchronously; keep that off the shared loop
+        await asyncio.to_thread(get_review_state_store().mark_reviewed, github_owner, repo, pr_number, head_sha)
+
+        budget = github_service.api_client.rate_limiter.budget()
+        logger.info(f"GitHub rate-limit budget: {budget.remaining}/{budget.limit} remaining, {budget.waiting} calls waiting")
+        logger.success("Auto LGTM process completed successfully!")
+        return outcome == "posted"
+
+    except GitHubServiceError as e:
+        logger.error(f"GitHub service error: {e}")
+        raise
+    except ValueError as e:
+        logger.error(f"Configuration error: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error in review_pr: {str(e)}")
+        raise
+    finally:
+        if isinstance(structured_diff, Prefetch):
+            await structured_diff.aclose()
+        for task in background:
+            if task.done() and not task.cancelled():
+                task.exception()  # retrieved so a failure nobody awaited is not reported again
+            task.cancel()
+        REVIEWS.inc(repo=repo_label, outcome=outcome)
+        REVIEW_SECONDS.observe(time.perf_counter() - started, repo=repo_label, outcome=outcome)
+
+def review_pr_sync(repo: str, pr_number: int, github_owner: str, project_id: str,
+                   head_sha: Optional[str] = None, is_current: Optional[Callable[[], bool]] = None,
+                   incremental: Optional[bool] = None) -> bool:
+    """Review a pull request in the calling thread; see `review_pr`."""
+    repo_label = f"{github_owner}/{repo}"
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with stage("secrets", repo_label):
+            token, gemini_api_key = load_review_secrets(project_id)
 
         logger.info(f"Processing PR #{pr_number} in repository {repo}")
         github_service: GitHubService = GitHubServiceFactory.create(token, github_owner)
 
         logger.info("Fetching PR diff and context...")
-        structured_diff: List[Dict[str, Any]] = github_service.fetch_pr_diff(repo, pr_number)
-        pr_details: str | Any = github_service.fetch_pr_context(repo, pr_number)
+        with stage("pr_context", repo_label):
+            pr_details: str | Any = github_service.fetch_pr_context(repo, pr_number)
+        head_sha = head_sha or pr_details["head"]["sha"]
+        if incremental is None:
+            incremental = incremental_enabled()
+        with stage("diff_select", repo_label):
+            structured_diff = select_diff(github_service, repo, pr_number, github_owner, head_sha, incremental)
+        if structured_diff is None:
+            logger.info(f"PR #{pr_number} at {head_sha[:7]} was already reviewed; nothing to do")
+            outcome = "already_reviewed"
+            return False
+
+        with stage("file_filter", repo_label):
+            file_filter = build_file_filter(github_service, repo, head_sha)
+        # The full diff is streamed: fetching and parsing happen lazily while shards are reviewed
+        structured_diff = timed_iter(file_filter.filter(structured_diff), "diff_parse", repo_label)
 
-        user_query = "Analyze the following changes with right line number and provide feedback on the code."
-        llm_service = LLMService(user_query=user_query, project_id=project_id, gemini_api_key=gemini_api_key)
-        review_service = ReviewService(DiffParser(), llm_service, pr_details)
+        if is_current is not None and not is_current():
+            logger.info(f"PR #{pr_number} was updated since {head_sha}; abandoning superseded review")
+            outcome = "superseded"
+            return False
+
+        # Built before generation so each comment is mapped the moment it streams in
+        with stage("position_index", repo_label):
+            collector = CommentCollector(github_service.build_diff_position_index(repo, pr_number))
+        llm_service = LLMService(user_query=USER_QUERY, project_id=project_id, gemini_api_key=gemini_api_key)
+        review_service = ReviewService(DiffParser(), llm_service, pr_details, context_provider=build_context_provider(
+            github_service, repo, collector.position_index.blob_shas))
 
         logger.info("Analyzing diff and generating review comments...")
-        changes: List[Dict[str, Any]] = review_service.analyze_diff(structured_diff)
-        review_response: ReviewResponse = review_service.generate_comments(changes)
-        logger.info(f"Generated {len(review_response.comments)} review comments")
-
-        review_comments = []
-        for comment in review_response.comments:
-            position = github_service.get_diff_position(
-                repo=repo,
-                pr_number=pr_number,
-                file_path=comment.file,
-                line_number=comment.line_number
-            )
-            if position is not None:
-                review_comments.append({
-                    "path": comment.file,
-                    "position": position,
-                    "body": comment.comment
-                })
-            else:
-                logger.warning(f"Could not map {comment.file}:{comment.line_number} to a diff position. Skipping comment.")
+        with stage("generate", repo_label):
+            for comment in review_service.iter_review(structured_diff):
+                collector.add(comment)
+        review_comments = collector.comments
+        logger.info(f"Generated {collector.generated} review comments")
+        logger.info(file_filter.report.summary())
+
+        if is_current is not None and not is_current():
+            logger.info(f"PR #{pr_number} was updated since {head_sha}; discarding superseded review")
+            outcome = "superseded"
+            return False
 
         if review_comments:
             logger.info(f"Posting review with {len(review_comments)} comments to PR #{pr_number}")
-            github_service.post_review(
-                repo=repo,
-                pr_number=pr_number,
-                body="Automated review by Auto-LGTM.",
-                comments=review_comments,
-                event="COMMENT"
-            )
+            with stage("post_review", repo_label):
+                github_service.post_review(
+                    repo=repo,
+                    pr_number=pr_number,
+                    body="Automated review by Auto-LGTM.",
+                    comments=review_comments,
+                    event="COMMENT",
+                    commit_id=head_sha
+                )
             logger.info("Review posted successfully!")
+            outcome = "posted"
         else:
             logger.info("No valid review comments to post.")
+            outcome = "no_comments"
+        get_review_state_store().mark_reviewed(github_owner, repo, pr_number, head_sha)
 
+        budget = github_service.api_client.rate_limiter.budget()
+        logger.info(f"GitHub rate-limit budget: {budget.remaining}/{budget.limit} remaining, {budget.waiting} calls waiting")
         logger.success("Auto LGTM process completed successfully!")
+        return outcome == "posted"
 
     except GitHubServiceError as e:
         logger.error(f"GitHub service error: {e}")
@@ -80,3 +397,6 @@ def review_pr(repo: str, pr_number: int, github_owner: str, project_id: str) ->
     except Exception as e:
         logger.error(f"Error in review_pr: {str(e)}")
         raise
+    finally:
+        REVIEWS.inc(repo=repo_label, outcome=outcome)
+        REVIEW_SECONDS.observe(time.perf_counter() - started, repo=repo_label, outcome=outcome)
@@ -1,16 +1,26 @@
+import dataclasses
 import json
 import os
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any, Optional
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from auto_lgtm.common.llm_client import LLMClientPool, LLMClientSettings
+from auto_lgtm.common.metrics import DROPPED_COMMENTS
+from auto_lgtm.models.diff_model import iter_change_rows
 from auto_lgtm.services.llm_service import LLMService
 from auto_lgtm.factories.github_factory import GitHubServiceFactory
 from auto_lgtm.services.github_service import GitHubService, GitHubServiceError
 from auto_lgtm.services.review_service import ReviewService, DiffParser
-from auto_lgtm.models.review_models import ReviewResponse
+from auto_lgtm.models.review_models import ReviewComment, ReviewResponse, ChangeType
+from auto_lgtm.services.file_context import build_context_provider
+from auto_lgtm.services.file_filter import FileFilter, FileFilterConfig
+from auto_lgtm.services.local_git import DiffTarget, LocalGitRepo
+from auto_lgtm.lgtm import USER_QUERY, build_file_filter
 from loguru import logger
 
+OUTPUT_FORMATS = ("text", "json")
+
 def review_pr_local(
     repo: str,
     pr_number: int,
@@ -28,33 +38,37 @@ def review_pr_local(
         github_service = GitHubServiceFactory.create(github_token, github_owner)
 
         logger.info("Fetching PR diff and context...")
-        structured_diff = github_service.fetch_pr_diff(repo, pr_number)
+        structured_diff = github_service.iter_pr_diff(repo, pr_number)
         pr_details = github_service.fetch_pr_context(repo, pr_number)
+        file_filter = build_file_filter(github_service, repo, pr_details["head"]["sha"])
+        structured_diff = file_filter.filter(structured_diff)
 
         user_query = "Analyze the following changes with right line number and provide feedback on the code."
         llm_service = LLMService(user_query=user_query, project_id=project_id, gemini_api_key=gemini_api_key)
         review_service = ReviewService(DiffParser(), llm_service, pr_details)
 
-        logger.info("Analyzing diff and generating review comments...")
-        changes: List[Dict[str, Any]] = review_service.analyze_diff(structured_diff)
-        review_response: ReviewResponse = review_service.generate_comments(changes)
+        # Built before generation so each comment is mapped the moment it streams in
+        position_index = github_service.build_diff_position_index(repo, pr_number)
 
+        logger.info("Analyzing diff and generating review comments...")
         review_comments = []
-        for comment in review_response.comments:
-            position = github_service.get_diff_position(
-                repo=repo,
-                pr_number=pr_number,
-                file_path=comment.file,
-                line_number=comment.line_number
-            )
-            if position is not None:
+        seen_comments = set()
+        for comment in review_service.iter_review(structured_diff):
+            side = comment.change_type.diff_side
+            position = position_index.position_for(comment.file, comment.line_number, side)
+            if position is None:
+                logger.warning(f"Could not map {comment.file}:{comment.line_number} to a diff position. Skipping comment.")
+                continue
+            key = (comment.file, position, comment.comment.strip())
+            if key not in seen_comments:
+                seen_comments.add(key)
                 review_comments.append({
                     "path": comment.file,
                     "position": position,
                     "body": comment.comment
                 })
-            else:
-                logger.warning(f"Could not map {comment.file}:{comment.line_number} to a diff position. Skipping comment.")
+        review_comments.sort(key=lambda c: (c["path"], c["position"]))
+        logger.info(file_filter.report.summary())
 
         # Post the review
         if review_comments:
@@ -82,6 +96,119 @@ def review_pr_local(
         logger.error(f"Error in review_pr_local: {str(e)}")
         raise
 
+def review_local_checkout(
+    target: DiffTarget,
+    path: str = ".",
+    gemini_api_key: Optional[str] = None,
+    llm_base_url: Optional[str] = None,
+    llm_model: Optional[str] = None,
+    project_id: Optional[str] = None
+) -> List[ReviewComment]:
+    """
+    Review changes of a local git checkout without talking to GitHub.
+
+    The diff comes from `git diff` (see `DiffTarget`), `.gitattributes` and
+    surrounding file context from the checkout itself, so the LLM call is
+    the only network traffic. Point `llm_base_url` at any OpenAI-compatible
+    server (a local model, or the benchmark fake) to review fully offline.
+
+    Args:
+        target: Which changes to review
+        path: Any directory inside the checkout
+        gemini_api_key: LLM API key; defaults to GEMINI_API_KEY, or a placeholder with `llm_base_url`
+        llm_base_url: OpenAI-compatible endpoint replacing LLM_BASE_URL
+        llm_model: Model name replacing the default
+        project_id: Google Cloud project ID (kept for API compatibility)
+
+    Returns:
+        The sorted, deduplicated comments on lines of the diff
+
+    Raises:
+        LocalGitError: If a git command fails
+        ValueError: If no API key is available
+    """
+    api_key = gemini_api_key or os.getenv("GEMINI_API_KEY") or ("local" if llm_base_url else None)
+    if not api_key:
+        raise ValueError("Set GEMINI_API_KEY (or pass an LLM base URL for a local model)")
+    repo = LocalGitRepo(path)
+
+    config = FileFilterConfig.from_env()
+    gitattributes = repo.read_file(".gitattributes", target) if config.use_gitattributes else None
+    file_filter = FileFilter(config, gitattributes)
+
+    client_pool = None
+    if llm_base_url:
+        client_pool = LLMClientPool(dataclasses.replace(LLMClientSettings.from_env(), base_url=llm_base_url))
+    llm_service = LLMService(user_query=USER_QUERY, project_id=project_id, gemini_api_key=api_key,
+                             client_pool=client_pool)
+    if llm_model:
+        llm_service.params.model = llm_model
+    pr_details = {
+        "title": f"Local review of {target.describe()}",
+        "body": "\n".join(repo.commit_messages(target)),
+    }
+    review_service = ReviewService(DiffParser(), llm_service, pr_details, context_provider=build_context_provider(
+        repo, repo.root, repo.blob_shas(repo.changed_paths(target), target)))
+
+    changed = set()
+
+    def record(files: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for file_diff in files:
+            for chunk in file_diff['chunks']:
+                for kind, line, _ in iter_change_rows(chunk):
+                    changed.add((file_diff['file'], line, kind == 'DELETION'))
+            yield file_diff
+
+    try:
+        comments = ReviewService.merge_comments(
+            review_service.iter_review(record(file_filter.filter(repo.iter_diff(target)))))
+    finally:
+        if client_pool is not None:
+            client_pool.close()
+    logger.info(file_filter.report.summary())
+
+    review_comments = []
+    for comment in comments:
+        if (comment.file, comment.line_number, comment.change_type == ChangeType.DELETION) not in changed:
+            logger.warning(f"{comment.file}:{comment.line_number} is not part of the diff. Skipping comment.")
+            DROPPED_COMMENTS.inc(reason="unmapped")
+            continue
+        review_comments.append(comment)
+    logger.info(f"Reviewed {target.describe()}: {len(review_comments)} comments")
+    return review_comments
+
+def format_comments(comments: List[ReviewComment], output_format: str = "text") -> str:
+    """
+    Render comments as `path:line: severity: comment` lines (continuation
+    lines indented), or as a JSON array with `output_format="json"`.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"output format must be one of {', '.join(OUTPUT_FORMATS)}, got '{output_format}'")
+    if output_format == "json":
+        return json.dumps([comment.model_dump(mode="json") for comment in comments], indent=2)
+    blocks = []
+    for comment in comments:
+        first, *rest = comment.comment.strip().splitlines() or [""]
+        side = " (deleted line)" if comment.change_type == ChangeType.DELETION else ""
+        blocks.append("\n".join([f"{comment.file}:{comment.line_number}{side}: {comment.severity.value}: {first}",
+                                 *(f"    {line}" for line in rest)]))
+    return "\n".join(blocks)
+
+def write_comments(comments: List[ReviewComment], output: Optional[str] = None,
+                   output_format: Optional[str] = None) -> None:
+    """Print comments to stdout, or write them to `output`: JSON when it ends in .json, otherwise text."""
+    if output_format is None:
+        output_format = "json" if output and output.endswith(".json") else "text"
+    rendered = format_comments(comments, output_format)
+    if not output:
+        print(rendered)
+        return
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(rendered + "\n")
+
 if __name__ == "__main__":
     REPO = "lgtm_test"
     PR_NUMBER = 14
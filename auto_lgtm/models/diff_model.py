@@ -0,0 +1,218 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CHANGE_KINDS = ('ADDITION', 'DELETION', 'CONTEXT')
+_KIND_CODES = {kind: code for code, kind in enumerate(CHANGE_KINDS)}
+
+# (type, line, content) of one diff line
+ChangeRow = Tuple[str, int, str]
+
+
+class Change(Mapping):
+    """Read-only view of one diff line: `{'type', 'line', 'content'}`."""
+    __slots__ = ('type', 'line', 'content')
+    _KEYS = ('type', 'line', 'content')
+
+    def __init__(self, type: str, line: int, content: str):
+        self.type = type
+        self.line = line
+        self.content = content
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"Change({self.type}, {self.line}, {self.content!r})"
+
+
+class HunkChanges(Sequence):
+    """Read-only sequence of the `Change` views of a hunk, built on access."""
+    __slots__ = ('_hunk',)
+
+    def __init__(self, hunk: "Hunk"):
+        self._hunk = hunk
+
+    def __len__(self) -> int:
+        return self._hunk.stop - self._hunk.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Change(*self._hunk.file.row(self._hunk.start + index))
+
+    def __iter__(self) -> Iterator[Change]:
+        for row in self._hunk.rows():
+            yield Change(*row)
+
+
+class Hunk(Mapping):
+    """
+    One `@@` hunk of a `DiffFile`: a range of the file's line arrays.
+
+    Readable like the `{'old_start', 'new_start', 'changes'}` dicts the rest
+    of the pipeline used to pass around; `rows()` iterates the lines as plain
+    tuples without creating a view per line.
+    """
+    __slots__ = ('file', 'start', 'stop', 'old_start', 'new_start')
+    _KEYS = ('old_start', 'new_start', 'changes')
+
+    def __init__(self, file: "DiffFile", start: int, stop: int, old_start: int, new_start: int):
+        self.file = file
+        self.start = start
+        self.stop = stop
+        self.old_start = old_start
+        self.new_start = new_start
+
+    @property
+    def changes(self) -> HunkChanges:
+        return HunkChanges(self)
+
+    def rows(self) -> Iterator[ChangeRow]:
+        return self.file.rows(self.start, self.stop)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'old_start': self.old_start,
+            'new_start': self.new_start,
+            'changes': [{'type': kind, 'line': line, 'content': content} for kind, line, content in self.rows()],
+        }
+
+    def __repr__(self) -> str:
+        return f"Hunk({self.file.path}, -{self.old_start} +{self.new_start}, {self.stop - self.start} lines)"
+
+
+class DiffFile(Mapping):
+    """
+    Compact diff of one file.
+
+    Change kinds and line numbers live in `array`s and the text of every line
+    in one string shared by all hunks of the file, sliced by offset on access,
+    so a line costs a few bytes of bookkeeping instead of a dict and three
+    objects. Readable like the `{'file', 'chunks'}` dicts returned by the
+    parser before; build instances with `DiffFileBuilder`.
+    """
+    __slots__ = ('path', 'hunks', 'truncated', '_kinds', '_lines', '_ends', '_text')
+
+    def __init__(self, path: str, kinds: array, lines: array, ends: array, text: str,
+                 hunk_bounds: List[Tuple[int, int, int, int]], truncated: bool = False):
+        self.path = path
+        self.truncated = truncated
+        self._kinds = kinds
+        self._lines = lines
+        self._ends = ends
+        self._text = text
+        self.hunks = tuple(Hunk(self, start, stop, old_start, new_start)
+                           for start, stop, old_start, new_start in hunk_bounds)
+
+    def row(self, index: int) -> ChangeRow:
+        begin = self._ends[index - 1] if index else 0
+        return CHANGE_KINDS[self._kinds[index]], self._lines[index], self._text[begin:self._ends[index]]
+
+    def rows(self, start: int, stop: int) -> Iterator[ChangeRow]:
+        text = self._text
+        begin = self._ends[start - 1] if start else 0
+        for kind, line, end in zip(self._kinds[start:stop], self._lines[start:stop], self._ends[start:stop]):
+            yield CHANGE_KINDS[kind], line, text[begin:end]
+            begin = end
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'file':
+            return self.path
+        if key == 'chunks':
+            return list(self.hunks)
+        if key == 'truncated' and self.truncated:
+            return True
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'file'
+        yield 'chunks'
+        if self.truncated:
+            yield 'truncated'
+
+    def __len__(self) -> int:
+        return 3 if self.truncated else 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {'file': self.path, 'chunks': [hunk.to_dict() for hunk in self.hunks]}
+        if self.truncated:
+            result['truncated'] = True
+        return result
+
+    def __repr__(self) -> str:
+        return f"DiffFile({self.path}, {len(self.hunks)} hunks, {len(self._kinds)} lines)"
+
+
+class DiffFileBuilder:
+    """Accumulates the lines of one file while it is parsed, then freezes them into a `DiffFile`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._kinds = array('b')
+        self._lines = array('l')
+        self._ends = array('q')
+        self._parts: List[str] = []
+        self._size = 0
+        self._hunks: List[Tuple[int, int, int, int]] = []
+        self._hunk_start: Optional[Tuple[int, int, int]] = None
+
+    @property
+    def in_hunk(self) -> bool:
+        return self._hunk_start is not None
+
+    def start_hunk(self, old_start: int, new_start: int) -> None:
+        self._close_hunk()
+        self._hunk_start = (len(self._kinds), old_start, new_start)
+
+    def add(self, kind: str, line: int, content: str) -> None:
+        self._kinds.append(_KIND_CODES[kind])
+        self._lines.append(line)
+        self._parts.append(content)
+        self._size += len(content)
+        self._ends.append(self._size)
+
+    def clear(self) -> None:
+        """Drop everything collected so far (used for skipped files)."""
+        self.__init__(self.path)
+
+    def build(self, truncated: bool = False) -> DiffFile:
+        self._close_hunk()
+        return DiffFile(self.path, self._kinds, self._lines, self._ends, "".join(self._parts),
+                        self._hunks, truncated)
+
+    def _close_hunk(self) -> None:
+        if self._hunk_start is not None:
+            start, old_start, new_start = self._hunk_start
+            self._hunks.append((start, len(self._kinds), old_start, new_start))
+            self._hunk_start = None
+
+
+def iter_change_rows(chunk: Any) -> Iterator[ChangeRow]:
+    """Iterate a hunk as `(type, line, content)` tuples, for `Hunk`s and plain dict hunks alike."""
+    if isinstance(chunk, Hunk):
+        return chunk.rows()
+    return ((change['type'], change['line'], change['content']) for change in chunk['changes'])
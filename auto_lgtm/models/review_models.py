@@ -7,6 +7,15 @@ class ChangeType(str, Enum):
     DELETION = "deletion"
     MODIFICATION = "modification"
 
+    @property
+    def diff_side(self) -> str:
+        """
+        Side of the diff a comment on this change is placed on. The diff
+        parser numbers deleted lines in the base file, matching the LEFT
+        side of `DiffPositionIndex`; every other line is a head file line.
+        """
+        return "LEFT" if self is ChangeType.DELETION else "RIGHT"
+
 class SeverityLevel(str, Enum):
     INFO = "info"
     WARNING = "warning"
@@ -0,0 +1,101 @@
+import math
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from auto_lgtm.models.diff_model import iter_change_rows
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]|\s+")
+# Typical length of a BPE piece for identifiers and English words
+CHARS_PER_WORD_PIECE = 4
+# Typical number of digits per BPE piece
+DIGITS_PER_PIECE = 3
+
+_MARKERS = {'ADDITION': '+', 'DELETION': '-', 'CONTEXT': ' '}
+# Surrounding code from the file that is not part of the diff
+SURROUNDING_MARKER = '='
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate how many tokens `text` costs in the LLM prompt.
+
+    Words are split into ~4 character pieces, digit runs into ~3 digit
+    pieces, and every punctuation mark and whitespace run (other than a
+    single space before a word) counts as one.
+    That tracks BPE tokenizers closely enough to budget prompts, and needs no
+    tokenizer download.
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        first = piece[0]
+        if first.isalpha():
+            tokens += math.ceil(len(piece) / CHARS_PER_WORD_PIECE)
+        elif first.isdigit():
+            tokens += math.ceil(len(piece) / DIGITS_PER_PIECE)
+        elif piece != " ":
+            # A single space merges into the following word
+            tokens += 1
+    return tokens
+
+
+def serialize_chunk(chunk: Dict[str, Any]) -> List[str]:
+    """
+    Render one hunk as a header plus one row per line: `<marker><line>|<text>`.
+
+    Additions and context lines carry their line number in the new file,
+    deletions their line number in the base file, the same numbers the
+    reviewer must return in `line_number`.
+    """
+    rows = [f"@@ -{chunk['old_start']} +{chunk['new_start']} @@"]
+    for kind, line, content in iter_change_rows(chunk):
+        rows.append(f"{_MARKERS[kind]}{line}|{content}")
+    return rows
+
+
+def serialize_diff(structured_diff: Iterable[Dict[str, Any]],
+                   context: Optional[Mapping[str, Sequence[Tuple[int, str]]]] = None) -> str:
+    """
+    Render a structured diff with one header per file and per hunk. `context`
+    maps a file to surrounding `(line, code)` rows, rendered as
+    `=<line>|<code>` under the file header (see `FileContextProvider`).
+    """
+    rows: List[str] = []
+    for file_diff in structured_diff:
+        rows.append(file_header(file_diff['file']))
+        if context:
+            for line, content in context.get(file_diff['file'], ()):
+                rows.append(f"{SURROUNDING_MARKER}{line}|{content}")
+        for chunk in file_diff['chunks']:
+            rows.extend(serialize_chunk(chunk))
+    return "\n".join(rows)
+
+
+def serialize_changes(changes: Iterable[Dict[str, Any]]) -> str:
+    """
+    Render the flat change list produced by `DiffParser.parse` in the same
+    row format, grouping consecutive changes of a file under one header.
+    """
+    rows: List[str] = []
+    current_file = None
+    for change in changes:
+        if change['file'] != current_file:
+            current_file = change['file']
+            rows.append(file_header(current_file))
+        marker = '-' if change['change_type'] == 'deletion' else '+'
+        rows.append(f"{marker}{change['line_number']}|{change['line_content']}")
+    return "\n".join(rows)
+
+
+def file_header(file_path: str) -> str:
+    """The row that opens a file's section of the prompt."""
+    return f"### {file_path}"
+
+
+def estimate_file_header_tokens(file_path: str) -> int:
+    """Prompt tokens of the header `serialize_diff` writes once per file."""
+    return estimate_tokens(file_header(file_path))
+
+
+def estimate_chunk_tokens(chunk: Dict[str, Any]) -> int:
+    """Prompt tokens a hunk costs once serialized; see `estimate_file_header_tokens` for its file's header."""
+    return estimate_tokens("\n".join(serialize_chunk(chunk)))
@@ -1,9 +1,20 @@
+import hashlib
+
 PR_REVIEW_PROMPT = """
 You are a helpful assistant expert in software development and reviews pull requests and provides feedback on the code.
 Pull Request metadata information
 {pr_metadata}
 
-You will be given a diff of a pull request -
+You will be given a diff of a pull request in a compact format -
+- "### path/to/file.py" starts the changes of a file
+- "@@ -old +new @@" starts a hunk
+- every other row is "<marker><line_number>|<code>", where the marker is "+" for an added line,
+  "-" for a deleted line and " " for an unchanged context line. Added and context lines are
+  numbered in the new file, deleted lines in the old file.
+- rows right below a file header that start with "=" are not part of the diff: they show surrounding
+  code of the new file (imports, the enclosing function or class, nearby lines) for reference only.
+- Only comment on added or deleted lines, and use the line_number shown on that row.
+
 {changes}
 
 Based on the diff, you will provide a Output JSON Format of comments in the following format
@@ -34,4 +45,7 @@ NOTE:
 - The comment should have the right line where the changes are made.
 - The comment should be in the same logic and clean code.
 - The comment with code snippets should follow the software development best practices like SOLID, DRY, KISS, YAGNI, etc. and the python community standards.
-"""
\ No newline at end of file
+"""
+
+# Changes whenever the prompt text changes, so cached reviews of an older prompt are not reused
+PROMPT_VERSION = hashlib.sha256(PR_REVIEW_PROMPT.encode()).hexdigest()[:12]
@@ -0,0 +1,152 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from auto_lgtm.common.async_github_client import AsyncGitHubApiClient
+from auto_lgtm.common.diff_position_index import DiffPositionIndex
+from auto_lgtm.models.diff_model import DiffFile
+from auto_lgtm.services.diff_stream import DiffLimits, aiter_parse_diff, aiter_text_lines
+from auto_lgtm.services.github_service import PR_FILES_PAGE_SIZE, GitHubServiceError
+
+DIFF_MEDIA_TYPE = "application/vnd.github.v3.diff"
+
+
+def _status(error: httpx.HTTPError) -> Optional[int]:
+    response = getattr(error, "response", None) if isinstance(error, httpx.HTTPStatusError) else None
+    return response.status_code if response is not None else None
+
+
+def _pr_error(error: httpx.HTTPError, repo: str, pr_number: int, action: str) -> GitHubServiceError:
+    """Map an HTTP error on a pull request endpoint to the messages `GitHubService` uses."""
+    status = _status(error)
+    if status == 404:
+        return GitHubServiceError(f"PR not found. Please check if repository '{repo}' and PR number {pr_number} are correct.")
+    if status == 403:
+        return GitHubServiceError(f"Access forbidden. Please check if your token has sufficient permissions and the repository exists.")
+    return GitHubServiceError(f"Failed to {action}: {str(error)}")
+
+
+class AsyncGitHubService:
+    """
+    asyncio counterpart of `GitHubService` for the review pipeline.
+
+    Every method is a coroutine (or async iterator) on an
+    `AsyncGitHubApiClient`, so independent calls can be awaited together with
+    `asyncio.gather` and many reviews can share one event loop. Errors are
+    raised as `GitHubServiceError` with the same messages as the sync service.
+    """
+
+    def __init__(self, api_client: AsyncGitHubApiClient):
+        self.api_client: AsyncGitHubApiClient = api_client
+        self._position_indexes: Dict[Tuple[str, int], DiffPositionIndex] = {}
+        self._position_index_locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+    async def fetch_pr_context(self, repo: str, pr_number: int) -> Dict[str, Any]:
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}"
+        try:
+            return await self.api_client.get(endpoint)
+        except httpx.HTTPError as e:
+            raise _pr_error(e, repo, pr_number, "fetch PR context")
+
+    async def iter_pr_diff(self, repo: str, pr_number: int,
+                           limits: Optional[DiffLimits] = None) -> AsyncIterator[DiffFile]:
+        """Stream the PR diff and yield one parsed file at a time; see `GitHubService.iter_pr_diff`."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}"
+        try:
+            chunks = await self.api_client.stream_text(endpoint, accept=DIFF_MEDIA_TYPE)
+            async for file_diff in aiter_parse_diff(aiter_text_lines(chunks), limits or DiffLimits.from_env()):
+                yield file_diff
+        except httpx.HTTPError as e:
+            raise _pr_error(e, repo, pr_number, "fetch PR diff")
+
+    async def fetch_compare_diff(self, repo: str, base_sha: str, head_sha: str,
+                                 limits: Optional[DiffLimits] = None) -> List[DiffFile]:
+        """Fetch and parse the diff between two commits (`base...head`); see `GitHubService.fetch_compare_diff`."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/compare/{base_sha}...{head_sha}"
+        try:
+            chunks = await self.api_client.stream_text(endpoint, accept=DIFF_MEDIA_TYPE)
+            return [file_diff async for file_diff in
+                    aiter_parse_diff(aiter_text_lines(chunks), limits or DiffLimits.from_env())]
+        except httpx.HTTPError as e:
+            if _status(e) == 404:
+                raise GitHubServiceError(f"Cannot compare {base_sha[:7]}...{head_sha[:7]} in '{repo}'; the base commit may have been force-pushed away.")
+            raise GitHubServiceError(f"Failed to fetch compare diff: {str(e)}")
+
+    async def fetch_pr_files(self, repo: str, pr_number: int) -> List[Dict[str, Any]]:
+        """Fetch every page of the files changed in a pull request."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}/files"
+        files: List[Dict[str, Any]] = []
+        page = 1
+        try:
+            while True:
+                batch = await self.api_client.get(endpoint, params={"per_page": PR_FILES_PAGE_SIZE, "page": page})
+                files.extend(batch)
+                if len(batch) < PR_FILES_PAGE_SIZE:
+                    break
+                page += 1
+        except httpx.HTTPError as e:
+            raise _pr_error(e, repo, pr_number, "fetch PR files")
+        logger.debug(f"Fetched {len(files)} changed files in {page} page(s) for PR #{pr_number}")
+        return files
+
+    async def build_diff_position_index(self, repo: str, pr_number: int) -> DiffPositionIndex:
+        """
+        Build (or return the cached) diff position index for a pull request.
+        Concurrent callers for the same PR wait for a single `/files` fetch.
+        """
+        key = (repo, pr_number)
+        lock = self._position_index_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self._position_indexes.get(key)
+            if index is None:
+                index = DiffPositionIndex.from_files(await self.fetch_pr_files(repo, pr_number))
+                self._position_indexes[key] = index
+        return index
+
+    async def fetch_file_text(self, repo: str, path: str, ref: str) -> Optional[str]:
+        """Fetch the raw content of a file at `ref`, or None if it does not exist there."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/contents/{path}"
+        try:
+            return await self.api_client.get(endpoint, return_text=True, params={"ref": ref},
+                                             accept="application/vnd.github.raw+json")
+        except httpx.HTTPError as e:
+            if _status(e) == 404:
+                return None
+            raise GitHubServiceError(f"Failed to fetch {path} at {ref[:7]}: {str(e)}")
+
+    async def fetch_blob_text(self, repo: str, sha: str, max_size: Optional[int] = None) -> Optional[str]:
+        """Fetch the content of a git blob; see `GitHubService.fetch_blob_text`."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/git/blobs/{sha}"
+        try:
+            chunks = await self.api_client.stream_text(endpoint, accept="application/vnd.github.raw+json",
+                                                      conditional=False)
+            parts, size = [], 0
+            try:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        return None
+                    parts.append(chunk)
+            finally:
+                await chunks.aclose()
+            return "".join(parts)
+        except httpx.HTTPError as e:
+            raise GitHubServiceError(f"Failed to fetch blob {sha[:7]}: {str(e)}")
+
+    async def post_review(self, repo: str, pr_number: int, body: str, comments: list, event: str = "COMMENT",
+                          commit_id: Optional[str] = None):
+        """Post a review to a pull request; see `GitHubService.post_review`."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}/reviews"
+        data = {
+            "body": body,
+            "event": event,
+            "comments": comments
+        }
+        if commit_id:
+            data["commit_id"] = commit_id
+        try:
+            return await self.api_client.post(endpoint, data=data, accept="application/vnd.github+json")
+        except httpx.HTTPError as e:
+            raise _pr_error(e, repo, pr_number, "post review")
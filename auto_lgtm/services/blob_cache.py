@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from loguru import logger
+
+from auto_lgtm.common.metrics import BLOB_CACHE_LOOKUPS
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Larger files are not read at all; surrounding context is not worth a big download
+DEFAULT_MAX_BLOB_BYTES = 1024 * 1024
+# Blob SHAs remembered as too large, so they are not requested again
+MAX_OVERSIZED_SHAS = 10_000
+
+
+@dataclass
+class BlobCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+
+class BlobCacheBackend(Protocol):
+    def get(self, sha: str) -> Optional[str]: ...
+    def put(self, sha: str, text: str) -> int: ...
+
+
+class InMemoryBlobCache:
+    """LRU backend bounded by the total size of the stored text; `put` returns the number of evicted blobs."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sha: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(sha)
+            if text is not None:
+                self._entries.move_to_end(sha)
+            return text
+
+    def put(self, sha: str, text: str) -> int:
+        with self._lock:
+            if sha in self._entries:
+                self._entries.move_to_end(sha)
+                return 0
+            self._entries[sha] = text
+            self.size += len(text)
+            evicted = 0
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self.size -= len(old)
+                evicted += 1
+            return evicted
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBlobCache:
+    """
+    File-backed backend shared by every worker on the host. Beyond `max_bytes`
+    the least recently used blobs are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blob_cache ("
+            " sha TEXT PRIMARY KEY, text TEXT NOT NULL,"
+            " size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS blob_cache_accessed ON blob_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, sha: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM blob_cache WHERE sha = ?", (sha,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE blob_cache SET accessed_at = ? WHERE sha = ?", (time.time(), sha))
+            self._conn.commit()
+        return row[0]
+
+    def put(self, sha: str, text: str) -> int:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO blob_cache (sha, text, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (sha, text, len(text), time.time()),
+            )
+            # Keep the most recently used blobs whose running total fits the budget
+            evicted = self._conn.execute(
+                "DELETE FROM blob_cache WHERE sha IN ("
+                " SELECT sha FROM (SELECT sha, SUM(size) OVER (ORDER BY accessed_at DESC, sha) AS total"
+                " FROM blob_cache) WHERE total > ? AND sha != ?)",
+                (self.max_bytes, sha),
+            ).rowcount
+            self._conn.commit()
+        return evicted
+
+
+class BlobCache:
+    """
+    Content-addressed cache of file contents, keyed by git blob SHA.
+
+    A blob SHA names exactly one content forever, so entries never go stale
+    and need no validation request: a file that did not change between two
+    reviews (or two PRs) is downloaded once. Only size bounds eviction.
+    Blobs over `max_blob_bytes` are remembered as such (`mark_oversized`) so
+    callers can skip them without downloading them again.
+    """
+
+    def __init__(self, backend: BlobCacheBackend, max_blob_bytes: int = DEFAULT_MAX_BLOB_BYTES):
+        self.backend = backend
+        self.max_blob_bytes = max_blob_bytes
+        self.stats = BlobCacheStats()
+        self._stats_lock = threading.Lock()
+        self._oversized: "OrderedDict[str, None]" = OrderedDict()
+
+    def is_oversized(self, sha: str) -> bool:
+        with self._stats_lock:
+            return sha in self._oversized
+
+    def mark_oversized(self, sha: str) -> None:
+        with self._stats_lock:
+            self._oversized[sha] = None
+            while len(self._oversized) > MAX_OVERSIZED_SHAS:
+                self._oversized.popitem(last=False)
+
+    def get(self, sha: str) -> Optional[str]:
+        text = self.backend.get(sha)
+        with self._stats_lock:
+            if text is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        BLOB_CACHE_LOOKUPS.inc(result="miss" if text is None else "hit")
+        return text
+
+    def put(self, sha: str, text: str) -> None:
+        if len(text) > self.max_blob_bytes:
+            return
+        evicted = self.backend.put(sha, text)
+        with self._stats_lock:
+            self.stats.stores += 1
+            self.stats.evictions += evicted
+
+
+_default_cache: Optional[BlobCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_blob_cache() -> BlobCache:
+    """
+    Process-wide blob cache: SQLite when BLOB_CACHE_PATH is set, otherwise in
+    memory. BLOB_CACHE_MAX_BYTES bounds its size and BLOB_CACHE_MAX_BLOB_BYTES
+    the largest file kept.
+    """
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                max_bytes = int(os.getenv("BLOB_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+                path = os.getenv("BLOB_CACHE_PATH")
+                if path:
+                    logger.info(f"Using SQLite blob cache at {path}")
+                    backend: BlobCacheBackend = SQLiteBlobCache(path, max_bytes=max_bytes)
+                else:
+                    backend = InMemoryBlobCache(max_bytes=max_bytes)
+                _default_cache = BlobCache(
+                    backend, max_blob_bytes=int(os.getenv("BLOB_CACHE_MAX_BLOB_BYTES", DEFAULT_MAX_BLOB_BYTES)))
+    return _default_cache
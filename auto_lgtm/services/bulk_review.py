@@ -0,0 +1,139 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable, List, Optional
+
+from loguru import logger
+
+from auto_lgtm.common.rate_limiter import Priority, get_rate_limiter
+from auto_lgtm.factories.github_factory import GitHubServiceFactory
+from auto_lgtm.services.github_service import GitHubServiceError
+from auto_lgtm.services.incremental_review import get_review_state_store
+
+DEFAULT_BULK_WORKERS = 4
+
+
+@dataclass
+class BulkTarget:
+    owner: str
+    repo: str
+    pr_number: int
+    head_sha: str
+    title: str = ""
+
+    @property
+    def name(self) -> str:
+        return f"{self.owner}/{self.repo}#{self.pr_number}"
+
+
+@dataclass
+class BulkResult:
+    owner: str
+    repo: str
+    pr_number: int
+    head_sha: str
+    status: str
+    seconds: float
+    error: str = ""
+
+
+def parse_repo_spec(spec: str, default_owner: Optional[str] = None) -> tuple:
+    """Split `owner/repo` (or a bare `repo` with `default_owner`) into (owner, repo)."""
+    owner, _, repo = spec.strip().rpartition("/")
+    owner = owner or default_owner
+    if not owner or not repo:
+        raise ValueError(f"Repository '{spec}' must be given as owner/repo")
+    return owner, repo
+
+
+class BulkReviewer:
+    """
+    Reviews many pull requests on a bounded thread pool.
+
+    Workers run in one process so they share the pooled HTTP transport, the
+    secret cache, the GitHub rate limiter and the LLM review cache; the rate
+    limiter keeps the pool within GitHub's budget however many workers run,
+    and heads that were already reviewed are skipped without any API call.
+    """
+
+    def __init__(self, token: str, review_fn: Callable[..., bool], project_id: str,
+                 max_workers: int = DEFAULT_BULK_WORKERS):
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        self.token = token
+        self.review_fn = review_fn
+        self.project_id = project_id
+        self.max_workers = max_workers
+
+    def discover(self, repos: Iterable[tuple]) -> List[BulkTarget]:
+        """List the open pull requests of every (owner, repo)."""
+        targets = []
+        for owner, repo in repos:
+            github_service = GitHubServiceFactory.create(self.token, owner)
+            try:
+                pulls = github_service.fetch_pull_requests(repo, priority=Priority.READ)
+            except GitHubServiceError as e:
+                logger.error(f"Skipping {owner}/{repo}: {e}")
+                continue
+            for pull in pulls:
+                targets.append(BulkTarget(owner, repo, pull["number"], pull["head"]["sha"], pull.get("title", "")))
+            logger.info(f"{owner}/{repo}: {len(pulls)} open pull requests")
+        return targets
+
+    def run(self, targets: List[BulkTarget],
+            on_result: Optional[Callable[[BulkResult, int, int], None]] = None) -> List[BulkResult]:
+        """
+        Review every target and return one result per target, in completion
+        order. `on_result(result, done, total)` is called as each finishes.
+        """
+        results: List[BulkResult] = []
+        state_store = get_review_state_store()
+
+        def review(target: BulkTarget) -> BulkResult:
+            start = time.perf_counter()
+            if state_store.last_reviewed_sha(target.owner, target.repo, target.pr_number) == target.head_sha:
+                return BulkResult(target.owner, target.repo, target.pr_number, target.head_sha, "skipped", 0.0)
+            try:
+                posted = self.review_fn(target.repo, target.pr_number, target.owner, self.project_id,
+                                        head_sha=target.head_sha)
+                # A review that posted nothing (nothing to review, all filtered, superseded) is not counted
+                status, error = "reviewed" if posted else "skipped", ""
+            except Exception as e:
+                logger.error(f"Review of {target.name} failed: {e}")
+                status, error = "failed", str(e)
+            return BulkResult(target.owner, target.repo, target.pr_number, target.head_sha, status,
+                              round(time.perf_counter() - start, 3), error)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bulk-review") as executor:
+            futures = [executor.submit(review, target) for target in targets]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result, len(results), len(targets))
+        elapsed = time.perf_counter() - started
+        reviewed = sum(1 for r in results if r.status == "reviewed")
+        budget = get_rate_limiter().budget()
+        logger.info(f"Bulk review finished: {reviewed}/{len(targets)} reviewed in {elapsed:.1f}s "
+                    f"({reviewed / elapsed * 60 if elapsed else 0:.1f} PRs/min, {self.max_workers} workers); "
+                    f"GitHub budget {budget.remaining}/{budget.limit}")
+        return results
+
+
+def write_report(results: List[BulkResult], path: str) -> None:
+    """Write results as CSV when `path` ends in .csv, otherwise as JSON."""
+    rows = [asdict(result) for result in results]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=[field for field in BulkResult.__dataclass_fields__])
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from loguru import logger
+
+from auto_lgtm.prompts.diff_serializer import estimate_chunk_tokens, estimate_file_header_tokens
+
+# Diff tokens per LLM call; leaves room for the prompt template and keeps the
+# generated comments well under the model's output cap
+DEFAULT_SHARD_TOKEN_BUDGET = 6000
+
+Shard = List[Dict[str, Any]]
+
+
+class DiffSharder:
+    """
+    Splits a structured diff into batches that each fit a token budget.
+
+    Files are packed whole while they fit, larger files are split at hunk
+    boundaries, and only a single hunk that is larger than the budget on its
+    own is split between lines.
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_SHARD_TOKEN_BUDGET,
+                 cost_fn: Callable[[Dict[str, Any]], int] = estimate_chunk_tokens):
+        if token_budget <= 0:
+            raise ValueError("token_budget must be positive")
+        self.token_budget = token_budget
+        self.cost_fn = cost_fn
+
+    def shard(self, structured_diff: Iterable[Dict[str, Any]]) -> List[Shard]:
+        return list(self.iter_shards(structured_diff))
+
+    def iter_shards(self, structured_diff: Iterable[Dict[str, Any]]) -> Iterator[Shard]:
+        """
+        Yield shards while the diff is still being read, so a streamed diff is
+        consumed one file at a time and each shard can be reviewed as soon as
+        it is full.
+        """
+        packer = self.packer()
+        for file_diff in structured_diff:
+            yield from packer.add(file_diff)
+        yield from packer.finish()
+
+    def packer(self) -> "ShardPacker":
+        """Push-based form of `iter_shards`, for files that arrive asynchronously."""
+        return ShardPacker(self)
+
+    def split_oversized(self, path: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Break chunks larger than the budget (less the file header that goes
+        with them) into consecutive line ranges. The parts keep their hunk's
+        start lines and are the unit the review cache stores, so lookups must
+        split the same way first.
+        """
+        budget = max(1, self.token_budget - estimate_file_header_tokens(path))
+        result = []
+        for chunk in chunks:
+            if self.cost_fn(chunk) <= budget:
+                result.append(chunk)
+                continue
+            part = {**chunk, 'changes': []}
+            part_tokens = 0
+            for change in chunk['changes']:
+                change_tokens = self.cost_fn({**chunk, 'changes': [change]})
+                if part['changes'] and part_tokens + change_tokens > budget:
+                    result.append(part)
+                    part, part_tokens = {**chunk, 'changes': []}, 0
+                part['changes'].append(change)
+                part_tokens += change_tokens
+            if any(change['type'] != 'CONTEXT' for change in part['changes']):
+                result.append(part)
+        return result
+
+
+class ShardPacker:
+    """Packs files into shards as they are added; see `DiffSharder.iter_shards`."""
+
+    def __init__(self, sharder: DiffSharder):
+        self.sharder = sharder
+        self._current: Shard = []
+        self._current_tokens = 0
+        self.files = 0
+        self.shards = 0
+
+    def add(self, file_diff: Dict[str, Any]) -> List[Shard]:
+        """Add one file and return the shards it completed."""
+        sharder = self.sharder
+        completed: List[Shard] = []
+        self.files += 1
+        path = file_diff['file']
+        header = estimate_file_header_tokens(path)
+        for chunk in sharder.split_oversized(path, file_diff['chunks']):
+            cost = sharder.cost_fn(chunk)
+            # The file's header is repeated in every shard the file spans
+            same_file = bool(self._current) and self._current[-1]['file'] == path
+            if self._current and self._current_tokens + cost + (0 if same_file else header) > sharder.token_budget:
+                completed.append(self._current)
+                self._current, self._current_tokens = [], 0
+                same_file = False
+            if same_file:
+                self._current[-1]['chunks'].append(chunk)
+            else:
+                self._current.append({'file': path, 'chunks': [chunk]})
+                self._current_tokens += header
+            self._current_tokens += cost
+        self.shards += len(completed)
+        return completed
+
+    def finish(self) -> List[Shard]:
+        """Return the last, partly filled shard."""
+        completed = [self._current] if self._current else []
+        self._current, self._current_tokens = [], 0
+        self.shards += len(completed)
+        logger.info(f"Split {self.files} files into {self.shards} shard(s) of at most {self.sharder.token_budget} tokens")
+        return completed
@@ -0,0 +1,213 @@
+import os
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+
+from loguru import logger
+
+from auto_lgtm.models.diff_model import DiffFile, DiffFileBuilder
+
+DEFAULT_MAX_FILE_LINES = 5000
+DEFAULT_MAX_FILE_BYTES = 512 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 20 * 1024 * 1024
+
+
+@dataclass
+class DiffLimits:
+    """
+    Ceilings applied while a diff is parsed.
+
+    A file that exceeds `max_file_lines` or `max_file_bytes` is truncated at
+    the limit (`oversized="truncate"`) or dropped (`oversized="skip"`); the
+    rest of its diff is read and discarded without being stored. Once
+    `max_total_bytes` of diff have been read, parsing stops, and the file
+    it stopped in is truncated or dropped the same way.
+    """
+    max_file_lines: Optional[int] = DEFAULT_MAX_FILE_LINES
+    max_file_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES
+    max_total_bytes: Optional[int] = DEFAULT_MAX_TOTAL_BYTES
+    oversized: str = "truncate"
+
+    def __post_init__(self):
+        if self.oversized not in ("truncate", "skip"):
+            raise ValueError(f"oversized must be 'truncate' or 'skip', not {self.oversized!r}")
+
+    @classmethod
+    def from_env(cls) -> "DiffLimits":
+        def optional_int(name: str, default: int) -> Optional[int]:
+            value = int(os.getenv(name, default))
+            return value if value > 0 else None
+
+        return cls(
+            max_file_lines=optional_int("DIFF_MAX_FILE_LINES", DEFAULT_MAX_FILE_LINES),
+            max_file_bytes=optional_int("DIFF_MAX_FILE_BYTES", DEFAULT_MAX_FILE_BYTES),
+            max_total_bytes=optional_int("DIFF_MAX_TOTAL_BYTES", DEFAULT_MAX_TOTAL_BYTES),
+            oversized=os.getenv("DIFF_OVERSIZED_POLICY", "truncate"),
+        )
+
+    @classmethod
+    def unlimited(cls) -> "DiffLimits":
+        return cls(max_file_lines=None, max_file_bytes=None, max_total_bytes=None)
+
+
+def iter_text_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Split a stream of decoded text chunks on newlines, holding one partial line at most."""
+    pending = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        *complete, pending = pending.split('\n')
+        yield from complete
+    if pending:
+        yield pending
+
+
+def iter_parse_diff(lines: Iterable[str], limits: Optional[DiffLimits] = None) -> Iterator[DiffFile]:
+    """
+    Parse a unified diff line by line and yield one compact `DiffFile` at a
+    time. Each reads like the dicts `GitHubService.parse_diff` used to return:
+    `{'file': path, 'chunks': [{'old_start', 'new_start', 'changes': [...]}]}`.
+
+    Only the file being parsed is held in memory. A truncated file carries
+    `'truncated': True`.
+    """
+    parser = DiffStreamParser(limits)
+    for line in lines:
+        finished = parser.feed(line)
+        if finished is not None:
+            yield finished
+        if parser.done:
+            break
+    finished = parser.close()
+    if finished is not None:
+        yield finished
+
+
+async def aiter_text_lines(chunks: AsyncIterable[str]) -> AsyncIterator[str]:
+    """`iter_text_lines` for an async stream of decoded text chunks."""
+    pending = ""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        *complete, pending = pending.split('\n')
+        for line in complete:
+            yield line
+    if pending:
+        yield pending
+
+
+async def aiter_parse_diff(lines: AsyncIterable[str], limits: Optional[DiffLimits] = None) -> AsyncIterator[DiffFile]:
+    """`iter_parse_diff` for an async stream of lines."""
+    parser = DiffStreamParser(limits)
+    async for line in lines:
+        finished = parser.feed(line)
+        if finished is not None:
+            yield finished
+        if parser.done:
+            break
+    finished = parser.close()
+    if finished is not None:
+        yield finished
+
+
+class DiffStreamParser:
+    """
+    Push-based unified diff parser behind `iter_parse_diff`: `feed` it one
+    line at a time and it returns each file as soon as the next one starts.
+    `done` turns True once `max_total_bytes` is exceeded; `close` returns the
+    last file.
+    """
+
+    def __init__(self, limits: Optional[DiffLimits] = None):
+        self.limits = limits or DiffLimits.unlimited()
+        self.done = False
+        self._builder: Optional[DiffFileBuilder] = None
+        self._new_line = 0
+        self._old_line = 0
+        self._file_lines = 0
+        self._file_bytes = 0
+        self._total_bytes = 0
+        self._over_limit = False
+
+    def feed(self, line: str) -> Optional[DiffFile]:
+        """Parse one line; returns the previous file when this line starts a new one."""
+        if self.done:
+            return None
+        limits = self.limits
+        line = line.rstrip('\n')
+        self._total_bytes += len(line) + 1
+        if limits.max_total_bytes is not None and self._total_bytes > limits.max_total_bytes:
+            logger.warning(f"Diff exceeds {limits.max_total_bytes} bytes; ignoring the remaining files")
+            self.done = True
+            if line.startswith('diff --git'):
+                # The previous file was read in full
+                finished = self._finish_file()
+                self._builder = None
+                return finished
+            if self._builder is not None:
+                # The file being parsed is cut short like one over its own limits
+                self._over_limit = True
+                if limits.oversized == "skip":
+                    self._builder.clear()
+            return None
+
+        if line.startswith('diff --git'):
+            finished = self._finish_file()
+            self._builder = DiffFileBuilder(line.split(' ')[2][2:])
+            self._file_lines = self._file_bytes = 0
+            self._over_limit = False
+            return finished
+        builder = self._builder
+        if builder is None or self._over_limit:
+            return None
+
+        self._file_lines += 1
+        self._file_bytes += len(line) + 1
+        if (limits.max_file_lines is not None and self._file_lines > limits.max_file_lines) or \
+                (limits.max_file_bytes is not None and self._file_bytes > limits.max_file_bytes):
+            self._over_limit = True
+            if limits.oversized == "skip":
+                builder.clear()
+            return None
+
+        if line.startswith('@@'):
+            numbers = line.split(' ')[1:3]
+            self._old_line = int(numbers[0].split(',')[0][1:])
+            self._new_line = int(numbers[1].split(',')[0][1:])
+            builder.start_hunk(self._old_line, self._new_line)
+        elif not builder.in_hunk:
+            # File headers (---/+++, index, mode lines) before the first hunk
+            return None
+        elif line.startswith('+'):
+            builder.add('ADDITION', self._new_line, line[1:])
+            self._new_line += 1
+        elif line.startswith('-'):
+            # Deletions are numbered in the base file so they map to the LEFT side of the diff
+            builder.add('DELETION', self._old_line, line[1:])
+            self._old_line += 1
+        elif line.startswith(' '):
+            # Unchanged line, kept as context for the reviewer
+            builder.add('CONTEXT', self._new_line, line[1:])
+            self._new_line += 1
+            self._old_line += 1
+        return None
+
+    def close(self) -> Optional[DiffFile]:
+        """Return the file still being parsed, if any."""
+        finished = self._finish_file()
+        self._builder = None
+        return finished
+
+    def _finish_file(self) -> Optional[DiffFile]:
+        builder = self._builder
+        if builder is None:
+            return None
+        if self._over_limit and self.limits.oversized == "skip":
+            logger.warning(f"Skipping oversized diff of {builder.path} "
+                           f"({self._file_lines} lines, {self._file_bytes} bytes)")
+            return None
+        if self._over_limit:
+            logger.warning(f"Truncated oversized diff of {builder.path} "
+                           f"({self._file_lines} lines, {self._file_bytes} bytes)")
+        return builder.build(truncated=self._over_limit)
@@ -0,0 +1,281 @@
+import asyncio
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from auto_lgtm.models.diff_model import iter_change_rows
+from auto_lgtm.prompts.diff_serializer import estimate_tokens
+from auto_lgtm.services.blob_cache import BlobCache, get_default_blob_cache
+
+DEFAULT_CONTEXT_RADIUS = 8
+DEFAULT_MAX_FILE_LINES = 60
+# Context tokens added to one shard's prompt, on top of the shard's diff budget
+DEFAULT_MAX_SHARD_TOKENS = 1500
+# How far above a hunk the enclosing function or class header is looked for
+SCOPE_LOOKBACK = 400
+IMPORT_SCAN_LINES = 150
+# Longer lines (minified code, generated tables) are never scope headers or imports worth showing
+MAX_SCAN_LINE_CHARS = 300
+
+# (line number in the new file, code) of one surrounding line
+ContextRows = List[Tuple[int, str]]
+
+_MODIFIERS = r"(?:(?:export|default|public|private|protected|internal|static|abstract|final|async|override|pub(?:\([^)]*\))?)\s+)*"
+_SCOPE_PATTERN = re.compile(
+    rf"^\s*{_MODIFIERS}(?:def|class|function|func|fn|interface|struct|enum|impl|trait|module|namespace|object|record)\b"
+)
+_CONTROL_FLOW_PATTERN = re.compile(r"^\s*(?:if|for|while|switch|catch|else|do|try|return)\b")
+_IMPORT_PATTERN = re.compile(
+    r"^(?:import\b|from\s+\S+\s+import\b|#\s*include\b|using\s+[\w.]+\s*;|package\s|use\s+[\w:]+|"
+    r"require\b|(?:const|let|var)\s+.+=\s*require\()"
+)
+
+
+@dataclass
+class ContextConfig:
+    enabled: bool = True
+    radius: int = DEFAULT_CONTEXT_RADIUS
+    max_file_lines: int = DEFAULT_MAX_FILE_LINES
+    max_shard_tokens: int = DEFAULT_MAX_SHARD_TOKENS
+    imports: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ContextConfig":
+        """Read the REVIEW_CONTEXT* environment variables."""
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("REVIEW_CONTEXT", "true").lower() in ("1", "true", "yes"),
+            radius=int(os.getenv("REVIEW_CONTEXT_RADIUS", defaults.radius)),
+            max_file_lines=int(os.getenv("REVIEW_CONTEXT_MAX_FILE_LINES", defaults.max_file_lines)),
+            max_shard_tokens=int(os.getenv("REVIEW_CONTEXT_MAX_SHARD_TOKENS", defaults.max_shard_tokens)),
+            imports=os.getenv("REVIEW_CONTEXT_IMPORTS", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def cache_tag(self) -> str:
+        """Folded into the review cache namespace; a different context selection changes the answer."""
+        return f"context:{self.radius},{self.max_file_lines},{self.max_shard_tokens},{int(self.imports)}"
+
+
+def _is_brace_scope(line: str) -> bool:
+    """
+    `Type name(args) {` in brace languages, excluding control flow: no `;`
+    anywhere and no `=` outside the parentheses. Plain string scans rather
+    than a regex, whose nested wildcards backtrack badly on long lines.
+    """
+    head = line.rstrip()
+    if not head.endswith("{") or _CONTROL_FLOW_PATTERN.match(head):
+        return False
+    head = head[:-1]
+    open_paren, close_paren = head.find("("), head.rfind(")")
+    return (";" not in head and open_paren != -1 and close_paren > open_paren
+            and "=" not in head[:open_paren] and "=" not in head[close_paren + 1:])
+
+
+def _indent(line: str) -> int:
+    return len(line.expandtabs(4)) - len(line.lstrip())
+
+
+def hunk_span(chunk: Any) -> Optional[Tuple[int, int]]:
+    """First and last new-file line shown by a hunk, or None for a hunk of deletions only."""
+    lines = [line for kind, line, _ in iter_change_rows(chunk) if kind != 'DELETION']
+    return (min(lines), max(lines)) if lines else None
+
+
+def enclosing_scopes(lines: Sequence[str], line: int, lookback: int = SCOPE_LOOKBACK) -> List[int]:
+    """
+    Line numbers of the function/class headers enclosing `line`, innermost
+    first, found by walking up to ever smaller indentation.
+    """
+    target = None
+    for n in range(line, min(len(lines), line + 5) + 1):
+        if lines[n - 1].strip():
+            target = _indent(lines[n - 1])
+            break
+    if not target:
+        return []
+    scopes = []
+    for n in range(line - 1, max(0, line - 1 - lookback), -1):
+        text = lines[n - 1]
+        stripped = text.strip()
+        if not stripped or stripped[0] in "}])#@" or stripped.startswith("//") or len(text) > MAX_SCAN_LINE_CHARS:
+            continue
+        indent = _indent(text)
+        if indent >= target:
+            continue
+        if _SCOPE_PATTERN.match(text) or _is_brace_scope(text):
+            scopes.append(n)
+        target = indent
+        if indent == 0:
+            break
+    return scopes
+
+
+def import_lines(lines: Sequence[str], scan: int = IMPORT_SCAN_LINES) -> List[int]:
+    """Line numbers of the top-level import statements near the top of a file, with parenthesized continuations."""
+    result = []
+    open_paren = False
+    for n, text in enumerate(lines[:scan], start=1):
+        if open_paren:
+            result.append(n)
+            open_paren = ")" not in text
+        elif len(text) <= MAX_SCAN_LINE_CHARS and _IMPORT_PATTERN.match(text):
+            result.append(n)
+            open_paren = text.rstrip().endswith("(")
+    return result
+
+
+def select_context(lines: Sequence[str], chunks: Sequence[Any], config: ContextConfig) -> ContextRows:
+    """
+    Pick the surrounding lines of a file worth showing next to its hunks, at
+    most `config.max_file_lines`: first the headers of the enclosing scopes,
+    then the imports (up to half the budget), then the lines nearest each
+    hunk within `config.radius`. Lines the hunks already show are skipped.
+    """
+    spans = [span for span in (hunk_span(chunk) for chunk in chunks) if span]
+    if not spans:
+        return []
+    chosen = set()
+
+    def take(n: int) -> None:
+        if len(chosen) < config.max_file_lines and 1 <= n <= len(lines) and n not in chosen \
+                and not any(start <= n <= end for start, end in spans):
+            chosen.add(n)
+
+    for start, _ in spans:
+        for n in enclosing_scopes(lines, start):
+            take(n)
+    if config.imports:
+        for n in import_lines(lines)[:config.max_file_lines // 2]:
+            take(n)
+    for distance in range(1, config.radius + 1):
+        for start, end in spans:
+            take(start - distance)
+            take(end + distance)
+    return [(n, lines[n - 1]) for n in sorted(chosen)]
+
+
+def _to_lines(text: Optional[str]) -> Optional[List[str]]:
+    if text is None or "\0" in text:
+        # Binary content has no useful context
+        return None
+    lines = [line.rstrip("\r") for line in text.split("\n")]
+    if lines and not lines[-1]:
+        # The newline ending the last line does not start another one
+        lines.pop()
+    return lines
+
+
+class FileContextProvider:
+    """
+    Surrounding code for the files of a shard, read from the PR's head blobs.
+
+    Blob SHAs come from the `/files` listing already fetched for the position
+    index, so finding them costs no request; contents go through the
+    content-addressed `BlobCache`. Within one review every blob is fetched
+    at most once, even when its file is split across concurrent shards.
+    `for_shard` needs a `GitHubService` (or a `LocalGitRepo`), `afor_shard`
+    an `AsyncGitHubService`. A file whose content cannot be fetched is
+    reviewed without context.
+    """
+
+    def __init__(self, github_service: Any, repo: str, blob_shas: Mapping[str, str],
+                 config: Optional[ContextConfig] = None, cache: Optional[BlobCache] = None):
+        self.github_service = github_service
+        self.repo = repo
+        self.blob_shas = blob_shas
+        self.config = config or ContextConfig.from_env()
+        self.cache = cache or get_default_blob_cache()
+        self._lines: Dict[str, Optional[List[str]]] = {}
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._fetches: Dict[str, "asyncio.Future[Optional[List[str]]]"] = {}
+
+    def for_shard(self, shard: Sequence[Mapping[str, Any]]) -> Dict[str, ContextRows]:
+        files = {}
+        for path in self._wanted(shard):
+            files[path] = self._file_lines(self.blob_shas[path])
+        return self._select(shard, files)
+
+    async def afor_shard(self, shard: Sequence[Mapping[str, Any]]) -> Dict[str, ContextRows]:
+        paths = self._wanted(shard)
+        contents = await asyncio.gather(*(self._afile_lines(self.blob_shas[path]) for path in paths),
+                                        return_exceptions=True)
+        # Scanning whole files is CPU work; keep it off the loop every review shares
+        return await asyncio.to_thread(self._select, shard, dict(zip(paths, contents)))
+
+    def _wanted(self, shard: Sequence[Mapping[str, Any]]) -> List[str]:
+        """Paths worth fetching: known blobs, not known to be oversized, whose diff was not truncated."""
+        return [file_diff['file'] for file_diff in shard
+                if file_diff['file'] in self.blob_shas and not file_diff.get('truncated')
+                and not self.cache.is_oversized(self.blob_shas[file_diff['file']])]
+
+    def _select(self, shard: Sequence[Mapping[str, Any]], files: Mapping[str, Any]) -> Dict[str, ContextRows]:
+        context: Dict[str, ContextRows] = {}
+        tokens = 0
+        for file_diff in shard:
+            path = file_diff['file']
+            lines = files.get(path)
+            if isinstance(lines, Exception):
+                logger.warning(f"Reviewing {path} without context: {lines}")
+                continue
+            if isinstance(lines, BaseException):
+                raise lines
+            if not lines:
+                continue
+            rows = select_context(lines, file_diff['chunks'], self.config)
+            cost = sum(estimate_tokens(text) + 2 for _, text in rows)
+            if tokens + cost > self.config.max_shard_tokens:
+                continue
+            tokens += cost
+            context[path] = rows
+        return context
+
+    def _file_lines(self, sha: str) -> Optional[List[str]]:
+        with self._lock:
+            lock = self._fetch_locks.setdefault(sha, threading.Lock())
+        with lock:
+            if sha not in self._lines:
+                text = self.cache.get(sha)
+                if text is None:
+                    try:
+                        text = self.github_service.fetch_blob_text(self.repo, sha, self.cache.max_blob_bytes)
+                        self._store(sha, text)
+                    except Exception as e:
+                        logger.warning(f"Reviewing blob {sha[:7]} without context: {e}")
+                self._lines[sha] = _to_lines(text)
+            return self._lines[sha]
+
+    async def _afile_lines(self, sha: str) -> Optional[List[str]]:
+        fetch = self._fetches.get(sha)
+        if fetch is None:
+            fetch = self._fetches[sha] = asyncio.ensure_future(self._aload(sha))
+        # Shielded: a cancelled shard must not cancel the fetch other shards wait on
+        return await asyncio.shield(fetch)
+
+    async def _aload(self, sha: str) -> Optional[List[str]]:
+        # The cache may be SQLite; its calls run in threads so they never stall the loop
+        text = await asyncio.to_thread(self.cache.get, sha)
+        if text is None:
+            text = await self.github_service.fetch_blob_text(self.repo, sha, self.cache.max_blob_bytes)
+            await asyncio.to_thread(self._store, sha, text)
+        return _to_lines(text)
+
+    def _store(self, sha: str, text: Optional[str]) -> None:
+        if text is None:
+            logger.info(f"Blob {sha[:7]} is over {self.cache.max_blob_bytes} characters; reviewing it without context")
+            self.cache.mark_oversized(sha)
+        else:
+            self.cache.put(sha, text)
+
+
+def build_context_provider(github_service: Any, repo: str, blob_shas: Mapping[str, str],
+                           config: Optional[ContextConfig] = None) -> Optional[FileContextProvider]:
+    """A `FileContextProvider` configured from the environment, or None when REVIEW_CONTEXT is off."""
+    config = config or ContextConfig.from_env()
+    if not config.enabled:
+        return None
+    return FileContextProvider(github_service, repo, blob_shas, config)
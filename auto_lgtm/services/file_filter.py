@@ -0,0 +1,234 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from auto_lgtm.models.diff_model import iter_change_rows
+from auto_lgtm.prompts.diff_serializer import estimate_chunk_tokens, estimate_file_header_tokens
+
+# Files whose diffs cost prompt tokens without anything worth reviewing
+DEFAULT_EXCLUDE_GLOBS = (
+    # Lockfiles
+    "*.lock", "package-lock.json", "npm-shrinkwrap.json", "pnpm-lock.yaml", "go.sum",
+    # Minified and generated bundles, source maps, snapshots
+    "*.min.js", "*.min.css", "*.map", "*.snap", "**/__snapshots__/**",
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.generated.*",
+    # Vendored dependencies and build output
+    "vendor/**", "third_party/**", "node_modules/**", "dist/**", "build/**",
+    # Binary assets
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.ico", "*.pdf", "*.zip", "*.gz", "*.tar", "*.jar",
+    "*.woff", "*.woff2", "*.ttf", "*.so", "*.dylib", "*.dll", "*.exe", "*.pyc",
+)
+DEFAULT_MAX_CHANGED_LINES = 1500
+DEFAULT_MAX_DIFF_BYTES = 200 * 1024
+_LINGUIST_SKIP_ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a gitignore-style glob into a regular expression.
+
+    `*` and `?` stay within one path segment, `**` spans segments, and a
+    pattern without a `/` matches the file name in any directory.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+    result = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                result.append(re.escape(char))
+            else:
+                result.append(pattern[i:end + 1].replace("[!", "[^", 1))
+                i = end
+        else:
+            result.append(re.escape(char))
+        i += 1
+    body = "".join(result)
+    return body if anchored else f"(?:.*/)?{body}"
+
+
+class GlobMatcher:
+    """A list of globs compiled into one regular expression."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = tuple(p for p in patterns if p)
+        self._regex = re.compile(
+            "|".join(f"(?:{glob_to_regex(p)})" for p in self.patterns)
+        ) if self.patterns else None
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def matches(self, path: str) -> bool:
+        return self._regex is not None and self._regex.fullmatch(path) is not None
+
+
+def parse_gitattributes(text: str) -> List[Tuple[re.Pattern, str, bool]]:
+    """
+    Extract the linguist-generated/-vendored rules of a `.gitattributes` file
+    as (compiled pattern, attribute, set) triples in file order. Later rules
+    win per attribute, as in git.
+    """
+    rules = []
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        pattern, *attributes = line.split()
+        for attribute in attributes:
+            name, _, value = attribute.lstrip("-!").partition("=")
+            if name not in _LINGUIST_SKIP_ATTRIBUTES:
+                continue
+            unset = attribute.startswith(("-", "!")) or value.lower() in ("false", "0")
+            rules.append((re.compile(glob_to_regex(pattern)), name, not unset))
+    return rules
+
+
+@dataclass
+class SkippedFile:
+    path: str
+    reason: str
+    tokens: int
+
+
+@dataclass
+class FilterReport:
+    kept: int = 0
+    skipped: List[SkippedFile] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(skipped.tokens for skipped in self.skipped)
+
+    def summary(self) -> str:
+        if not self.skipped:
+            return f"File filter kept all {self.kept} files"
+        details = ", ".join(f"{s.path} ({s.reason})" for s in self.skipped)
+        return (f"File filter kept {self.kept} files and skipped {len(self.skipped)}, "
+                f"saving ~{self.tokens_saved} prompt tokens: {details}")
+
+
+@dataclass
+class FileFilterConfig:
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = DEFAULT_EXCLUDE_GLOBS
+    max_changed_lines: Optional[int] = DEFAULT_MAX_CHANGED_LINES
+    max_diff_bytes: Optional[int] = DEFAULT_MAX_DIFF_BYTES
+    use_gitattributes: bool = True
+
+    @classmethod
+    def from_env(cls) -> "FileFilterConfig":
+        """
+        REVIEW_INCLUDE_GLOBS limits the review to matching files, and
+        REVIEW_EXCLUDE_GLOBS adds to the default exclusions (both comma
+        separated). REVIEW_MAX_CHANGED_LINES and REVIEW_MAX_DIFF_BYTES set
+        per-file thresholds (0 disables), REVIEW_USE_GITATTRIBUTES=false
+        ignores linguist markers.
+        """
+        def globs(name: str) -> Tuple[str, ...]:
+            return tuple(p.strip() for p in os.getenv(name, "").split(",") if p.strip())
+
+        def optional_int(name: str, default: int) -> Optional[int]:
+            value = int(os.getenv(name, default))
+            return value if value > 0 else None
+
+        return cls(
+            include=globs("REVIEW_INCLUDE_GLOBS"),
+            exclude=DEFAULT_EXCLUDE_GLOBS + globs("REVIEW_EXCLUDE_GLOBS"),
+            max_changed_lines=optional_int("REVIEW_MAX_CHANGED_LINES", DEFAULT_MAX_CHANGED_LINES),
+            max_diff_bytes=optional_int("REVIEW_MAX_DIFF_BYTES", DEFAULT_MAX_DIFF_BYTES),
+            use_gitattributes=os.getenv("REVIEW_USE_GITATTRIBUTES", "true").lower() in ("1", "true", "yes"),
+        )
+
+
+class FileFilter:
+    """
+    Drops files that are not worth sending to the LLM: excluded or
+    not-included globs, files marked linguist-generated or linguist-vendored
+    in `.gitattributes`, binary files (no hunks) and diffs above the per-file
+    line or byte threshold. Works lazily on a streamed diff; what was skipped,
+    and the prompt tokens that saved, accumulate in `report`.
+    """
+
+    def __init__(self, config: Optional[FileFilterConfig] = None, gitattributes: Optional[str] = None):
+        self.config = config or FileFilterConfig()
+        self._include = GlobMatcher(self.config.include)
+        self._exclude = GlobMatcher(self.config.exclude)
+        self._linguist_rules = parse_gitattributes(gitattributes) \
+            if gitattributes and self.config.use_gitattributes else []
+        self.report = FilterReport()
+
+    def skip_reason(self, file_diff: Dict[str, Any]) -> Optional[str]:
+        """Return why a file should be skipped, or None to review it."""
+        path = file_diff['file']
+        if self._include and not self._include.matches(path):
+            return "not included"
+        if self._exclude.matches(path):
+            return "excluded"
+        if self._is_linguist_skipped(path):
+            return "linguist-generated/vendored"
+        chunks = file_diff['chunks']
+        if not chunks:
+            return "binary or no text changes"
+        if self.config.max_changed_lines is None and self.config.max_diff_bytes is None:
+            return None
+        changed = size = 0
+        for chunk in chunks:
+            for kind, _, content in iter_change_rows(chunk):
+                size += len(content) + 1
+                if kind != 'CONTEXT':
+                    changed += 1
+        if self.config.max_changed_lines is not None and changed > self.config.max_changed_lines:
+            return f"{changed} changed lines"
+        if self.config.max_diff_bytes is not None and size > self.config.max_diff_bytes:
+            return f"{size} bytes of diff"
+        return None
+
+    def filter(self, structured_diff: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for file_diff in structured_diff:
+            if self.keep(file_diff):
+                yield file_diff
+
+    async def afilter(self, structured_diff: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """`filter` for an async stream of files."""
+        async for file_diff in structured_diff:
+            if self.keep(file_diff):
+                yield file_diff
+
+    def keep(self, file_diff: Dict[str, Any]) -> bool:
+        """Decide on one file and record the decision in `report`."""
+        reason = self.skip_reason(file_diff)
+        if reason is None:
+            self.report.kept += 1
+            return True
+        tokens = estimate_file_header_tokens(file_diff['file']) + \
+            sum(estimate_chunk_tokens(chunk) for chunk in file_diff['chunks'])
+        self.report.skipped.append(SkippedFile(file_diff['file'], reason, tokens))
+        logger.debug(f"Skipping {file_diff['file']}: {reason} (~{tokens} tokens)")
+        return False
+
+    def _is_linguist_skipped(self, path: str) -> bool:
+        """Skip a path if either linguist attribute is still set after all rules apply."""
+        state = dict.fromkeys(_LINGUIST_SKIP_ATTRIBUTES, False)
+        for pattern, name, value in self._linguist_rules:
+            if pattern.fullmatch(path):
+                state[name] = value
+        return any(state.values())
@@ -1,90 +1,101 @@
-import requests
-from typing import Any, List, Dict, Literal
+from typing import Any, Iterator, List, Dict, Literal, Optional, Tuple
 from auto_lgtm.models.review_models import ChangeType
 from auto_lgtm.common.github_client import GitHubApiClient
+from auto_lgtm.common.diff_position_index import DiffPositionIndex
+from auto_lgtm.common.rate_limiter import Priority
+from auto_lgtm.models.diff_model import DiffFile
+from auto_lgtm.services.diff_stream import DiffLimits, iter_parse_diff, iter_text_lines
 from requests.exceptions import RequestException
 from loguru import logger
 from typing import Union
 
+# GitHub caps the page size of the /files listing at 100 entries
+PR_FILES_PAGE_SIZE = 100
+
 class GitHubService:
     def __init__(self, api_client: GitHubApiClient):
         self.api_client: GitHubApiClient = api_client
+        self._position_indexes: Dict[Tuple[str, int], DiffPositionIndex] = {}
 
-    def fetch_pull_requests(self, repo: str, state: str = "open"):
+    def fetch_pull_requests(self, repo: str, state: str = "open",
+                            priority: Priority = Priority.OPTIONAL) -> List[Dict[str, Any]]:
+        """
+        Fetch every page of the pull requests of a repository in `state`.
+        """
         endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls"
-        return self.api_client.get(endpoint, params={"state": state})
-
-    def fetch_pr_diff(self, repo: str, pr_number: int) -> List[Dict[str, Any]]:
-        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}"
+        pulls: List[Dict[str, Any]] = []
+        page = 1
         try:
-            with self.api_client.with_headers({"Accept": "application/vnd.github.v3.diff"}):
-                diff_content = self.api_client.get(endpoint, return_text=True)
-                return self.parse_diff(diff_content)
+            while True:
+                batch = self.api_client.get(endpoint, params={"state": state, "per_page": PR_FILES_PAGE_SIZE,
+                                                              "page": page}, priority=priority)
+                pulls.extend(batch)
+                if len(batch) < PR_FILES_PAGE_SIZE:
+                    break
+                page += 1
         except RequestException as e:
             if hasattr(e.response, 'status_code'):
                 if e.response.status_code == 404:
-                    raise GitHubServiceError(f"PR not found. Please check if repository '{repo}' and PR number {pr_number} are correct.")
+                    raise GitHubServiceError(f"Repository '{repo}' not found.")
                 elif e.response.status_code == 403:
                     raise GitHubServiceError(f"Access forbidden. Please check if your token has sufficient permissions and the repository exists.")
-            raise GitHubServiceError(f"Failed to fetch PR diff: {str(e)}")
+            raise GitHubServiceError(f"Failed to fetch pull requests: {str(e)}")
+        return pulls
+
+    def fetch_pr_diff(self, repo: str, pr_number: int, limits: Optional[DiffLimits] = None) -> List[DiffFile]:
+        """Fetch and parse the whole PR diff; see `iter_pr_diff`."""
+        return list(self.iter_pr_diff(repo, pr_number, limits))
+
+    def fetch_compare_diff(self, repo: str, base_sha: str, head_sha: str,
+                           limits: Optional[DiffLimits] = None) -> List[DiffFile]:
+        """
+        Fetch and parse the diff between two commits (`base...head`). The body
+        is streamed and parsed under `limits` like `iter_pr_diff`, so only the
+        compact parsed files are held in memory.
+        """
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/compare/{base_sha}...{head_sha}"
+        try:
+            with self.api_client.with_headers({"Accept": "application/vnd.github.v3.diff"}):
+                chunks = self.api_client.stream_text(endpoint)
+            return list(iter_parse_diff(iter_text_lines(chunks), limits or DiffLimits.from_env()))
+        except RequestException as e:
+            if hasattr(e.response, 'status_code') and e.response.status_code == 404:
+                raise GitHubServiceError(f"Cannot compare {base_sha[:7]}...{head_sha[:7]} in '{repo}'; the base commit may have been force-pushed away.")
+            raise GitHubServiceError(f"Failed to fetch compare diff: {str(e)}")
 
-    def parse_diff(self, diff_content: str) -> List[Dict[str, Any]]:
+    def parse_diff(self, diff_content: str) -> List[DiffFile]:
         """Parse the diff content and return a structured format with line numbers.
         
         Args:
             diff_content: The raw diff content from GitHub
             
         Returns:
-            List of dictionaries containing structured diff information
+            List of compact `DiffFile` records, readable as the
+            `{'file', 'chunks'}` dictionaries of the structured diff
         """
-        structured_diff = []
-        current_file = None
-        current_chunk = None
-        current_line_number = 0
-        
-        for line in diff_content.split('\n'):
-            if line.startswith('diff --git'):
-                if current_file is not None:
-                    structured_diff.append(current_file)
-                current_file = {
-                    'file': line.split(' ')[2][2:],
-                    'chunks': []
-                }
-                current_chunk = None
-                current_line_number = 0
-            elif line.startswith('@@'):
-                if current_chunk is not None and current_file is not None:
-                    current_file['chunks'].append(current_chunk)
-                numbers = line.split(' ')[1:3]
-                old_start = int(numbers[0].split(',')[0][1:])
-                new_start = int(numbers[1].split(',')[0][1:])
-                current_chunk = {
-                    'old_start': old_start,
-                    'new_start': new_start,
-                    'changes': []
-                }
-                current_line_number = new_start
-            elif line.startswith('+') or line.startswith('-'):
-                if current_chunk is not None:
-                    change_type = 'ADDITION' if line.startswith('+') else 'DELETION'
-                    current_chunk['changes'].append({
-                        'type': change_type,
-                        'line': current_line_number if change_type == 'ADDITION' else current_line_number - 1,
-                        'content': line[1:]  # Remove the + or - prefix
-                    })
-                    if change_type == 'ADDITION':
-                        current_line_number += 1
-            elif line.startswith(' '):
-                # Unchanged line
-                current_line_number += 1
-        
-        # Add the last file and chunk if they exist
-        if current_chunk is not None and current_file is not None:
-            current_file['chunks'].append(current_chunk)
-        if current_file is not None:
-            structured_diff.append(current_file)
-            
-        return structured_diff
+        return list(iter_parse_diff(diff_content.split('\n')))
+
+    def iter_pr_diff(self, repo: str, pr_number: int, limits: Optional[DiffLimits] = None) -> Iterator[DiffFile]:
+        """Stream the PR diff from GitHub and yield one parsed file at a time.
+
+        The response body is consumed in chunks; oversized files are
+        truncated or skipped as they are read according to `limits` (DIFF_*
+        environment variables by default). Diffs that fit the conditional
+        cache's entry limit are kept for ETag revalidation, so re-reviewing an
+        unchanged PR diff costs a 304.
+        """
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}"
+        try:
+            with self.api_client.with_headers({"Accept": "application/vnd.github.v3.diff"}):
+                chunks = self.api_client.stream_text(endpoint)
+            yield from iter_parse_diff(iter_text_lines(chunks), limits or DiffLimits.from_env())
+        except RequestException as e:
+            if hasattr(e.response, 'status_code'):
+                if e.response.status_code == 404:
+                    raise GitHubServiceError(f"PR not found. Please check if repository '{repo}' and PR number {pr_number} are correct.")
+                elif e.response.status_code == 403:
+                    raise GitHubServiceError(f"Access forbidden. Please check if your token has sufficient permissions and the repository exists.")
+            raise GitHubServiceError(f"Failed to fetch PR diff: {str(e)}")
 
     def post_review_comment(self, repo: str, pr_number: int, body: str, line_number: int, path: str, 
                           change_type: str, pr_details: dict = None):
@@ -97,7 +108,7 @@ class GitHubService:
             
             clean_path: str = path.replace('b/', '') if path.startswith('b/') else path
             
-            side: Literal['RIGHT'] | Literal['LEFT'] = "RIGHT" if change_type == ChangeType.ADDITION else "LEFT"
+            side: Literal['RIGHT'] | Literal['LEFT'] = ChangeType(change_type).diff_side
             
             lines: List[str] = body.split('\n')
             end_line: int = line_number + len(lines) - 1
@@ -152,7 +163,36 @@ class GitHubService:
                     raise GitHubServiceError(f"Access forbidden. Please check if your token has sufficient permissions and the repository exists.")
             raise GitHubServiceError(f"Failed to fetch PR context: {str(e)}")
 
-    def post_review(self, repo: str, pr_number: int, body: str, comments: list, event: str = "COMMENT"):
+    def fetch_file_text(self, repo: str, path: str, ref: str) -> Optional[str]:
+        """Fetch the raw content of a file at `ref`, or None if it does not exist there."""
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/contents/{path}"
+        try:
+            with self.api_client.with_headers({"Accept": "application/vnd.github.raw+json"}):
+                return self.api_client.get(endpoint, return_text=True, params={"ref": ref})
+        except RequestException as e:
+            if hasattr(e.response, 'status_code') and e.response.status_code == 404:
+                return None
+            raise GitHubServiceError(f"Failed to fetch {path} at {ref[:7]}: {str(e)}")
+
+    def fetch_blob_text(self, repo: str, sha: str, max_size: Optional[int] = None) -> Optional[str]:
+        """
+        Fetch the content of a git blob. It skips the conditional cache: a
+        blob never changes and is cached by SHA instead, see `BlobCache`.
+
+        Returns:
+            The content, or None when it is longer than `max_size` characters;
+            reading stops there instead of downloading the rest
+        """
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/git/blobs/{sha}"
+        try:
+            with self.api_client.with_headers({"Accept": "application/vnd.github.raw+json"}):
+                chunks = self.api_client.stream_text(endpoint, conditional=False)
+            return _join_bounded(chunks, max_size)
+        except RequestException as e:
+            raise GitHubServiceError(f"Failed to fetch blob {sha[:7]}: {str(e)}")
+
+    def post_review(self, repo: str, pr_number: int, body: str, comments: list, event: str = "COMMENT",
+                    commit_id: str = None):
         """
         Post a review to a pull request.
         :param repo: Repository name
@@ -160,6 +200,7 @@ class GitHubService:
         :param body: General review body
         :param comments: List of dicts with keys: path, position, body
         :param event: "COMMENT", "APPROVE", or "REQUEST_CHANGES"
+        :param commit_id: SHA the comments were generated against; defaults to the PR head
         """
         endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}/reviews"
         data = {
@@ -167,46 +208,72 @@ class GitHubService:
             "event": event,
             "comments": comments
         }
+        if commit_id:
+            data["commit_id"] = commit_id
         with self.api_client.with_headers({"Accept": "application/vnd.github+json"}):
             response = self.api_client.post(endpoint, data=data)
         return response
 
-    def get_diff_position(self, repo: str, pr_number: int, file_path: str, line_number: int) -> Union[int, None]:
+    def fetch_pr_files(self, repo: str, pr_number: int) -> List[Dict[str, Any]]:
+        """
+        Fetch every page of the files changed in a pull request.
+        """
+        endpoint = f"/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}/files"
+        files: List[Dict[str, Any]] = []
+        page = 1
+        try:
+            with self.api_client.with_headers({"Accept": "application/vnd.github.v3+json"}):
+                while True:
+                    batch = self.api_client.get(endpoint, params={"per_page": PR_FILES_PAGE_SIZE, "page": page})
+                    files.extend(batch)
+                    if len(batch) < PR_FILES_PAGE_SIZE:
+                        break
+                    page += 1
+        except RequestException as e:
+            if hasattr(e.response, 'status_code'):
+                if e.response.status_code == 404:
+                    raise GitHubServiceError(f"PR not found. Please check if repository '{repo}' and PR number {pr_number} are correct.")
+                elif e.response.status_code == 403:
+                    raise GitHubServiceError(f"Access forbidden. Please check if your token has sufficient permissions and the repository exists.")
+            raise GitHubServiceError(f"Failed to fetch PR files: {str(e)}")
+        logger.debug(f"Fetched {len(files)} changed files in {page} page(s) for PR #{pr_number}")
+        return files
+
+    def build_diff_position_index(self, repo: str, pr_number: int) -> DiffPositionIndex:
+        """
+        Build (or return the cached) diff position index for a pull request.
+        The `/files` listing is fetched once; every later lookup is in-memory.
+        """
+        key = (repo, pr_number)
+        index = self._position_indexes.get(key)
+        if index is None:
+            index = DiffPositionIndex.from_files(self.fetch_pr_files(repo, pr_number))
+            self._position_indexes[key] = index
+        return index
+
+    def get_diff_position(self, repo: str, pr_number: int, file_path: str, line_number: int,
+                          side: Literal['RIGHT'] | Literal['LEFT'] = "RIGHT") -> Union[int, None]:
         """
         Map a file and line number to a diff position for GitHub review comments.
         Returns the diff position (int) or None if not found.
         """
-        url = f"https://api.github.com/repos/{self.api_client.owner}/{repo}/pulls/{pr_number}/files"
-        headers = self.api_client.headers.copy()
-        headers["Accept"] = "application/vnd.github.v3+json"
-        token = headers.get("Authorization").replace("Bearer ", "")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        files = response.json()
-        for f in files:
-            if f["filename"] == file_path:
-                patch = f.get("patch")
-                if not patch:
-                    continue
-                position = 0
-                file_line = 0
-                for line in patch.splitlines():
-                    if line.startswith("@@"):
-                        parts = line.split(" ")
-                        new_file_info = parts[2]  # e.g. "+1,10"
-                        start_line = int(new_file_info.split(",")[0][1:])
-                        file_line = start_line - 1
-                    elif line.startswith("+"):
-                        file_line += 1
-                        position += 1
-                        if file_line == line_number:
-                            return position
-                    elif line.startswith("-"):
-                        position += 1
-                    else:
-                        file_line += 1
-                        position += 1
-        return None
+        index = self.build_diff_position_index(repo, pr_number)
+        return index.position_for(file_path, line_number, side)
+
+def _join_bounded(chunks: Iterator[str], max_size: Optional[int]) -> Optional[str]:
+    """Join streamed text, or close the stream and return None once it exceeds `max_size`."""
+    parts, size = [], 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                return None
+            parts.append(chunk)
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    return "".join(parts)
 
 class GitHubServiceError(Exception):
     """Custom exception for GitHub service errors"""
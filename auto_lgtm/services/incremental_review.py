@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from auto_lgtm.common.diff_position_index import DiffPositionIndex
+from auto_lgtm.models.diff_model import iter_change_rows
+
+
+class ReviewStateStore:
+    """
+    Remembers the last reviewed head SHA of every pull request.
+
+    State lives in memory and, when `path` is set, is mirrored to a JSON file
+    so incremental reviews survive a restart.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_reviewed: Dict[str, str] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._last_reviewed = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable review state file {path}: {e}")
+
+    @staticmethod
+    def _key(owner: str, repo: str, pr_number: int) -> str:
+        return f"{owner}/{repo}#{pr_number}"
+
+    def last_reviewed_sha(self, owner: str, repo: str, pr_number: int) -> Optional[str]:
+        with self._lock:
+            return self._last_reviewed.get(self._key(owner, repo, pr_number))
+
+    def mark_reviewed(self, owner: str, repo: str, pr_number: int, head_sha: str) -> None:
+        with self._lock:
+            self._last_reviewed[self._key(owner, repo, pr_number)] = head_sha
+            if self.path:
+                tmp_path = f"{self.path}.tmp"
+                try:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(self._last_reviewed, f)
+                    os.replace(tmp_path, self.path)
+                except OSError as e:
+                    logger.warning(f"Could not persist review state to {self.path}: {e}")
+
+
+def restrict_to_pr_diff(structured_diff: List[Dict[str, Any]],
+                        position_index: DiffPositionIndex) -> List[Dict[str, Any]]:
+    """
+    Keep only the parts of an incremental (compare) diff that can be commented
+    on in the full PR diff.
+
+    Additions are kept when their head line is part of the PR diff; compare
+    diffs also contain changes merged in from the base branch, which the PR
+    diff does not, so those drop out. Deletions are dropped too: they are
+    numbered against the previously reviewed commit rather than the PR base,
+    so a comment on one could not be placed on the PR diff.
+    """
+    restricted = []
+    for file_diff in structured_diff:
+        path = file_diff['file']
+        if path not in position_index:
+            continue
+        chunks = []
+        for chunk in file_diff['chunks']:
+            if any(change['type'] == 'ADDITION'
+                   and position_index.position_for(path, change['line'], "RIGHT") is not None
+                   for change in chunk['changes']):
+                changes = [
+                    change for change in chunk['changes']
+                    if change['type'] == 'CONTEXT'
+                    or (change['type'] == 'ADDITION'
+                        and position_index.position_for(path, change['line'], "RIGHT") is not None)
+                ]
+                chunks.append({**chunk, 'changes': changes})
+        if chunks:
+            restricted.append({'file': path, 'chunks': chunks})
+    return restricted
+
+
+def count_changes(structured_diff: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Return the number of files and changed lines in a structured diff."""
+    lines = sum(1 for file_diff in structured_diff for chunk in file_diff['chunks']
+                for kind, _, _ in iter_change_rows(chunk) if kind != 'CONTEXT')
+    return len(structured_diff), lines
+
+
+_default_store: Optional[ReviewStateStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_review_state_store() -> ReviewStateStore:
+    """Process-wide store; set REVIEW_STATE_PATH to persist it as JSON."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ReviewStateStore(os.getenv("REVIEW_STATE_PATH") or None)
+    return _default_store
@@ -0,0 +1,297 @@
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from auto_lgtm.common.metrics import JOB_LATENCY_SECONDS, JOB_QUEUE_JOBS, JOB_QUEUE_OLDEST_SECONDS, JOB_THROUGHPUT
+from auto_lgtm.services.review_coordinator import DEFAULT_COALESCE_SECONDS, SubmitOutcome
+
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_RETRY_BASE = 30.0
+DEFAULT_RETRY_MAX = 600.0
+# Finished jobs are kept this long for deduplication and latency statistics
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600.0
+# Window of finished jobs the latency statistics are computed over
+DEFAULT_STATS_WINDOW = 15 * 60.0
+
+JOB_STATUSES = ("queued", "running", "done", "superseded", "dead")
+_LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+@dataclass
+class QueuedJob:
+    id: int
+    owner: str
+    repo: str
+    pr_number: int
+    head_sha: str
+    delivery_id: Optional[str]
+    attempts: int
+    created_at: float
+    lease_owner: Optional[str] = None
+
+
+@dataclass
+class QueueStats:
+    jobs: Dict[str, int]
+    # Jobs waiting to be claimed, whether in their coalescing window, due or retrying
+    depth: int
+    oldest_queued_seconds: float
+    window_seconds: float
+    finished_in_window: int
+    # Seconds from enqueue to the first claim, and from the last claim to completion
+    wait_seconds: Dict[str, float] = field(default_factory=dict)
+    run_seconds: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def throughput_per_minute(self) -> float:
+        return self.finished_in_window / (self.window_seconds / 60) if self.window_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["throughput_per_minute"] = round(self.throughput_per_minute, 3)
+        return result
+
+
+def _quantiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {str(q): round(values[min(len(values) - 1, int(q * len(values)))], 3) for q in _LATENCY_QUANTILES}
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SQLiteJobQueue:
+    """
+    Durable review job queue in a SQLite database (WAL mode), shared by the
+    webhook and any number of worker processes on the host.
+
+    `enqueue` applies the same rules as `ReviewCoordinator.submit`: a
+    delivery id or (PR, head SHA) that is already queued, running or done
+    is a duplicate, and so is the delivery of a superseded job; a newer SHA
+    supersedes a queued job of the same PR; and new jobs only become
+    claimable after the coalescing window. Redelivering the event of a dead
+    job queues it again.
+
+    Workers `claim` a job with a lease and must `heartbeat` to keep it. A
+    job whose lease expires (its worker crashed or hung) is claimed again by
+    the next worker; a failed job is retried with exponential backoff until
+    `max_attempts`, then marked dead.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, coalesce_seconds: float = DEFAULT_COALESCE_SECONDS,
+                 retry_base: float = DEFAULT_RETRY_BASE, retry_max: float = DEFAULT_RETRY_MAX,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.coalesce_seconds = coalesce_seconds
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; every multi-statement change runs in an explicit BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " owner TEXT NOT NULL, repo TEXT NOT NULL, pr_number INTEGER NOT NULL, head_sha TEXT NOT NULL,"
+            " delivery_id TEXT, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL, lease_owner TEXT, lease_expires_at REAL,"
+            " created_at REAL NOT NULL, started_at REAL, claimed_at REAL, finished_at REAL, last_error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS review_jobs_claim ON review_jobs (status, available_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS review_jobs_pr ON review_jobs (owner, repo, pr_number)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS review_jobs_delivery ON review_jobs (delivery_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS review_jobs_finished ON review_jobs (finished_at)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, owner: str, repo: str, pr_number: int, head_sha: str,
+                delivery_id: Optional[str] = None) -> SubmitOutcome:
+        """Record a PR event as a job unless it is a duplicate; see the class docstring."""
+        now = time.time()
+        with self._transaction() as conn:
+            # A dead job's delivery may be redelivered to retry it, as the coordinator forgets failed deliveries
+            if delivery_id and conn.execute("SELECT 1 FROM review_jobs WHERE delivery_id = ? AND status != 'dead'",
+                                            (delivery_id,)).fetchone():
+                logger.info(f"Ignoring redelivery {delivery_id} for {owner}/{repo}#{pr_number}")
+                return SubmitOutcome.DUPLICATE_DELIVERY
+            if conn.execute(
+                    "SELECT 1 FROM review_jobs WHERE owner = ? AND repo = ? AND pr_number = ? AND head_sha = ?"
+                    " AND status IN ('queued', 'running', 'done')", (owner, repo, pr_number, head_sha)).fetchone():
+                logger.info(f"{owner}/{repo}#{pr_number} at {head_sha[:7]} already reviewed or queued")
+                return SubmitOutcome.DUPLICATE_SHA
+            replaced = conn.execute(
+                "UPDATE review_jobs SET status = 'superseded', finished_at = ?"
+                " WHERE owner = ? AND repo = ? AND pr_number = ? AND status = 'queued'",
+                (now, owner, repo, pr_number)).rowcount
+            conn.execute(
+                "INSERT INTO review_jobs (owner, repo, pr_number, head_sha, delivery_id, status,"
+                " available_at, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+                (owner, repo, pr_number, head_sha, delivery_id, now + self.coalesce_seconds, now))
+        if replaced:
+            logger.info(f"Replacing queued review with {head_sha[:7]} for {owner}/{repo}#{pr_number}")
+            return SubmitOutcome.REPLACED
+        return SubmitOutcome.QUEUED
+
+    def claim(self, worker_id: str) -> Optional[QueuedJob]:
+        """
+        Lease the next due job to `worker_id`, or return None. Jobs whose lease
+        expired are reclaimed first, or marked dead once out of attempts.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            dead = conn.execute(
+                "UPDATE review_jobs SET status = 'dead', finished_at = ?,"
+                " last_error = COALESCE(last_error, 'lease expired')"
+                " WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+                (now, now, self.max_attempts)).rowcount
+            if dead:
+                logger.error(f"{dead} review job(s) lost their lease after {self.max_attempts} attempts; marked dead")
+            row = conn.execute(
+                "SELECT * FROM review_jobs WHERE (status = 'queued' AND available_at <= ?)"
+                " OR (status = 'running' AND lease_expires_at < ?) ORDER BY available_at LIMIT 1",
+                (now, now)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "running":
+                logger.warning(f"Reclaiming review job {row['id']} from {row['lease_owner']} after its lease expired")
+            conn.execute(
+                "UPDATE review_jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?,"
+                " lease_expires_at = ?, claimed_at = ?, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, now, row["id"]))
+        return QueuedJob(row["id"], row["owner"], row["repo"], row["pr_number"], row["head_sha"],
+                         row["delivery_id"], row["attempts"] + 1, row["created_at"], worker_id)
+
+    def heartbeat(self, job: QueuedJob) -> bool:
+        """Extend the lease; False if the job is no longer leased to this worker."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE review_jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, job.id, job.lease_owner)).rowcount == 1
+
+    def complete(self, job: QueuedJob, status: str = "done") -> bool:
+        """Finish a leased job as done (or superseded); False if its lease was lost."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE review_jobs SET status = ?, finished_at = ?, lease_owner = NULL, lease_expires_at = NULL"
+                " WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (status, time.time(), job.id, job.lease_owner)).rowcount == 1
+
+    def fail(self, job: QueuedJob, error: str) -> Optional[float]:
+        """
+        Record a failed attempt. Returns the retry delay, or None when the job
+        is out of attempts (and now dead) or its lease was lost.
+        """
+        now = time.time()
+        retry = job.attempts < self.max_attempts
+        delay = self.retry_delay(job.attempts) if retry else None
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE review_jobs SET status = ?, available_at = ?, finished_at = ?, last_error = ?,"
+                " lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                ("queued" if retry else "dead", now + (delay or 0), None if retry else now, error[:2000],
+                 job.id, job.lease_owner)).rowcount
+        return delay if updated and retry else None
+
+    def retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter in [50%, 100%] of the step, so retries spread out but never bunch at zero."""
+        step = min(self.retry_max, self.retry_base * (2 ** (attempt - 1)))
+        return random.uniform(step / 2, step)
+
+    def is_current(self, job: QueuedJob) -> bool:
+        """False once a newer head SHA has been enqueued for the job's PR."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT head_sha FROM review_jobs WHERE owner = ? AND repo = ? AND pr_number = ?"
+                " ORDER BY id DESC LIMIT 1", (job.owner, job.repo, job.pr_number)).fetchone()
+        return row is None or row["head_sha"] == job.head_sha
+
+    def prune(self) -> int:
+        """Delete finished jobs older than the retention period."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM review_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.retention_seconds,)).rowcount
+
+    def stats(self, window: float = DEFAULT_STATS_WINDOW) -> QueueStats:
+        """Queue depth by status and latency quantiles of the jobs finished in the last `window` seconds."""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM review_jobs GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM review_jobs WHERE status = 'queued' AND available_at <= ?",
+                (now,)).fetchone()[0]
+            finished = self._conn.execute(
+                "SELECT created_at, started_at, claimed_at, finished_at FROM review_jobs"
+                " WHERE status = 'done' AND finished_at >= ?", (now - window,)).fetchall()
+        return QueueStats(
+            jobs={status: counts.get(status, 0) for status in JOB_STATUSES},
+            depth=counts.get("queued", 0),
+            oldest_queued_seconds=round(now - oldest, 3) if oldest else 0.0,
+            window_seconds=window,
+            finished_in_window=len(finished),
+            wait_seconds=_quantiles([row["started_at"] - row["created_at"] for row in finished]),
+            run_seconds=_quantiles([row["finished_at"] - row["claimed_at"] for row in finished]),
+        )
+
+    def export_metrics(self) -> QueueStats:
+        """Copy `stats` into the `auto_lgtm_job_*` gauges; called when /metrics is scraped."""
+        stats = self.stats()
+        for status, count in stats.jobs.items():
+            JOB_QUEUE_JOBS.set(count, status=status)
+        JOB_QUEUE_OLDEST_SECONDS.set(stats.oldest_queued_seconds)
+        for phase, quantiles in (("wait", stats.wait_seconds), ("run", stats.run_seconds)):
+            for quantile, seconds in quantiles.items():
+                JOB_LATENCY_SECONDS.set(seconds, phase=phase, quantile=quantile)
+        JOB_THROUGHPUT.set(stats.throughput_per_minute)
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def job_queue_from_env() -> Optional[SQLiteJobQueue]:
+    """
+    The durable queue configured by REVIEW_QUEUE_PATH, or None to review in
+    the webhook process (see `ReviewCoordinator`). REVIEW_JOB_LEASE_SECONDS,
+    REVIEW_JOB_MAX_ATTEMPTS and REVIEW_COALESCE_SECONDS tune it.
+    """
+    path = os.getenv("REVIEW_QUEUE_PATH")
+    if not path:
+        return None
+    return SQLiteJobQueue(
+        path,
+        lease_seconds=float(os.getenv("REVIEW_JOB_LEASE_SECONDS", DEFAULT_LEASE_SECONDS)),
+        max_attempts=int(os.getenv("REVIEW_JOB_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+        coalesce_seconds=float(os.getenv("REVIEW_COALESCE_SECONDS", DEFAULT_COALESCE_SECONDS)),
+    )
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from loguru import logger
+
+from auto_lgtm.common.metrics import REVIEW_CACHE_LOOKUPS
+from auto_lgtm.models.diff_model import iter_change_rows
+from auto_lgtm.models.review_models import ChangeType, ReviewComment, SeverityLevel
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600.0
+
+CachedComments = List[Dict[str, Any]]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ReviewCacheBackend(Protocol):
+    def get(self, key: str) -> Optional[CachedComments]: ...
+    def put(self, key: str, value: CachedComments) -> int: ...
+
+
+class InMemoryReviewCache:
+    """LRU backend with per-entry TTL; `put` returns the number of evicted entries."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, CachedComments]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedComments]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: CachedComments) -> int:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+
+class SQLiteReviewCache:
+    """
+    File-backed backend shared by every worker on the host. Entries older than
+    the TTL are ignored and purged; beyond `max_entries` the least recently
+    used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS review_cache_accessed ON review_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CachedComments]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM review_cache WHERE key = ? AND stored_at >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE review_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: CachedComments) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO review_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            expired = self._conn.execute("DELETE FROM review_cache WHERE stored_at < ?", (now - self.ttl,)).rowcount
+            overflow = self._conn.execute(
+                "DELETE FROM review_cache WHERE key IN ("
+                " SELECT key FROM review_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._conn.commit()
+        return expired + overflow
+
+
+class ReviewCache:
+    """
+    Content-addressed cache of LLM review comments, one entry per hunk.
+
+    The key hashes the file path, the normalized hunk text (markers and code,
+    without line numbers), the prompt version and the LLM parameters, so a
+    rebased or re-pushed hunk hits the cache wherever it moved to. Comments are
+    stored with line offsets relative to the hunk start and re-anchored on
+    the hunk's current position when served.
+    """
+
+    def __init__(self, backend: ReviewCacheBackend, namespace: str):
+        self.backend = backend
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def key_for(self, file_path: str, chunk: Dict[str, Any]) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.namespace.encode())
+        digest.update(b"\0")
+        digest.update(file_path.encode())
+        for kind, _, content in iter_change_rows(chunk):
+            digest.update(b"\0")
+            digest.update(kind[0].encode())
+            digest.update(content.rstrip().encode())
+        return digest.hexdigest()
+
+    def lookup(self, file_path: str, chunk: Dict[str, Any]) -> Optional[List[ReviewComment]]:
+        cached = self.backend.get(self.key_for(file_path, chunk))
+        with self._stats_lock:
+            if cached is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        REVIEW_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is None:
+            return None
+        return [self._anchor(file_path, chunk, entry) for entry in cached]
+
+    def store(self, file_path: str, chunk: Dict[str, Any], comments: List[ReviewComment]) -> None:
+        entries = []
+        for comment in comments:
+            entry = _comment_fields(comment)
+            entry['offset'] = comment.line_number - _hunk_start(chunk, comment.change_type)
+            entries.append(entry)
+        evicted = self.backend.put(self.key_for(file_path, chunk), entries)
+        with self._stats_lock:
+            self.stats.stores += 1
+            self.stats.evictions += evicted
+
+    @staticmethod
+    def _anchor(file_path: str, chunk: Dict[str, Any], entry: Dict[str, Any]) -> ReviewComment:
+        change_type = ChangeType(entry['change_type'])
+        return ReviewComment(
+            file=file_path,
+            line_number=_hunk_start(chunk, change_type) + entry['offset'],
+            line_content=entry['line_content'],
+            change_type=change_type,
+            severity=SeverityLevel(entry['severity']),
+            comment=entry['comment'],
+        )
+
+
+def _comment_fields(comment: ReviewComment) -> Dict[str, Any]:
+    return {
+        'line_content': comment.line_content,
+        'change_type': comment.change_type.value,
+        'severity': comment.severity.value,
+        'comment': comment.comment,
+    }
+
+
+def _hunk_start(chunk: Dict[str, Any], change_type: ChangeType) -> int:
+    return chunk['old_start'] if change_type == ChangeType.DELETION else chunk['new_start']
+
+
+def hunk_lines(chunk: Dict[str, Any]) -> Tuple[set, set]:
+    """Return the new-file and base-file line numbers covered by a hunk."""
+    new_lines, old_lines = set(), set()
+    for kind, line, _ in iter_change_rows(chunk):
+        (old_lines if kind == 'DELETION' else new_lines).add(line)
+    return new_lines, old_lines
+
+
+def make_cache_namespace(prompt_version: str, llm_parameters: Any) -> str:
+    """Fold everything that changes the LLM's answer besides the hunk into one string."""
+    return f"{prompt_version}|{json.dumps(asdict(llm_parameters), sort_keys=True)}"
+
+
+_default_backend: Optional[ReviewCacheBackend] = None
+_default_backend_lock = threading.Lock()
+
+
+def get_default_cache_backend() -> ReviewCacheBackend:
+    """
+    Process-wide backend: SQLite when LLM_CACHE_PATH is set, otherwise an
+    in-memory LRU. LLM_CACHE_MAX_ENTRIES and LLM_CACHE_TTL tune eviction.
+    """
+    global _default_backend
+    if _default_backend is None:
+        with _default_backend_lock:
+            if _default_backend is None:
+                max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+                ttl = float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS))
+                path = os.getenv("LLM_CACHE_PATH")
+                if path:
+                    logger.info(f"Using SQLite LLM review cache at {path}")
+                    _default_backend = SQLiteReviewCache(path, max_entries=max_entries, ttl=ttl)
+                else:
+                    _default_backend = InMemoryReviewCache(max_entries=max_entries, ttl=ttl)
+    return _default_backend
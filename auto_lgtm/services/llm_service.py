@@ -1,10 +1,13 @@
 import os
 from dataclasses import dataclass, field
-from typing import Any, Dict, Union
-from openai import OpenAI
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 import json
+import time
 from loguru import logger
-from .secret_service import SecretService
+from auto_lgtm.common.json_stream import JsonArrayStreamParser
+from auto_lgtm.common.llm_client import LLMClientPool, get_default_llm_pool
+from auto_lgtm.common.metrics import LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS
+from auto_lgtm.prompts.diff_serializer import estimate_tokens
 
 SECRET_ID = os.getenv("SECRET_ID")
 
@@ -18,25 +21,34 @@ class LLMParameters:
 
 
 class LLMService:
-    def __init__(self, user_query: str, project_id: str, gemini_api_key: str):
+    def __init__(self, user_query: str, project_id: str, gemini_api_key: str,
+                 client_pool: Optional[LLMClientPool] = None):
         """
-        Initialize LLM service with project ID for Secret Manager access.
-        
+        Initialize LLM service.
+
+        Cheap to build per review: the HTTP clients come from a process-wide
+        pool (see `llm_client`), and every call builds its own message list,
+        so one instance can also serve concurrent calls.
+
         Args:
             user_query: The query to be processed by the LLM
-            project_id: Google Cloud project ID for accessing secrets
+            project_id: Google Cloud project ID (kept for API compatibility)
+            gemini_api_key: API key for the Gemini OpenAI-compatible endpoint
+            client_pool: Clients to use; defaults to the process-wide pool
         """
-        self.secret_service = SecretService(project_id)
         self.api_key = gemini_api_key
-        self.client = OpenAI(
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-            api_key=self.api_key,
-        )
+        self.client_pool = client_pool or get_default_llm_pool()
         self.user_query = user_query
+        self.params = LLMParameters()
         self.system_prompt = None
         self.messages = []
         logger.debug(f"LLMService initialized with user_query: {user_query}")
 
+    @property
+    def client(self):
+        """The pooled sync client, shared with every other review in the process."""
+        return self.client_pool.client(self.api_key)
+
     def set_system_prompt(self, prompt: str):
         self.system_prompt = prompt
         self.set_messages({"role": "system", "content": self.system_prompt})
@@ -45,24 +57,130 @@ class LLMService:
         self.messages.append(messages)
 
     def generate_response(self) -> Union[Any, Dict[str, str]]:
-        if not any(msg.get("role") == "user" for msg in self.messages):
-            self.set_messages({"role": "user", "content": self.user_query})
+        messages = list(self.messages)
+        if not any(msg.get("role") == "user" for msg in messages):
+            messages.append({"role": "user", "content": self.user_query})
+        return self._create_completion(messages)
+
+    def complete(self, system_prompt: str) -> Union[Any, Dict[str, str]]:
+        """
+        Run a single completion with its own message list. Unlike
+        `generate_response` this ignores `self.messages`.
+        """
+        return self._create_completion(self._messages(system_prompt))
+
+    async def acomplete(self, system_prompt: str) -> Union[Any, Dict[str, str]]:
+        """`complete` on the async client of the running event loop."""
+        messages = self._messages(system_prompt)
+        LLM_TOKENS.inc(_prompt_tokens(messages), direction="prompt")
+        with LLM_REQUEST_SECONDS.time(mode="complete"):
+            try:
+                response = await self.client_pool.async_client(self.api_key).chat.completions.create(
+                    **self._request(messages, stream=False))
+            except Exception:
+                LLM_REQUESTS.inc(mode="complete", outcome="error")
+                raise
+        LLM_REQUESTS.inc(mode="complete", outcome="ok")
+        return self._parse_completion(response)
+
+    def stream_comments(self, system_prompt: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a completion and yield each comment object as soon as the
+        model has finished generating it.
+
+        Raises:
+            ValueError: If the stream ends before the comment array is closed;
+                the comments already yielded may be an incomplete answer
+        """
+        messages = self._messages(system_prompt)
+        LLM_TOKENS.inc(_prompt_tokens(messages), direction="prompt")
+        start = time.perf_counter()
+        completion_tokens = 0
+        outcome = "error"
+        try:
+            stream = self.client.chat.completions.create(**self._request(messages, stream=True))
+            parser = JsonArrayStreamParser()
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    completion_tokens += estimate_tokens(delta)
+                    yield from parser.feed(delta)
+            if not parser.finished:
+                outcome = "truncated"
+                raise ValueError("LLM stream ended before the comment array was closed; the output is truncated")
+            outcome = "ok"
+        finally:
+            LLM_TOKENS.inc(completion_tokens, direction="completion")
+            LLM_REQUESTS.inc(mode="stream", outcome=outcome)
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="stream")
 
-        params = LLMParameters()
+    async def astream_comments(self, system_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """`stream_comments` on the async client of the running event loop."""
+        messages = self._messages(system_prompt)
+        LLM_TOKENS.inc(_prompt_tokens(messages), direction="prompt")
+        start = time.perf_counter()
+        completion_tokens = 0
+        outcome = "error"
+        try:
+            stream = await self.client_pool.async_client(self.api_key).chat.completions.create(
+                **self._request(messages, stream=True))
+            parser = JsonArrayStreamParser()
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    completion_tokens += estimate_tokens(delta)
+                    for comment in parser.feed(delta):
+                        yield comment
+            if not parser.finished:
+                outcome = "truncated"
+                raise ValueError("LLM stream ended before the comment array was closed; the output is truncated")
+            outcome = "ok"
+        finally:
+            LLM_TOKENS.inc(completion_tokens, direction="completion")
+            LLM_REQUESTS.inc(mode="stream", outcome=outcome)
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="stream")
+
+    def _messages(self, system_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": self.user_query},
+        ]
 
-        response = self.client.chat.completions.create(
-            model=params.model,
-            temperature=params.temperature,
-            max_tokens=params.max_tokens,
-            n=params.chat_completion_choices,
-            response_format=params.response_format,
-            messages=self.messages
-        )
+    def _request(self, messages: list, stream: bool) -> Dict[str, Any]:
+        params = self.params
+        request = {
+            "model": params.model,
+            "temperature": params.temperature,
+            "max_tokens": params.max_tokens,
+            "n": 1 if stream else params.chat_completion_choices,
+            "response_format": params.response_format,
+            "messages": messages,
+        }
+        if stream:
+            request["stream"] = True
+        return request
 
+    def _create_completion(self, messages: list) -> Union[Any, Dict[str, str]]:
+        LLM_TOKENS.inc(_prompt_tokens(messages), direction="prompt")
+        with LLM_REQUEST_SECONDS.time(mode="complete"):
+            try:
+                response = self.client.chat.completions.create(**self._request(messages, stream=False))
+            except Exception:
+                LLM_REQUESTS.inc(mode="complete", outcome="error")
+                raise
+        LLM_REQUESTS.inc(mode="complete", outcome="ok")
+        return self._parse_completion(response)
+
+    def _parse_completion(self, response) -> Union[Any, Dict[str, str]]:
         content = response.choices[0].message.content
+        LLM_TOKENS.inc(estimate_tokens(content or ""), direction="completion")
         parsed_content = self.response_to_json(content)
         # TODO: Remove this once we have a better way to handle the response
-        for comment in parsed_content:
+        for comment in parsed_content if isinstance(parsed_content, list) else []:
             for key, value in comment.items():
                 if key == "comment":
                     logger.debug(f"LLM review comments: {value}")
@@ -75,3 +193,6 @@ class LLMService:
             logger.error("Invalid JSON response from LLM.")
             return {"error": "Invalid JSON response"}
 
+
+def _prompt_tokens(messages: list) -> int:
+    return sum(estimate_tokens(message["content"]) for message in messages)
@@ -0,0 +1,179 @@
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+from auto_lgtm.models.diff_model import DiffFile
+from auto_lgtm.services.diff_stream import DiffLimits, iter_parse_diff
+
+DIFF_MODES = ("base", "staged", "worktree")
+# Pinned so user config (diff.noprefix, diff.mnemonicPrefix, color, external tools) cannot change the format
+_DIFF_FLAGS = ("--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/", "--unified=3")
+
+
+class LocalGitError(Exception):
+    """Raised when a git command fails or the checkout is not usable."""
+
+
+def _run_git(cwd: str, args: Iterable[str], input: Optional[str] = None) -> str:
+    args = list(args)
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, input=input, capture_output=True,
+                                text=True, encoding="utf-8", errors="replace")
+    except FileNotFoundError:
+        raise LocalGitError("git executable not found on PATH")
+    if result.returncode != 0:
+        raise LocalGitError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+@dataclass
+class DiffTarget:
+    """
+    Which changes of a checkout to review:
+
+    - "base": the commits on HEAD since it forked from `base` (`git diff base...HEAD`)
+    - "staged": the index against HEAD (`git diff --cached`)
+    - "worktree": every uncommitted change, staged or not (`git diff HEAD`)
+    """
+    mode: str = "base"
+    base: Optional[str] = None
+
+    def __post_init__(self):
+        if self.mode not in DIFF_MODES:
+            raise ValueError(f"mode must be one of {', '.join(DIFF_MODES)}, got '{self.mode}'")
+        if self.mode == "base" and not self.base:
+            raise ValueError("mode 'base' needs a base ref")
+
+    def diff_args(self) -> List[str]:
+        if self.mode == "base":
+            return [f"{self.base}...HEAD"]
+        if self.mode == "staged":
+            return ["--cached"]
+        return ["HEAD"]
+
+    def describe(self) -> str:
+        if self.mode == "base":
+            return f"{self.base}...HEAD"
+        return "staged changes" if self.mode == "staged" else "working tree changes"
+
+
+class LocalGitRepo:
+    """
+    Read-only access to a local git checkout through the `git` executable.
+
+    It stands in for `GitHubService` in offline reviews: the diff is streamed
+    from `git diff` into the same parser, and `fetch_blob_text` serves blob
+    contents to `FileContextProvider`, so nothing but the LLM call touches
+    the network.
+    """
+
+    def __init__(self, path: str = "."):
+        self.root = _run_git(os.path.abspath(path), ["rev-parse", "--show-toplevel"]).strip()
+        # Blob SHAs of working tree files that exist only on disk, see `blob_shas`
+        self._worktree_blobs: Dict[str, str] = {}
+
+    def _git(self, *args: str, input: Optional[str] = None) -> str:
+        return _run_git(self.root, args, input)
+
+    def iter_diff(self, target: DiffTarget, limits: Optional[DiffLimits] = None) -> Iterator[DiffFile]:
+        """
+        Stream `git diff` for `target` and yield one parsed file at a time.
+
+        When the parser stops at DIFF_MAX_TOTAL_BYTES or the consumer stops
+        early, git is terminated and its exit status ignored; only a git
+        that fails on its own raises `LocalGitError`.
+        """
+        args = ["git", "diff", *_DIFF_FLAGS, *target.diff_args()]
+        logger.info(f"Reading {target.describe()} from {self.root}")
+        process = subprocess.Popen(args, cwd=self.root, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, encoding="utf-8", errors="replace")
+        # Drained concurrently so a chatty stderr cannot fill its pipe and stall git
+        stderr: List[str] = []
+        stderr_reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        stderr_reader.start()
+        drained = False
+        try:
+            yield from iter_parse_diff(process.stdout, limits or DiffLimits.from_env())
+            drained = process.stdout.read(1) == ""
+        finally:
+            if not drained:
+                process.terminate()
+            process.stdout.close()
+            returncode = process.wait()
+            stderr_reader.join()
+            process.stderr.close()
+        if drained and returncode != 0:
+            raise LocalGitError(f"git diff {' '.join(target.diff_args())} failed: {''.join(stderr).strip()}")
+
+    def changed_paths(self, target: DiffTarget) -> List[str]:
+        """Paths changed by `target`, new names for renamed files."""
+        output = self._git("diff", "--name-only", "-z", *target.diff_args())
+        return [path for path in output.split("\0") if path]
+
+    def head_sha(self) -> str:
+        return self._git("rev-parse", "HEAD").strip()
+
+    def commit_messages(self, target: DiffTarget) -> List[str]:
+        """Subjects of the commits under review (empty for uncommitted changes)."""
+        if target.mode != "base":
+            return []
+        return [line for line in self._git("log", "--format=%s", f"{target.base}..HEAD").splitlines() if line]
+
+    def read_file(self, path: str, target: DiffTarget) -> Optional[str]:
+        """Content of `path` as reviewed by `target`, or None if it does not exist there."""
+        if target.mode == "worktree":
+            try:
+                with open(os.path.join(self.root, path), "r", encoding="utf-8", errors="replace") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        spec = f":{path}" if target.mode == "staged" else f"HEAD:{path}"
+        try:
+            return self._git("show", spec)
+        except LocalGitError:
+            return None
+
+    def blob_shas(self, paths: Iterable[str], target: DiffTarget) -> Dict[str, str]:
+        """
+        Blob SHA of every path that exists in the reviewed version: from HEAD,
+        the index, or hashed from disk for the working tree.
+        """
+        paths = list(paths)
+        if not paths:
+            return {}
+        if target.mode == "worktree":
+            existing = [path for path in paths if os.path.isfile(os.path.join(self.root, path))]
+            if not existing:
+                return {}
+            shas = self._git("hash-object", "--stdin-paths", input="\n".join(existing) + "\n").split()
+            self._worktree_blobs.update(zip(shas, existing))
+            return dict(zip(existing, shas))
+        if target.mode == "staged":
+            output = self._git("ls-files", "--stage", "-z", "--", *paths)
+        else:
+            output = self._git("ls-tree", "-z", "HEAD", "--", *paths)
+        shas = {}
+        for entry in output.split("\0"):
+            if "\t" in entry:
+                meta, path = entry.split("\t", 1)
+                shas[path] = meta.split()[1] if target.mode == "staged" else meta.split()[2]
+        return shas
+
+    def fetch_blob_text(self, repo: str, sha: str, max_size: Optional[int] = None) -> Optional[str]:
+        """
+        Content of a blob, or None if longer than `max_size`; `repo` is
+        ignored and kept for `GitHubService` compatibility.
+        """
+        path = self._worktree_blobs.get(sha)
+        if path is not None:
+            with open(os.path.join(self.root, path), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read() if max_size is None else f.read(max_size + 1)
+        else:
+            if max_size is not None and int(self._git("cat-file", "-s", sha)) > max_size:
+                return None
+            text = self._git("cat-file", "blob", sha)
+        return None if max_size is not None and len(text) > max_size else text
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_COALESCE_SECONDS = 5.0
+DEFAULT_DELIVERY_TTL = 6 * 3600.0
+DEFAULT_MAX_WORKERS = 4
+# Upper bound on remembered deliveries and reviewed SHAs
+MAX_REMEMBERED = 10_000
+
+PRKey = Tuple[str, str, int]
+
+
+class SubmitOutcome(str, Enum):
+    QUEUED = "queued"
+    REPLACED = "replaced"
+    DUPLICATE_DELIVERY = "duplicate_delivery"
+    DUPLICATE_SHA = "duplicate_sha"
+
+
+@dataclass
+class ReviewJob:
+    owner: str
+    repo: str
+    pr_number: int
+    head_sha: str
+    delivery_id: Optional[str] = None
+    is_current: Callable[[], bool] = field(default=lambda: True, repr=False)
+
+    @property
+    def pr_key(self) -> PRKey:
+        return (self.owner, self.repo, self.pr_number)
+
+
+class ReviewCoordinator:
+    """
+    Deduplicates webhook deliveries and coalesces superseded PR events.
+
+    A delivery is ignored if its `X-GitHub-Delivery` id or its
+    (repo, PR, head SHA) was already seen. Accepted events wait for a short
+    coalescing window; a newer SHA for the same PR arriving in that window
+    replaces the queued one, and a review already running for an older SHA is
+    told through `ReviewJob.is_current` that it has been superseded so it can
+    stop before spending LLM time or posting stale comments.
+    """
+
+    def __init__(self, review_fn: Callable[[ReviewJob], None],
+                 coalesce_seconds: float = DEFAULT_COALESCE_SECONDS,
+                 delivery_ttl: float = DEFAULT_DELIVERY_TTL,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        self.review_fn = review_fn
+        self.coalesce_seconds = coalesce_seconds
+        self.delivery_ttl = delivery_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review")
+        self._lock = threading.Lock()
+        self._deliveries: "OrderedDict[str, float]" = OrderedDict()
+        self._seen_shas: "OrderedDict[Tuple[str, str, int, str], None]" = OrderedDict()
+        self._latest_sha: Dict[PRKey, str] = {}
+        # Jobs per PR that are pending or running; `_latest_sha` is kept only while there are any
+        self._in_flight: Dict[PRKey, int] = {}
+        self._pending: Dict[PRKey, Tuple[ReviewJob, threading.Timer]] = {}
+
+    def submit(self, owner: str, repo: str, pr_number: int, head_sha: str,
+               delivery_id: Optional[str] = None) -> SubmitOutcome:
+        """Register a PR event and schedule its review unless it is a duplicate."""
+        pr_key = (owner, repo, pr_number)
+        with self._lock:
+            self._prune_deliveries()
+            if delivery_id and delivery_id in self._deliveries:
+                logger.info(f"Ignoring redelivery {delivery_id} for {owner}/{repo}#{pr_number}")
+                return SubmitOutcome.DUPLICATE_DELIVERY
+            if delivery_id:
+                self._deliveries[delivery_id] = time.monotonic()
+
+            sha_key = (*pr_key, head_sha)
+            if sha_key in self._seen_shas:
+                logger.info(f"{owner}/{repo}#{pr_number} at {head_sha[:7]} already reviewed or queued")
+                return SubmitOutcome.DUPLICATE_SHA
+            self._seen_shas[sha_key] = None
+            while len(self._seen_shas) > MAX_REMEMBERED:
+                self._seen_shas.popitem(last=False)
+
+            self._latest_sha[pr_key] = head_sha
+            self._in_flight[pr_key] = self._in_flight.get(pr_key, 0) + 1
+            job = ReviewJob(owner, repo, pr_number, head_sha, delivery_id)
+            job.is_current = lambda: self.is_current(pr_key, head_sha)
+
+            outcome = SubmitOutcome.QUEUED
+            pending = self._pending.pop(pr_key, None)
+            if pending is not None:
+                old_job, timer = pending
+                timer.cancel()
+                self._release(pr_key)
+                self._seen_shas.pop((*pr_key, old_job.head_sha), None)
+                outcome = SubmitOutcome.REPLACED
+                logger.info(f"Replacing queued review of {old_job.head_sha[:7]} with {head_sha[:7]} "
+                            f"for {owner}/{repo}#{pr_number}")
+
+            timer = threading.Timer(self.coalesce_seconds, self._dispatch, args=(job,))
+            timer.daemon = True
+            self._pending[pr_key] = (job, timer)
+            timer.start()
+        return outcome
+
+    def is_current(self, pr_key: PRKey, head_sha: str) -> bool:
+        """False once a newer head SHA has been submitted for the PR (or once its reviews all finished)."""
+        with self._lock:
+            return self._latest_sha.get(pr_key) == head_sha
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            for _, timer in self._pending.values():
+                timer.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch(self, job: ReviewJob) -> None:
+        with self._lock:
+            pending = self._pending.get(job.pr_key)
+            if pending is None or pending[0] is not job:
+                return
+            del self._pending[job.pr_key]
+        self._executor.submit(self._run, job)
+
+    def _run(self, job: ReviewJob) -> None:
+        try:
+            if not job.is_current():
+                logger.info(f"Skipping superseded review of {job.repo}#{job.pr_number} at {job.head_sha[:7]}")
+                return
+            self.review_fn(job)
+        except Exception as e:
+            # Allow a later redelivery of the same event to retry the review
+            with self._lock:
+                self._seen_shas.pop((*job.pr_key, job.head_sha), None)
+                if job.delivery_id:
+                    self._deliveries.pop(job.delivery_id, None)
+            logger.error(f"Review of {job.repo}#{job.pr_number} at {job.head_sha[:7]} failed: {e}")
+        finally:
+            with self._lock:
+                self._release(job.pr_key)
+
+    def _release(self, pr_key: PRKey) -> None:
+        """Count a job of `pr_key` as finished; forget the PR's head SHA after its last one. Needs `_lock`."""
+        remaining = self._in_flight.get(pr_key, 0) - 1
+        if remaining > 0:
+            self._in_flight[pr_key] = remaining
+        else:
+            self._in_flight.pop(pr_key, None)
+            self._latest_sha.pop(pr_key, None)
+
+    def _prune_deliveries(self) -> None:
+        cutoff = time.monotonic() - self.delivery_ttl
+        while self._deliveries:
+            delivery_id, seen_at = next(iter(self._deliveries.items()))
+            if seen_at >= cutoff and len(self._deliveries) <= MAX_REMEMBERED:
+                break
+            self._deliveries.popitem(last=False)
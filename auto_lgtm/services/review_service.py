@@ -1,31 +1,55 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from dataclasses import dataclass
+import queue
 from enum import Enum
 import json
+import os
 from loguru import logger
 
-from auto_lgtm.prompts.pr_review_prompt import PR_REVIEW_PROMPT
+from auto_lgtm.common.event_loop import aiter_items
+from auto_lgtm.common.metrics import DROPPED_COMMENTS
+from auto_lgtm.prompts.pr_review_prompt import PR_REVIEW_PROMPT, PROMPT_VERSION
+from auto_lgtm.prompts.diff_serializer import estimate_tokens, serialize_changes, serialize_diff
+from auto_lgtm.models.diff_model import iter_change_rows
 from auto_lgtm.models.review_models import ReviewResponse, ReviewComment, ChangeType, SeverityLevel
 
 from auto_lgtm.services.llm_service import LLMService
+from auto_lgtm.services.diff_sharder import DEFAULT_SHARD_TOKEN_BUDGET, DiffSharder
+from auto_lgtm.services.file_context import ContextRows, FileContextProvider
+from auto_lgtm.services.llm_cache import ReviewCache, get_default_cache_backend, hunk_lines, make_cache_namespace
+
+DEFAULT_SHARD_CONCURRENCY = 4
+
+
+@dataclass
+class _ShardDone:
+    number: int
+    error: Optional[Exception] = None
+
 
 class DiffParser:
     """
     Responsible for parsing code diffs and extracting useful information.
     """
-    def parse(self, structured_diff: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        logger.info(f"Parsing structured diff with {len(structured_diff)} files.")
+    def parse(self, structured_diff: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
         changes = []
+        files = 0
         for file_diff in structured_diff:
+            files += 1
             file_path = file_diff['file']
             for chunk in file_diff['chunks']:
-                for change in chunk['changes']:
+                for kind, line, content in iter_change_rows(chunk):
+                    if kind == 'CONTEXT':
+                        continue
                     changes.append({
                         "file": file_path,
-                        "line_number": change['line'],
-                        "line_content": change['content'],
-                        "change_type": ChangeType.ADDITION if change['type'] == 'ADDITION' else ChangeType.DELETION
+                        "line_number": line,
+                        "line_content": content,
+                        "change_type": ChangeType.ADDITION if kind == 'ADDITION' else ChangeType.DELETION
                     })
-        logger.info(f"Parsed {len(changes)} changes from diff.")
+        logger.info(f"Parsed {len(changes)} changes from {files} files.")
         return changes
 
     def create_review_comment(self, file: str, line_number: int, line_content: str, 
@@ -47,10 +71,28 @@ class ReviewService:
     """
     Analyzes code diffs and generates review comments using an LLM.
     """
-    def __init__(self, diff_parser: DiffParser, llm_service: LLMService, pr_details: Dict[str, Any] = None):
+    def __init__(self, diff_parser: DiffParser, llm_service: LLMService, pr_details: Dict[str, Any] = None,
+                 sharder: Optional[DiffSharder] = None, max_concurrency: Optional[int] = None,
+                 review_cache: Optional[ReviewCache] = None,
+                 context_provider: Optional[FileContextProvider] = None):
         self.diff_parser = diff_parser
         self.llm_service = llm_service
         self.pr_details = pr_details
+        self.sharder = sharder or DiffSharder(
+            int(os.getenv("REVIEW_SHARD_TOKEN_BUDGET", DEFAULT_SHARD_TOKEN_BUDGET))
+        )
+        self.max_concurrency = max_concurrency or int(os.getenv("REVIEW_SHARD_CONCURRENCY", DEFAULT_SHARD_CONCURRENCY))
+        self.context_provider = context_provider
+        if review_cache is None and os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+            prompt_version = PROMPT_VERSION
+            if context_provider is not None:
+                prompt_version = f"{prompt_version}|{context_provider.config.cache_tag()}"
+            review_cache = ReviewCache(
+                get_default_cache_backend(),
+                make_cache_namespace(prompt_version, llm_service.params)
+            )
+        self.review_cache = review_cache
+        self.streaming = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
 
     def analyze_diff(self, structured_diff: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         logger.info("Analyzing diff...")
@@ -58,21 +100,288 @@ class ReviewService:
         logger.info(f"Found {len(changes)} changes to analyze.")
         return changes
 
+    def review(self, structured_diff: List[Dict[str, Any]]) -> ReviewResponse:
+        """
+        Review a structured diff of any size and return the merged, sorted and
+        deduplicated comments. See `iter_review` for how the work is split.
+        """
+        return ReviewResponse(comments=self.merge_comments(self.iter_review(structured_diff)))
+
+    def iter_review(self, structured_diff: Iterable[Dict[str, Any]]) -> Iterator[ReviewComment]:
+        """
+        Yield review comments as soon as they are available.
+
+        `structured_diff` may be a lazy stream of file records (see
+        `GitHubService.iter_pr_diff`); it is consumed once. Hunks already
+        reviewed with identical content are answered from the review cache.
+        The rest is packed into token-budgeted shards along file and hunk
+        boundaries, and each shard is reviewed concurrently as soon as it is
+        full; with streaming enabled each comment is yielded the moment the
+        model closes its JSON object, so callers can map and validate it while
+        generation continues. A failing shard is logged and skipped; if every
+        shard fails the first error is raised once the other comments have
+        been yielded. Comments may repeat across shards, see `merge_comments`.
+        """
+        cached: List[ReviewComment] = []
+        results: "queue.Queue[ReviewComment | _ShardDone]" = queue.Queue()
+        errors: List[Exception] = []
+        submitted = done = 0
+
+        def run(number: int, shard: List[Dict[str, Any]]):
+            try:
+                for comment in self._review_shard(shard):
+                    results.put(comment)
+                results.put(_ShardDone(number))
+            except Exception as e:
+                results.put(_ShardDone(number, e))
+
+        def drain(block: bool) -> Iterator[ReviewComment]:
+            nonlocal done
+            while done < submitted:
+                try:
+                    item = results.get(block=block)
+                except queue.Empty:
+                    return
+                if isinstance(item, _ShardDone):
+                    done += 1
+                    if item.error is not None:
+                        logger.error(f"Shard {item.number} failed: {item.error}")
+                        errors.append(item.error)
+                else:
+                    yield item
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="review-shard")
+        try:
+            for shard in self.sharder.iter_shards(self._skip_cached(structured_diff, cached)):
+                submitted += 1
+                executor.submit(run, submitted, shard)
+                yield from cached
+                cached.clear()
+                yield from drain(block=False)
+            yield from cached
+            yield from drain(block=True)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._raise_if_all_failed(errors, submitted)
+
+    async def aiter_review(self, structured_diff: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+                           ) -> AsyncIterator[ReviewComment]:
+        """
+        `iter_review` on the running event loop: shards are reviewed as
+        concurrent tasks (at most `max_concurrency` at a time) with the async
+        LLM client, while the rest of the diff is still being read.
+        `structured_diff` may be a plain or an async iterable of files.
+        """
+        results: "asyncio.Queue[ReviewComment | _ShardDone]" = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        cached: List[ReviewComment] = []
+        errors: List[Exception] = []
+        tasks: List[asyncio.Task] = []
+        done = 0
+
+        async def run(number: int, shard: List[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    async for comment in self._areview_shard(shard):
+                        results.put_nowait(comment)
+                    results.put_nowait(_ShardDone(number))
+                except Exception as e:
+                    results.put_nowait(_ShardDone(number, e))
+
+        def submit(shards: List[List[Dict[str, Any]]]) -> None:
+            for shard in shards:
+                tasks.append(asyncio.create_task(run(len(tasks) + 1, shard)))
+
+        def take(item: "ReviewComment | _ShardDone") -> Optional[ReviewComment]:
+            nonlocal done
+            if not isinstance(item, _ShardDone):
+                return item
+            done += 1
+            if item.error is not None:
+                logger.error(f"Shard {item.number} failed: {item.error}")
+                errors.append(item.error)
+            return None
+
+        packer = self.sharder.packer()
+        try:
+            async for file_diff in aiter_items(structured_diff):
+                # Cache lookups may hit SQLite; keep them off the shared loop
+                pending = (await asyncio.to_thread(self._pending_file, file_diff, cached)
+                           if self.review_cache is not None else file_diff)
+                if pending is not None:
+                    submit(packer.add(pending))
+                for comment in cached:
+                    yield comment
+                cached.clear()
+                while not results.empty():
+                    comment = take(results.get_nowait())
+                    if comment is not None:
+                        yield comment
+            submit(packer.finish())
+            self._log_cache_stats()
+            for comment in cached:
+                yield comment
+            while done < len(tasks):
+                comment = take(await results.get())
+                if comment is not None:
+                    yield comment
+        finally:
+            for task in tasks:
+                task.cancel()
+        self._raise_if_all_failed(errors, len(tasks))
+
+    @staticmethod
+    def _raise_if_all_failed(errors: List[Exception], submitted: int) -> None:
+        if submitted and len(errors) == submitted:
+            raise errors[0]
+        if errors:
+            logger.warning(f"{len(errors)} of {submitted} shards failed; posting a partial review")
+
+    def _review_shard(self, shard: List[Dict[str, Any]]) -> Iterator[ReviewComment]:
+        """
+        Review one shard, with the surrounding code of its files when a
+        context provider is set, yielding its comments, and cache them per
+        hunk once it completes. A truncated LLM answer raises before anything
+        is cached, so the next review asks again.
+        """
+        comments = []
+        context = self.context_provider.for_shard(shard) if self.context_provider is not None else None
+        for comment in self._generate(serialize_diff(shard, context)):
+            comments.append(comment)
+            yield comment
+        self._store_shard(shard, comments)
+
+    async def _areview_shard(self, shard: List[Dict[str, Any]]) -> AsyncIterator[ReviewComment]:
+        comments = []
+        context: Optional[Dict[str, ContextRows]] = None
+        if self.context_provider is not None:
+            context = await self.context_provider.afor_shard(shard)
+        async for comment in self._agenerate(serialize_diff(shard, context)):
+            comments.append(comment)
+            yield comment
+        await asyncio.to_thread(self._store_shard, shard, comments)
+
+    def _store_shard(self, shard: List[Dict[str, Any]], comments: List[ReviewComment]) -> None:
+        if self.review_cache is None:
+            return
+        for file_diff in shard:
+            path = file_diff['file']
+            file_comments = [c for c in comments if c.file == path]
+            for chunk in file_diff['chunks']:
+                new_lines, old_lines = hunk_lines(chunk)
+                self.review_cache.store(path, chunk, [
+                    c for c in file_comments
+                    if c.line_number in (old_lines if c.change_type == ChangeType.DELETION else new_lines)
+                ])
+
+    def _skip_cached(self, structured_diff: Iterable[Dict[str, Any]],
+                     cached: List[ReviewComment]) -> Iterator[Dict[str, Any]]:
+        """Yield the hunks that still need the LLM; comments of cached hunks go to `cached`."""
+        if self.review_cache is None:
+            yield from structured_diff
+            return
+        for file_diff in structured_diff:
+            pending = self._pending_file(file_diff, cached)
+            if pending is not None:
+                yield pending
+        self._log_cache_stats()
+
+    def _pending_file(self, file_diff: Dict[str, Any], cached: List[ReviewComment]) -> Optional[Dict[str, Any]]:
+        """The part of one file that still needs the LLM, or None; cached comments go to `cached`."""
+        if self.review_cache is None:
+            return file_diff
+        pending_chunks = []
+        # Looked up in the same parts `_store_shard` caches: shards hold oversized hunks split up
+        for chunk in self.sharder.split_oversized(file_diff['file'], file_diff['chunks']):
+            hit = self.review_cache.lookup(file_diff['file'], chunk)
+            if hit is None:
+                pending_chunks.append(chunk)
+            else:
+                cached.extend(hit)
+        return {**file_diff, 'chunks': pending_chunks} if pending_chunks else None
+
+    def _log_cache_stats(self) -> None:
+        if self.review_cache is None:
+            return
+        stats = self.review_cache.stats
+        logger.info(f"Review cache: {stats.hits} hits, {stats.misses} misses ({stats.hit_ratio:.0%} hit ratio)")
+
+    @staticmethod
+    def merge_comments(comments: Iterable[ReviewComment]) -> List[ReviewComment]:
+        """Sort comments by file and line and drop exact duplicates."""
+        seen = set()
+        merged = []
+        for comment in sorted(comments, key=lambda c: (c.file, c.line_number)):
+            key = (comment.file, comment.line_number, comment.change_type, comment.comment.strip())
+            if key not in seen:
+                seen.add(key)
+                merged.append(comment)
+        return merged
+
+    def generate_comments_for_diff(self, structured_diff: List[Dict[str, Any]]) -> ReviewResponse:
+        """Review a structured diff (or one shard of it) with a single LLM call."""
+        return ReviewResponse(comments=list(self._generate(serialize_diff(structured_diff))))
+
     def generate_comments(self, changes: List[Dict[str, Any]]) -> ReviewResponse:
         logger.info(f"Generating review comments for {len(changes)} changes.")
+        return ReviewResponse(comments=list(self._generate(serialize_changes(changes))))
+
+    def _generate(self, serialized_diff: str) -> Iterator[ReviewComment]:
+        system_prompt = self._system_prompt(serialized_diff)
+        if self.streaming:
+            comments_list = self.llm_service.stream_comments(system_prompt)
+        else:
+            comments_list = self._comment_list(self.llm_service.complete(system_prompt))
+        generated = 0
+        for comment in comments_list:
+            review_comment = self._to_review_comment(comment)
+            if review_comment is not None:
+                generated += 1
+                yield review_comment
+        logger.info(f"Generated {generated} review comments.")
+
+    async def _agenerate(self, serialized_diff: str) -> AsyncIterator[ReviewComment]:
+        system_prompt = self._system_prompt(serialized_diff)
+        if self.streaming:
+            comments_list = self.llm_service.astream_comments(system_prompt)
+        else:
+            comments_list = aiter_items(self._comment_list(await self.llm_service.acomplete(system_prompt)))
+        generated = 0
+        async for comment in comments_list:
+            review_comment = self._to_review_comment(comment)
+            if review_comment is not None:
+                generated += 1
+                yield review_comment
+        logger.info(f"Generated {generated} review comments.")
+
+    def _system_prompt(self, serialized_diff: str) -> str:
         pr_metadata = {
             "title": self.pr_details["title"],
             "body": self.pr_details["body"]
         }
 
         system_prompt: str = PR_REVIEW_PROMPT.format(
-            changes=changes,
+            changes=serialized_diff,
             pr_metadata=pr_metadata
         )
-        self.llm_service.set_system_prompt(system_prompt)
-        comments_list = self.llm_service.generate_response()
-        review_comments = [
-            ReviewComment(
+        logger.info(f"Sending ~{estimate_tokens(system_prompt)} prompt tokens to the LLM.")
+        return system_prompt
+
+    @staticmethod
+    def _comment_list(response: Any) -> List[Dict[str, Any]]:
+        """The comment array of a non-streamed completion."""
+        if isinstance(response, dict):
+            # json_object mode sometimes wraps the array in an object
+            response = response.get("comments", response)
+        if not isinstance(response, list):
+            raise ValueError(f"Unexpected LLM response: {response}")
+        return response
+
+    @staticmethod
+    def _to_review_comment(comment: Dict[str, Any]) -> Optional[ReviewComment]:
+        """Validate one comment object from the LLM; malformed ones are logged and dropped."""
+        try:
+            return ReviewComment(
                 file=comment["file"],
                 line_number=comment["line_number"],
                 line_content=comment["line_content"],
@@ -80,7 +389,8 @@ class ReviewService:
                 severity=SeverityLevel(comment["severity"]),
                 comment=comment["comment"]
             )
-            for comment in comments_list
-        ]
-        logger.info(f"Generated {len(review_comments)} review comments.")
-        return ReviewResponse(comments=review_comments)
\ No newline at end of file
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Dropping malformed LLM comment {comment!r}: {e}")
+            DROPPED_COMMENTS.inc(reason="malformed")
+            return None
+
@@ -1,50 +1,224 @@
-from google.cloud import secretmanager
 from loguru import logger
 import json
-from typing import Dict, Any
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, Protocol, Tuple
+
+DEFAULT_SECRET_TTL = 300.0
+DEFAULT_SECRET_REFRESH_MARGIN = 60.0
+
+
+class SecretSource(Protocol):
+    def load(self, secret_id: str) -> Dict[str, Any]: ...
+
 
 class SecretService:
     def __init__(self, project_id: str):
+        # Imported here so the local backend never pays for the gRPC stack
+        from google.cloud import secretmanager
+
         self.client = secretmanager.SecretManagerServiceClient()
         self.project_id = project_id
         self.project_path = f"projects/{project_id}"
         self._secrets_cache: Dict[str, Any] = {}
 
+    def load(self, secret_id: str) -> Dict[str, Any]:
+        """
+        Fetch the latest version of a secret from Secret Manager, bypassing
+        the instance cache.
+
+        Raises:
+            ValueError: If secrets cannot be retrieved
+        """
+        try:
+            name = f"{self.project_path}/secrets/{secret_id}/versions/latest"
+            response = self.client.access_secret_version(request={"name": name})
+            return json.loads(response.payload.data.decode("UTF-8"))
+        except Exception as e:
+            logger.error(f"Error accessing secrets: {str(e)}")
+            raise ValueError(f"Failed to retrieve secrets: {str(e)}")
+
     def get_secrets(self, secret_id: str) -> Dict[str, Any]:
         """
         Get all secrets from Secret Manager.
         The secrets are stored in a single JSON file in Secret Manager.
-        
+
         Returns:
             Dictionary containing all secrets
-            
+
         Raises:
             ValueError: If secrets cannot be retrieved
         """
         if not self._secrets_cache:
-            try:
-                name = f"{self.project_path}/secrets/{secret_id}/versions/latest"
-                response = self.client.access_secret_version(request={"name": name})
-                self._secrets_cache = json.loads(response.payload.data.decode("UTF-8"))
-            except Exception as e:
-                logger.error(f"Error accessing secrets: {str(e)}")
-                raise ValueError(f"Failed to retrieve secrets: {str(e)}")
+            self._secrets_cache = self.load(secret_id)
         return self._secrets_cache
 
     def get_secret(self, secret_id: str, key: str) -> str:
         """
         Get a specific secret from the secrets dictionary.
-        
+
         Args:
             key: The key of the secret to retrieve
-            
+
         Returns:
             The secret value as a string
-            
+
+        Raises:
+            ValueError: If the secret cannot be retrieved
+        """
+        secrets = self.get_secrets(secret_id)
+        if key not in secrets:
+            raise ValueError(f"Secret key '{key}' not found in secrets")
+        return secrets[key]
+
+
+class LocalSecretSource:
+    """
+    Stand-in for Secret Manager in tests and local runs.
+
+    Secrets come from a JSON file when `path` is set; any key missing there
+    falls back to the upper-cased environment variable (`github_token` ->
+    `GITHUB_TOKEN`).
+    """
+
+    ENV_KEYS = ("github_token", "github_webhook_secret", "gemini_api_key")
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+
+    def load(self, secret_id: str) -> Dict[str, Any]:
+        secrets: Dict[str, Any] = {}
+        if self.path:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    secrets = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ValueError(f"Failed to read local secrets from {self.path}: {e}")
+        for key in self.ENV_KEYS:
+            if key not in secrets and os.getenv(key.upper()):
+                secrets[key] = os.getenv(key.upper())
+        return secrets
+
+
+class SecretProvider:
+    """
+    Process-wide, thread-safe secret cache in front of a `SecretSource`.
+
+    Secrets are kept for `ttl` seconds. A read within `refresh_margin` of
+    expiry, or after it, returns the cached value and refreshes it on a
+    background thread, so callers on the hot path never wait on Secret
+    Manager once the secret has been loaded, even after the process sat idle
+    past the TTL. If a refresh fails, the cached value keeps being served
+    and the next read tries again. Only the first load of a secret (or one
+    after `invalidate`) blocks; concurrent misses share that load.
+    """
+
+    def __init__(self, source: SecretSource, ttl: float = DEFAULT_SECRET_TTL,
+                 refresh_margin: float = DEFAULT_SECRET_REFRESH_MARGIN):
+        if refresh_margin >= ttl:
+            raise ValueError("refresh_margin must be shorter than ttl")
+        self.source = source
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._loading: Dict[str, threading.Event] = {}
+        self._refreshing: set = set()
+
+    def get_secrets(self, secret_id: str) -> Dict[str, Any]:
+        """
+        Return the secrets stored under `secret_id`, loading them on a miss.
+
+        Raises:
+            ValueError: If secrets cannot be retrieved
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(secret_id)
+                now = time.monotonic()
+                if entry is not None:
+                    # Expired entries are served too; the refresh replaces them shortly
+                    if entry[1] - now <= self.refresh_margin and secret_id not in self._refreshing:
+                        self._refreshing.add(secret_id)
+                        threading.Thread(target=self._refresh, args=(secret_id,),
+                                         name=f"secret-refresh-{secret_id}", daemon=True).start()
+                    return entry[0]
+                pending = self._loading.get(secret_id)
+                if pending is None:
+                    pending = self._loading[secret_id] = threading.Event()
+                    break
+            # Another caller is loading this secret; wait for it and re-check.
+            # If its load failed, the next pass loads again instead of failing on its error.
+            pending.wait()
+
+        try:
+            return self._store(secret_id, self.source.load(secret_id))
+        finally:
+            with self._lock:
+                self._loading.pop(secret_id, None)
+            pending.set()
+
+    def get_secret(self, secret_id: str, key: str) -> str:
+        """
+        Get a specific secret from the secrets dictionary.
+
         Raises:
             ValueError: If the secret cannot be retrieved
         """
         secrets = self.get_secrets(secret_id)
         if key not in secrets:
             raise ValueError(f"Secret key '{key}' not found in secrets")
-        return secrets[key] 
\ No newline at end of file
+        return secrets[key]
+
+    def invalidate(self, secret_id: Optional[str] = None) -> None:
+        """Drop one cached secret, or all of them, e.g. after a rotation."""
+        with self._lock:
+            if secret_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(secret_id, None)
+
+    def _store(self, secret_id: str, secrets: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._entries[secret_id] = (secrets, time.monotonic() + self.ttl)
+        return secrets
+
+    def _refresh(self, secret_id: str) -> None:
+        try:
+            self._store(secret_id, self.source.load(secret_id))
+            logger.debug(f"Refreshed secret {secret_id}")
+        except Exception as e:
+            logger.warning(f"Background refresh of secret {secret_id} failed; serving the cached value: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(secret_id)
+
+
+_default_provider: Optional[SecretProvider] = None
+_default_provider_lock = threading.Lock()
+
+
+def get_secret_provider(project_id: Optional[str] = None) -> SecretProvider:
+    """
+    Process-wide provider. Secret Manager in `project_id` by default; set
+    SECRET_BACKEND=local to read LOCAL_SECRETS_FILE and environment variables
+    instead. SECRET_CACHE_TTL and SECRET_REFRESH_MARGIN tune the cache.
+    """
+    global _default_provider
+    if _default_provider is None:
+        with _default_provider_lock:
+            if _default_provider is None:
+                if os.getenv("SECRET_BACKEND", "secretmanager").lower() == "local":
+                    source: SecretSource = LocalSecretSource(os.getenv("LOCAL_SECRETS_FILE") or None)
+                else:
+                    project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT")
+                    if not project_id:
+                        raise ValueError("GOOGLE_CLOUD_PROJECT environment variable is not set")
+                    source = SecretService(project_id)
+                _default_provider = SecretProvider(
+                    source,
+                    ttl=float(os.getenv("SECRET_CACHE_TTL", DEFAULT_SECRET_TTL)),
+                    refresh_margin=float(os.getenv("SECRET_REFRESH_MARGIN", DEFAULT_SECRET_REFRESH_MARGIN)),
+                )
+    return _default_provider
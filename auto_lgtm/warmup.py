@@ -0,0 +1,103 @@
+"""
+Start-up warm-up for the webhook service.
+
+Heavy dependencies (openai, Secret Manager, rich) are imported on first use so
+the process can start serving quickly. `warm_up` pays for that first use ahead
+of time: it imports the review pipeline, loads the secrets, builds the pooled
+LLM client and opens a pooled connection to the GitHub API, so the first
+delivery after a cold start is not slower than the rest.
+"""
+import importlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+WARMUP_MODES = ("sync", "background", "off")
+# Imported by the first review; listed explicitly because they are lazy everywhere else
+WARMUP_MODULES = ("auto_lgtm.lgtm", "openai")
+
+
+def _import_review_pipeline() -> None:
+    for module in WARMUP_MODULES:
+        importlib.import_module(module)
+
+
+def _open_github_connection(project_id: Optional[str], secret_id: Optional[str]) -> None:
+    """Open a pooled connection to GitHub; `/rate_limit` does not count against the quota."""
+    from auto_lgtm.common.github_client import GitHubApiClient
+    from auto_lgtm.services.secret_service import get_secret_provider
+
+    token = get_secret_provider(project_id).get_secret(secret_id, "github_token")
+    GitHubApiClient(token, owner="").get("/rate_limit")
+
+
+def _build_llm_client(project_id: Optional[str], secret_id: Optional[str]) -> None:
+    from auto_lgtm.common.llm_client import get_default_llm_pool
+    from auto_lgtm.services.secret_service import get_secret_provider
+
+    api_key = get_secret_provider(project_id).get_secret(secret_id, "gemini_api_key")
+    get_default_llm_pool().client(api_key)
+
+
+def _load_secrets(project_id: Optional[str], secret_id: Optional[str]) -> None:
+    from auto_lgtm.services.secret_service import get_secret_provider
+
+    get_secret_provider(project_id).get_secrets(secret_id)
+
+
+def warm_up(project_id: Optional[str], secret_id: Optional[str]) -> Dict[str, float]:
+    """
+    Run every warm-up step and return the seconds each one took.
+
+    A failing step is logged and skipped; whatever it would have prepared is
+    then done lazily by the first request instead.
+    """
+    steps: Dict[str, Callable[[], None]] = {
+        "imports": _import_review_pipeline,
+        "secrets": lambda: _load_secrets(project_id, secret_id),
+        "llm_client": lambda: _build_llm_client(project_id, secret_id),
+        "github_connection": lambda: _open_github_connection(project_id, secret_id),
+    }
+    timings: Dict[str, float] = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {str(e)}")
+        timings[name] = time.perf_counter() - start
+    summary = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+    logger.info(f"Warm-up finished in {sum(timings.values()) * 1000:.0f} ms ({summary})")
+    return timings
+
+
+def start_warm_up(project_id: Optional[str], secret_id: Optional[str],
+                  mode: Optional[str] = None) -> Optional[threading.Thread]:
+    """
+    Warm up according to `mode` (default: the `STARTUP_WARMUP` env var, "sync").
+
+    "sync" blocks until done, so the service only accepts traffic once warm;
+    "background" returns immediately and warms up in a daemon thread, which
+    requests arriving in the meantime simply wait on (secrets are
+    single-flight); "off" leaves everything to the first request.
+
+    Returns:
+        The background thread in "background" mode, otherwise None
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    mode = (mode or os.getenv("STARTUP_WARMUP", "sync")).lower()
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"STARTUP_WARMUP must be one of {', '.join(WARMUP_MODES)}, got '{mode}'")
+    if mode == "off":
+        return None
+    if mode == "sync":
+        warm_up(project_id, secret_id)
+        return None
+    thread = threading.Thread(target=warm_up, args=(project_id, secret_id), name="warm-up", daemon=True)
+    thread.start()
+    return thread
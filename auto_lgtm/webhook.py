@@ -1,36 +1,116 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 import hmac
 import hashlib
 import os
-from auto_lgtm.lgtm import review_pr
+from typing import Any, Dict, Optional, Tuple
+from auto_lgtm.common import fast_json
+from auto_lgtm.common.metrics import REGISTRY
 from auto_lgtm.common.rich_logger import RichLogger
-from auto_lgtm.services.secret_service import SecretService
+from auto_lgtm.services.job_queue import job_queue_from_env
+from auto_lgtm.services.secret_service import get_secret_provider
+from auto_lgtm.services.review_coordinator import (
+    DEFAULT_COALESCE_SECONDS, ReviewCoordinator, ReviewJob, SubmitOutcome
+)
+from auto_lgtm.warmup import start_warm_up
 
 
 SECRET_ID = os.getenv("SECRET_ID")
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
-if not PROJECT_ID:
+if not PROJECT_ID and os.getenv("SECRET_BACKEND", "secretmanager").lower() != "local":
     raise ValueError("GOOGLE_CLOUD_PROJECT environment variable is not set")
 
+REVIEWED_PR_ACTIONS = {"opened", "synchronize", "reopened"}
+_ACTION_PREFIX = b'{"action":"'
+
 app = FastAPI()
 logger = RichLogger()
 
+
+def run_review(job: ReviewJob) -> None:
+    # The review pipeline (openai included) is imported by the startup warm-up, not at import time
+    from auto_lgtm.lgtm import review_pr
+
+    review_pr(job.repo, job.pr_number, job.owner, PROJECT_ID,
+              head_sha=job.head_sha, is_current=job.is_current)
+
+
+review_coordinator = ReviewCoordinator(
+    run_review,
+    coalesce_seconds=float(os.getenv("REVIEW_COALESCE_SECONDS", DEFAULT_COALESCE_SECONDS)),
+)
+# With REVIEW_QUEUE_PATH set, deliveries are recorded in a durable queue and reviewed by
+# `auto_lgtm.worker` processes instead of the in-process coordinator
+job_queue = job_queue_from_env()
+worker_pool = None
+
+
+@app.on_event("startup")
+def warm_up_service():
+    """
+    Import the review pipeline, load the secrets and open the GitHub connection
+    before the first delivery (STARTUP_WARMUP=sync|background|off, see `warmup`).
+    """
+    start_warm_up(PROJECT_ID, SECRET_ID)
+
+
+@app.on_event("startup")
+def start_review_workers():
+    """Start REVIEW_QUEUE_WORKERS worker processes for the durable queue, if both are configured."""
+    global worker_pool
+    processes = int(os.getenv("REVIEW_QUEUE_WORKERS", "0"))
+    if job_queue is not None and processes > 0:
+        from auto_lgtm.worker import WorkerPool
+
+        worker_pool = WorkerPool(processes)
+        worker_pool.start(job_queue)
+
+
+@app.on_event("shutdown")
+def shutdown_review_coordinator():
+    review_coordinator.shutdown(wait=False)
+    if worker_pool is not None:
+        worker_pool.stop()
+    from auto_lgtm.common.llm_client import get_default_llm_pool
+
+    get_default_llm_pool().close()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Cloud Run"""
     return {"status": "healthy"}
 
+# Plain `def` endpoints run in FastAPI's threadpool, so job queue reads never block the event loop
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: review stages, GitHub and LLM calls, caches, dropped comments and the job queue"""
+    if job_queue is not None:
+        job_queue.export_metrics()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/queue")
+def queue_stats():
+    """Depth of the durable review queue and the latency of recently finished jobs"""
+    if job_queue is None:
+        raise HTTPException(status_code=404, detail="REVIEW_QUEUE_PATH is not set")
+    return job_queue.stats().to_dict()
+
 def verify_github_signature(payload_body: bytes, signature_header: str, project_id: str) -> bool:
-    """Verify that the webhook payload was sent by GitHub"""
+    """
+    Verify that the webhook payload was sent by GitHub.
+
+    The webhook secret comes from the process-wide secret cache, which is
+    warmed at startup and refreshed in the background, so this is an
+    in-memory HMAC check.
+    """
     if not signature_header:
         return False
     
     try:
-        secret_service = SecretService(project_id)
-        webhook_secret = secret_service.get_secret(SECRET_ID, "github_webhook_secret")
+        webhook_secret = get_secret_provider(project_id).get_secret(SECRET_ID, "github_webhook_secret")
         if not webhook_secret:
-            logger.error("GitHub webhook secret not found in secrets")
+            logger.print_error("GitHub webhook secret not found in secrets")
             return False
             
         expected_signature = hmac.new(
@@ -42,51 +122,101 @@ def verify_github_signature(payload_body: bytes, signature_header: str, project_
         actual_signature = signature_header.replace('sha256=', '')
         return hmac.compare_digest(expected_signature, actual_signature)
     except Exception as e:
-        logger.error(f"Error verifying signature: {str(e)}")
+        logger.print_error(f"Error verifying signature: {str(e)}")
         return False
 
+def _peek_action(payload_body: bytes) -> Optional[str]:
+    """
+    Read the `action` of a GitHub payload without decoding it. GitHub puts
+    `action` first; for any other layout this returns None and the caller
+    falls back to the decoded payload.
+    """
+    if not payload_body.startswith(_ACTION_PREFIX):
+        return None
+    end = payload_body.find(b'"', len(_ACTION_PREFIX))
+    if end == -1:
+        return None
+    return payload_body[len(_ACTION_PREFIX):end].decode("ascii", "replace")
+
+
+def extract_pr_event(payload: Dict[str, Any]) -> Tuple[Optional[str], Optional[int], Optional[str], Optional[str]]:
+    """Return (repo, pr_number, head_sha, owner) from a pull_request payload."""
+    repository = payload.get("repository") or {}
+    pr = payload.get("pull_request") or {}
+    return (
+        repository.get("name"),
+        pr.get("number"),
+        (pr.get("head") or {}).get("sha"),
+        (repository.get("owner") or {}).get("login"),
+    )
+
+
 @app.post("/webhook")
 async def github_webhook(request: Request):
-    signature = request.headers.get("X-Hub-Signature-256")
-    
-    payload_body = await request.body()
-    
-    if not verify_github_signature(payload_body, signature, PROJECT_ID):
-        raise HTTPException(status_code=401, detail="Invalid signature")
-    
-    payload = await request.json()
-    
+    """
+    Queue a review for pull request events.
+
+    Everything that can be rejected cheaply is rejected before the payload is
+    decoded: other event types from the headers alone, and unreviewed PR
+    actions from the start of the body. The verified body is then decoded
+    exactly once (with orjson when installed, see `fast_json`).
+    """
     if request.headers.get("X-GitHub-Event") != "pull_request":
         return JSONResponse(content={"message": "Not a pull request event"})
-    
-    if payload.get("action") != "opened":
-        return JSONResponse(content={"message": "Not a PR open event"})
+
+    payload_body = await request.body()
+    action = _peek_action(payload_body)
+    if action is not None and action not in REVIEWED_PR_ACTIONS:
+        return JSONResponse(content={"message": f"Ignoring PR action '{action}'"})
+
+    if not verify_github_signature(payload_body, request.headers.get("X-Hub-Signature-256"), PROJECT_ID):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        payload = fast_json.loads(payload_body)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Payload is not valid JSON"})
+
+    if payload.get("action") not in REVIEWED_PR_ACTIONS:
+        return JSONResponse(content={"message": f"Ignoring PR action '{payload.get('action')}'"})
     
     try:
-        pr = payload.get("pull_request", {})
-        repo = payload.get("repository", {}).get("name")
-        pr_number = pr.get("number")
-        github_owner = payload.get("repository", {}).get("owner", {}).get("login")
+        repo, pr_number, head_sha, github_owner = extract_pr_event(payload)
         
-        if not all([repo, pr_number, github_owner]):
-            logger.error("Missing required fields in payload")
+        if not all([repo, pr_number, head_sha, github_owner]):
+            logger.print_error("Missing required fields in payload")
             return JSONResponse(
                 status_code=400,
                 content={"error": "Missing required fields in payload"}
             )
         
-        # Set environment variables for the review process
-        os.environ["REPO_NAME"] = repo
-        os.environ["PR_NUMBER"] = str(pr_number)
-        
-        review_pr(repo, pr_number, github_owner, PROJECT_ID)
+        if job_queue is not None:
+            # SQLite may wait on workers' writes; keep that off the event loop
+            outcome = await run_in_threadpool(
+                job_queue.enqueue, github_owner, repo, pr_number, head_sha,
+                delivery_id=request.headers.get("X-GitHub-Delivery")
+            )
+        else:
+            outcome = review_coordinator.submit(
+                github_owner, repo, pr_number, head_sha,
+                delivery_id=request.headers.get("X-GitHub-Delivery")
+            )
+        if outcome in (SubmitOutcome.DUPLICATE_DELIVERY, SubmitOutcome.DUPLICATE_SHA):
+            return JSONResponse(content={
+                "message": "Duplicate event ignored",
+                "reason": outcome.value,
+                "repo": repo,
+                "pr_number": pr_number
+            })
         
-        return JSONResponse(content={
-            "message": "Review process triggered successfully",
+        return JSONResponse(status_code=202, content={
+            "message": "Review queued",
+            "outcome": outcome.value,
             "repo": repo,
-            "pr_number": pr_number
+            "pr_number": pr_number,
+            "head_sha": head_sha
         })
         
     except Exception as e:
         logger.print_error(f"Error processing webhook: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
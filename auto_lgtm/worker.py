@@ -0,0 +1,215 @@
+"""
+Review workers for the durable job queue (see `services.job_queue`).
+
+The webhook only records jobs when REVIEW_QUEUE_PATH is set; these
+processes review them. Run them next to the webhook on the same volume:
+
+    python -m auto_lgtm.worker --processes 4
+    python -m auto_lgtm.worker --stats
+
+or let the webhook start them itself with REVIEW_QUEUE_WORKERS=N.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Callable, List, Optional
+
+from loguru import logger
+
+from auto_lgtm.services.job_queue import QueuedJob, SQLiteJobQueue, default_worker_id, job_queue_from_env
+from auto_lgtm.services.review_coordinator import ReviewJob
+
+DEFAULT_POLL_INTERVAL = 1.0
+# Seconds a stopping worker gets to finish its review; an unfinished job is resumed once its lease expires
+DEFAULT_STOP_GRACE = 30.0
+PRUNE_INTERVAL = 3600.0
+
+
+def run_review_job(job: ReviewJob) -> None:
+    from auto_lgtm.lgtm import review_pr
+
+    review_pr(job.repo, job.pr_number, job.owner, os.getenv("GOOGLE_CLOUD_PROJECT"),
+              head_sha=job.head_sha, is_current=job.is_current)
+
+
+class JobWorker:
+    """
+    Claims jobs from the queue one at a time and reviews them.
+
+    While a review runs a heartbeat thread renews the lease every third of
+    the lease period, so only a worker that died or hung loses its job. A
+    review that raises is retried with backoff (see `SQLiteJobQueue.fail`);
+    a job whose PR got a newer head SHA is finished as superseded, before or
+    during the review (through `ReviewJob.is_current`).
+    """
+
+    def __init__(self, queue: SQLiteJobQueue, review_fn: Callable[[ReviewJob], None] = run_review_job,
+                 worker_id: Optional[str] = None, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.queue = queue
+        self.review_fn = review_fn
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        """Process jobs until `stop_event` is set; the job at hand is finished first."""
+        logger.info(f"Review worker {self.worker_id} started")
+        while not self.stop_event.is_set():
+            if not self.run_once():
+                self.stop_event.wait(self.poll_interval)
+        logger.info(f"Review worker {self.worker_id} stopped")
+
+    def run_once(self) -> bool:
+        """Claim and process one job; False when none was due."""
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+        if not self.queue.is_current(job):
+            logger.info(f"Skipping superseded review of {job.repo}#{job.pr_number} at {job.head_sha[:7]}")
+            self.queue.complete(job, status="superseded")
+            return True
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done),
+                                     name=f"heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+        try:
+            self.review_fn(ReviewJob(job.owner, job.repo, job.pr_number, job.head_sha, job.delivery_id,
+                                     is_current=lambda: self.queue.is_current(job)))
+        except Exception as e:
+            delay = self.queue.fail(job, str(e))
+            if delay is None:
+                logger.error(f"Review of {job.repo}#{job.pr_number} at {job.head_sha[:7]} failed "
+                             f"after {job.attempts} attempts: {e}")
+            else:
+                logger.warning(f"Review of {job.repo}#{job.pr_number} at {job.head_sha[:7]} failed "
+                               f"(attempt {job.attempts}), retrying in {delay:.0f}s: {e}")
+        else:
+            status = "done" if self.queue.is_current(job) else "superseded"
+            if not self.queue.complete(job, status=status):
+                logger.warning(f"Review job {job.id} lost its lease before completing")
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat(self, job: QueuedJob, done: threading.Event) -> None:
+        while not done.wait(self.queue.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(job):
+                    logger.warning(f"Review job {job.id} is no longer leased to {self.worker_id}")
+                    return
+            except Exception as e:
+                # A busy database delays one renewal; the lease tolerates two misses
+                logger.warning(f"Could not renew the lease of review job {job.id}: {e}")
+
+
+def _worker_process(index: int) -> None:
+    """Entry point of one worker process: its own queue connection, stopped by SIGTERM."""
+    queue = job_queue_from_env()
+    if queue is None:
+        raise ValueError("REVIEW_QUEUE_PATH environment variable is not set")
+    worker = JobWorker(queue, worker_id=f"{default_worker_id()}/{index}")
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop_event.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from auto_lgtm.warmup import start_warm_up
+
+    try:
+        start_warm_up(os.getenv("GOOGLE_CLOUD_PROJECT"), os.getenv("SECRET_ID"))
+    except Exception as e:
+        logger.warning(f"Worker warm-up failed, continuing cold: {e}")
+    try:
+        worker.run()
+    finally:
+        queue.close()
+
+
+class WorkerPool:
+    """
+    Runs `processes` worker processes and restarts any that exits while the
+    pool is running. Processes are spawned rather than forked, so a pool
+    started inside the webhook does not inherit its threads or connections.
+    """
+
+    def __init__(self, processes: int, stop_grace: float = DEFAULT_STOP_GRACE):
+        if processes < 1:
+            raise ValueError(f"processes must be at least 1, got {processes}")
+        self.processes = processes
+        self.stop_grace = stop_grace
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[Optional[multiprocessing.process.BaseProcess]] = [None] * processes
+        self._stopping = threading.Event()
+
+    def _start(self, index: int) -> None:
+        process = self._context.Process(target=_worker_process, args=(index,),
+                                        name=f"review-worker-{index}", daemon=True)
+        process.start()
+        self._workers[index] = process
+
+    def run(self, queue: Optional[SQLiteJobQueue] = None) -> None:
+        """Supervise the workers until `stop`; with a `queue`, old finished jobs are pruned hourly."""
+        for index in range(self.processes):
+            self._start(index)
+        logger.info(f"Started {self.processes} review worker processes")
+        last_prune = 0.0
+        while not self._stopping.wait(1.0):
+            for index, process in enumerate(self._workers):
+                if process is not None and not process.is_alive() and not self._stopping.is_set():
+                    logger.error(f"Review worker {index} exited with code {process.exitcode}; restarting it")
+                    self._start(index)
+            if queue is not None and time.monotonic() - last_prune > PRUNE_INTERVAL:
+                last_prune = time.monotonic()
+                pruned = queue.prune()
+                if pruned:
+                    logger.info(f"Pruned {pruned} finished review jobs")
+        self._shutdown()
+
+    def start(self, queue: Optional[SQLiteJobQueue] = None) -> threading.Thread:
+        """Run the supervisor in a daemon thread."""
+        thread = threading.Thread(target=self.run, args=(queue,), name="review-worker-pool", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _shutdown(self) -> None:
+        processes = [process for process in self._workers if process is not None]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.stop_grace
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not finish in {self.stop_grace:.0f}s; its job will be resumed")
+                process.kill()
+                process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Review workers for the durable job queue (REVIEW_QUEUE_PATH)")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("REVIEW_QUEUE_WORKERS") or os.cpu_count() or 1),
+                        help="Number of worker processes (default: REVIEW_QUEUE_WORKERS or the CPU count)")
+    parser.add_argument("--stats", action="store_true", help="Print queue depth and job latency as JSON and exit")
+    args = parser.parse_args()
+
+    queue = job_queue_from_env()
+    if queue is None:
+        parser.error("REVIEW_QUEUE_PATH environment variable is not set")
+    if args.stats:
+        print(json.dumps(queue.stats().to_dict(), indent=2))
+        return
+
+    pool = WorkerPool(args.processes)
+    signal.signal(signal.SIGTERM, lambda *_: pool.stop())
+    signal.signal(signal.SIGINT, lambda *_: pool.stop())
+    pool.run(queue)
+
+
+if __name__ == "__main__":
+    main()
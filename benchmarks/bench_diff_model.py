@@ -0,0 +1,151 @@
+"""
+Memory and time of the diff data model: the per-line dicts the parser used
+to build (plus the flat `DiffParser.parse` copy made from them) versus the
+compact `DiffFile`/`Hunk` model, on a synthetic diff.
+
+    python -m benchmarks.bench_diff_model                 # 100k diff lines
+    python -m benchmarks.bench_diff_model --lines 500000 --files 200
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from auto_lgtm.models.review_models import ChangeType
+from auto_lgtm.prompts.diff_serializer import serialize_diff
+from auto_lgtm.services.diff_stream import iter_parse_diff
+
+
+def make_diff(total_lines: int, files: int, seed: int = 7) -> str:
+    """Unified diff of `files` files with `total_lines` +/-/context lines in hunks of ~40 lines."""
+    rng = random.Random(seed)
+    words = ["value", "result", "self", "return", "items", "config", "logger", "request", "None", "index"]
+    per_file = max(total_lines // files, 1)
+    rows = []
+    for number in range(files):
+        path = f"src/module_{number}/file_{number}.py"
+        rows.append(f"diff --git a/{path} b/{path}")
+        rows.append(f"--- a/{path}")
+        rows.append(f"+++ b/{path}")
+        written = 0
+        old_start = new_start = 1
+        while written < per_file:
+            size = min(40, per_file - written)
+            rows.append(f"@@ -{old_start},{size} +{new_start},{size} @@")
+            for _ in range(size):
+                code = f"    {rng.choice(words)} = {rng.choice(words)}({rng.choice(words)}, {rng.randint(0, 999)})"
+                rows.append(rng.choice("+- ") + code)
+            written += size
+            old_start += size + 20
+            new_start += size + 20
+    return "\n".join(rows)
+
+
+def parse_as_dicts(lines):
+    """The dict-per-line model the parser produced before `DiffFile`."""
+    result = []
+    current_file = current_chunk = None
+    new_line = old_line = 0
+    for line in lines:
+        if line.startswith('diff --git'):
+            if current_file:
+                if current_chunk:
+                    current_file['chunks'].append(current_chunk)
+                result.append(current_file)
+            current_file = {'file': line.split(' ')[2][2:], 'chunks': []}
+            current_chunk = None
+        elif line.startswith('@@'):
+            if current_chunk:
+                current_file['chunks'].append(current_chunk)
+            numbers = line.split(' ')[1:3]
+            old_line = int(numbers[0].split(',')[0][1:])
+            new_line = int(numbers[1].split(',')[0][1:])
+            current_chunk = {'old_start': old_line, 'new_start': new_line, 'changes': []}
+        elif current_chunk is None:
+            continue
+        elif line.startswith('+'):
+            current_chunk['changes'].append({'type': 'ADDITION', 'line': new_line, 'content': line[1:]})
+            new_line += 1
+        elif line.startswith('-'):
+            current_chunk['changes'].append({'type': 'DELETION', 'line': old_line, 'content': line[1:]})
+            old_line += 1
+        elif line.startswith(' '):
+            current_chunk['changes'].append({'type': 'CONTEXT', 'line': new_line, 'content': line[1:]})
+            new_line += 1
+            old_line += 1
+    if current_file:
+        if current_chunk:
+            current_file['chunks'].append(current_chunk)
+        result.append(current_file)
+    return result
+
+
+def flatten_as_dicts(structured_diff):
+    """The flat copy `DiffParser.parse` made of the dict model."""
+    return [
+        {"file": file_diff['file'], "line_number": change['line'], "line_content": change['content'],
+         "change_type": ChangeType.ADDITION if change['type'] == 'ADDITION' else ChangeType.DELETION}
+        for file_diff in structured_diff for chunk in file_diff['chunks']
+        for change in chunk['changes'] if change['type'] != 'CONTEXT'
+    ]
+
+
+def legacy_model(lines):
+    structured_diff = parse_as_dicts(lines)
+    return structured_diff, flatten_as_dicts(structured_diff)
+
+
+def compact_model(lines):
+    return list(iter_parse_diff(lines))
+
+
+def measure(build, lines):
+    """Return (result, build ms, bytes retained by the result, peak bytes while building)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = build(lines)
+    elapsed = (time.perf_counter() - start) * 1000
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained - before, peak - before
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff data model: per-line dicts vs compact arrays")
+    parser.add_argument("--lines", type=int, default=100_000, help="Diff lines to generate")
+    parser.add_argument("--files", type=int, default=100, help="Files to spread them over")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions for the timings")
+    args = parser.parse_args()
+
+    lines = make_diff(args.lines, args.files).split("\n")
+    print(f"synthetic diff: {args.files} files, {args.lines} changed/context lines")
+
+    results = {}
+    print(f"{'model':<10}{'retained MiB':>14}{'peak MiB':>12}{'parse ms':>12}{'serialize ms':>15}")
+    for name, build in (("dicts", legacy_model), ("compact", compact_model)):
+        result, _, retained, peak = measure(build, lines)
+        structured_diff = result[0] if name == "dicts" else result
+        parse_ms = timed(lambda: build(lines), args.repeat)
+        serialize_ms = timed(lambda: serialize_diff(structured_diff), args.repeat)
+        results[name] = (structured_diff, retained)
+        print(f"{name:<10}{retained / 2**20:>14.1f}{peak / 2**20:>12.1f}{parse_ms:>12.1f}{serialize_ms:>15.1f}")
+        del result
+
+    legacy_diff, legacy_bytes = results["dicts"]
+    compact_diff, compact_bytes = results["compact"]
+    assert serialize_diff(legacy_diff) == serialize_diff(compact_diff), "models disagree"
+    print(f"memory reduction: {legacy_bytes / max(compact_bytes, 1):.1f}x (identical serialized prompt)")
+
+
+if __name__ == "__main__":
+    main()
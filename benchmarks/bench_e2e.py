@@ -0,0 +1,315 @@
+"""
+End-to-end benchmark: runs `review_pr` (or `review_pr_local`) against a fake
+GitHub API and a fake OpenAI-compatible LLM on localhost, and reports wall
+time, time per stage, HTTP calls per endpoint, peak RSS and LLM tokens.
+
+    python -m benchmarks.bench_e2e                                   # 3 PRs x 20 files x 100 lines
+    python -m benchmarks.bench_e2e --files 200 --llm-latency 0.5 --token-latency 0.002
+    python -m benchmarks.bench_e2e --save benchmarks/results/main.json
+    python -m benchmarks.bench_e2e --baseline benchmarks/results/main.json   # exit 1 on regression
+    python -m benchmarks.bench_e2e --cassette slow-review.cassette --repo octo/app --pr 42 --latency-scale 0
+
+With `--cassette` the review runs against recorded GitHub and LLM traffic
+(see `benchmarks.cassette`) instead of the synthetic fakes; token counts are
+then not available.
+
+Stage times are summed over every call; LLM calls run concurrently per
+shard, so the `llm` stage can exceed the wall time. Peak RSS covers the
+whole process, fake servers included.
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from loguru import logger
+
+from benchmarks.cassette import Cassette, ReplayServer
+from benchmarks.fakes import SyntheticPR, start_fakes
+
+OWNER = "bench-owner"
+REPO = "bench-repo"
+
+
+class StageTimer:
+    """Accumulates the time spent inside wrapped methods, generators and coroutines included."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._patched = []
+
+    def _add(self, stage: str, elapsed: float, call: bool = False) -> None:
+        with self._lock:
+            self.seconds[stage] += elapsed
+            if call:
+                self.calls[stage] += 1
+
+    def wrap(self, owner, name: str, stage: str) -> None:
+        original = getattr(owner, name)
+        timer = self
+
+        if inspect.isasyncgenfunction(original):
+            @functools.wraps(original)
+            async def wrapper(*args, **kwargs):
+                timer._add(stage, 0.0, call=True)
+                iterator = original(*args, **kwargs)
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        timer._add(stage, time.perf_counter() - start)
+                        return
+                    timer._add(stage, time.perf_counter() - start)
+                    yield item
+        elif inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    timer._add(stage, time.perf_counter() - start, call=True)
+        elif inspect.isgeneratorfunction(original):
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                timer._add(stage, 0.0, call=True)
+                iterator = original(*args, **kwargs)
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        timer._add(stage, time.perf_counter() - start)
+                        return
+                    timer._add(stage, time.perf_counter() - start)
+                    yield item
+        else:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    timer._add(stage, time.perf_counter() - start, call=True)
+
+        setattr(owner, name, wrapper)
+        self._patched.append((owner, name, original))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.seconds.clear()
+            self.calls.clear()
+
+
+def configure_environment(github_url: str, llm_base_url: str, args) -> None:
+    """Point the application at the fakes; must run before auto_lgtm modules are imported."""
+    os.environ.update({
+        "GITHUB_API_URL": github_url,
+        "LLM_BASE_URL": llm_base_url,
+        "SECRET_BACKEND": "local",
+        "SECRET_ID": "bench",
+        "GITHUB_TOKEN": "bench-token",
+        "GEMINI_API_KEY": "bench-key",
+        "LLM_STREAMING": "true" if args.streaming else "false",
+        "LLM_CACHE_ENABLED": "true" if args.llm_cache else "false",
+        "REVIEW_INCREMENTAL": "false",
+        "REVIEW_PIPELINE": args.pipeline,
+        "REVIEW_CONTEXT": "true" if args.context else "false",
+    })
+
+
+def instrument(timer: StageTimer) -> None:
+    from auto_lgtm.services.async_github_service import AsyncGitHubService
+    from auto_lgtm.services.github_service import GitHubService
+    from auto_lgtm.services.llm_service import LLMService
+    from auto_lgtm.services.secret_service import SecretProvider
+
+    timer.wrap(SecretProvider, "get_secret", "secrets")
+    for service in (GitHubService, AsyncGitHubService):
+        timer.wrap(service, "fetch_pr_context", "pr_context")
+        timer.wrap(service, "iter_pr_diff", "diff_fetch_parse")
+        timer.wrap(service, "build_diff_position_index", "position_index")
+        timer.wrap(service, "fetch_file_text", "file_filter_fetch")
+        timer.wrap(service, "fetch_blob_text", "blob_fetch")
+        timer.wrap(service, "post_review", "post_review")
+    timer.wrap(LLMService, "stream_comments", "llm")
+    timer.wrap(LLMService, "complete", "llm")
+    timer.wrap(LLMService, "astream_comments", "llm")
+    timer.wrap(LLMService, "acomplete", "llm")
+
+
+def run_once(entry: str, targets, concurrent: bool = False) -> float:
+    """Review each (owner, repo, pr_number) target once and return the wall time."""
+    from auto_lgtm.lgtm import review_pr
+    from auto_lgtm.lgtm_local import review_pr_local
+
+    def review(target) -> None:
+        owner, repo, pr_number = target
+        if entry == "review_pr":
+            review_pr(repo, pr_number, owner, "bench-project", incremental=False)
+        else:
+            review_pr_local(repo, pr_number, owner, "bench-token", "bench-project", "bench-key")
+
+    start = time.perf_counter()
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            list(executor.map(review, targets))
+    else:
+        for target in targets:
+            review(target)
+    return time.perf_counter() - start
+
+
+def compare(result: dict, baseline_path: str, tolerance: float) -> bool:
+    """Print the change against a saved run; return False if wall time regressed beyond `tolerance`."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\ncompared with {baseline_path}:")
+    for key in ("wall_seconds_median", "peak_rss_mib", "prompt_tokens"):
+        before, after = baseline.get(key), result.get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regressed = change > tolerance
+        ok = ok and not (regressed and key == "wall_seconds_median")
+        print(f"  {key:<22}{before:>12.3f} -> {after:>12.3f}  ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end review benchmark against local fakes")
+    parser.add_argument("--entry", choices=("review_pr", "review_pr_local"), default="review_pr")
+    parser.add_argument("--pipeline", choices=("sync", "async"), default="sync",
+                        help="REVIEW_PIPELINE used by review_pr")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Review the PRs of an iteration concurrently, as the webhook coordinator does")
+    parser.add_argument("--prs", type=int, default=3, help="Pull requests reviewed per iteration")
+    parser.add_argument("--files", type=int, default=20, help="Files per pull request")
+    parser.add_argument("--hunks", type=int, default=5, help="Hunks per file")
+    parser.add_argument("--hunk-lines", type=int, default=20, help="Changed lines per hunk")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--github-latency", type=float, default=0.0, help="Seconds added to every GitHub GET")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds before the first LLM token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated LLM token")
+    parser.add_argument("--no-streaming", dest="streaming", action="store_false")
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM review cache on between runs")
+    parser.add_argument("--no-context", dest="context", action="store_false",
+                        help="Review without the surrounding code of changed files (REVIEW_CONTEXT=false)")
+    parser.add_argument("--save", default="benchmarks/results/e2e-latest.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Saved results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed wall time regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging")
+    parser.add_argument("--cassette", help="Replay a recorded cassette instead of the synthetic fakes")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for the recorded timing when replaying (0 = no delays)")
+    parser.add_argument("--repo", help="OWNER/REPO reviewed when replaying a cassette")
+    parser.add_argument("--pr", type=int, action="append", help="PR reviewed when replaying (repeatable)")
+    args = parser.parse_args()
+    if args.cassette and not (args.repo and "/" in args.repo and args.pr):
+        parser.error("--cassette needs --repo OWNER/REPO and at least one --pr")
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+    if args.cassette:
+        owner, repo = args.repo.split("/", 1)
+        targets = [(owner, repo, number) for number in args.pr]
+        replay = ReplayServer(Cassette.load(args.cassette), latency_scale=args.latency_scale).start()
+        servers = [replay]
+        configure_environment(replay.github_url, replay.llm_url, args)
+    else:
+        pulls = [SyntheticPR(number, args.files, args.hunks, args.hunk_lines) for number in range(1, args.prs + 1)]
+        targets = [(OWNER, REPO, pr.number) for pr in pulls]
+        github, llm = start_fakes(pulls, args.github_latency, args.llm_latency, args.token_latency)
+        servers = [github, llm]
+        configure_environment(github.url, f"{llm.url}/v1beta/openai/", args)
+    timer = StageTimer()
+    instrument(timer)
+
+    try:
+        run_once(args.entry, targets[:1])  # warm imports, pools and the secret cache
+        walls, stage_runs, call_runs = [], [], []
+        for _ in range(args.iterations):
+            for server in servers:
+                server.reset()
+            timer.reset()
+            walls.append(run_once(args.entry, targets, args.concurrent))
+            stage_runs.append(dict(timer.seconds))
+            call_runs.append({route: count for server in servers for route, count in server.calls.items()})
+    finally:
+        for server in servers:
+            server.stop()
+
+    stages = {stage: statistics.median(run.get(stage, 0.0) for run in stage_runs) for stage in stage_runs[-1]}
+    from auto_lgtm.services.blob_cache import get_default_blob_cache
+    blob_stats = get_default_blob_cache().stats
+    result = {
+        "entry": args.entry,
+        "pipeline": args.pipeline,
+        "concurrent": args.concurrent,
+        "prs": len(targets),
+        "iterations": args.iterations,
+        "streaming": args.streaming,
+        "context": args.context,
+        "wall_seconds": walls,
+        "wall_seconds_median": statistics.median(walls),
+        "stage_seconds_median": stages,
+        "http_calls": call_runs[-1],
+        "blob_cache": {"hits": blob_stats.hits, "misses": blob_stats.misses},
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if args.cassette:
+        result.update({"cassette": args.cassette, "latency_scale": args.latency_scale,
+                       "cassette_matches": dict(replay.cassette.matches)})
+        print(f"{args.entry} ({args.pipeline}): replaying {args.cassette} for {args.repo} PRs {args.pr}, "
+              f"{args.iterations} iterations, latency x{args.latency_scale:g}")
+    else:
+        result.update({"changed_lines_per_pr": pulls[0].changed_lines, "prompt_tokens": llm.prompt_tokens,
+                       "completion_tokens": llm.completion_tokens, "posted_comments": github.posted_comments})
+        print(f"{args.entry} ({args.pipeline}): {args.prs} PRs x {pulls[0].changed_lines} changed lines, {args.iterations} iterations")
+    print(f"wall time: median {result['wall_seconds_median']:.3f}s "
+          f"({result['wall_seconds_median'] / len(targets) * 1000:.0f} ms/PR)")
+    print("stage time (summed per iteration, median):")
+    for stage, seconds in sorted(stages.items(), key=lambda item: -item[1]):
+        print(f"  {stage:<20}{seconds * 1000:>10.1f} ms")
+    print("HTTP calls per iteration:")
+    for route, count in sorted(result["http_calls"].items()):
+        print(f"  {route:<34}{count:>6}")
+    if args.cassette:
+        print(f"cassette matches (last iteration): {result['cassette_matches']}")
+    else:
+        print(f"LLM tokens per iteration: {result['prompt_tokens']} prompt, "
+              f"{result['completion_tokens']} completion")
+    if args.context:
+        print(f"blob cache (all runs): {blob_stats.hits} hits, {blob_stats.misses} misses")
+    print(f"peak RSS: {result['peak_rss_mib']:.1f} MiB")
+
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"saved to {args.save}")
+    if args.baseline and not compare(result, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Microbenchmark: per-request latency of a fresh `requests.get` per call versus
+the pooled HttpTransport, against a local keep-alive HTTP server.
+
+    python -m benchmarks.bench_http_transport --requests 500
+
+The fake server adds no TLS, so the measured win is only the TCP handshake and
+session setup; against api.github.com the TLS handshake makes the gap larger.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from auto_lgtm.common.http_transport import HttpTransport
+
+BODY = json.dumps({"number": 1, "title": "bench", "body": "", "head": {"sha": "0" * 40}}).encode()
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _measure(call, url: str, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        call(url).raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summary(name: str, samples: list[float]) -> str:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    return f"{name:<22} mean {statistics.mean(samples):7.3f} ms   p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HttpTransport keep-alive microbenchmark")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per variant")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/repos/o/r/pulls/1"
+
+    transport = HttpTransport()
+    try:
+        # Warm both paths so imports and the first pooled connection are excluded
+        requests.get(url)
+        transport.get(url)
+        unpooled = _measure(requests.get, url, args.requests)
+        pooled = _measure(transport.get, url, args.requests)
+    finally:
+        transport.close()
+        server.shutdown()
+
+    print(_summary("requests.get (new conn)", unpooled))
+    print(_summary("HttpTransport (pooled)", pooled))
+    print(f"speedup (mean): {statistics.mean(unpooled) / statistics.mean(pooled):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
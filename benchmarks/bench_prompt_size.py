@@ -0,0 +1,74 @@
+"""
+Before/after benchmark of prompt size: the legacy `repr` of the DiffParser
+change list versus the compact hunk serializer, on real diffs.
+
+    python -m benchmarks.bench_prompt_size                      # diff of the last 5 commits of this repo
+    python -m benchmarks.bench_prompt_size --rev-range v1..main --repo-path ../other
+    python -m benchmarks.bench_prompt_size --diff-file pr.diff
+
+Token counts use `estimate_tokens`; when `tiktoken` happens to be installed
+its cl100k_base counts are printed as well.
+"""
+import argparse
+import subprocess
+import time
+
+from auto_lgtm.prompts.diff_serializer import estimate_tokens, serialize_diff
+from auto_lgtm.services.github_service import GitHubService
+from auto_lgtm.services.review_service import DiffParser
+
+
+def _load_diff(args) -> str:
+    if args.diff_file:
+        with open(args.diff_file, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return subprocess.run(
+        ["git", "-C", args.repo_path, "diff", "--no-color", args.rev_range],
+        check=True, capture_output=True, text=True,
+    ).stdout
+
+
+def _exact_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or the encoding cannot be downloaded offline
+        return None
+    return lambda text: len(encoding.encode(text))
+
+
+def _timed(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt size: legacy repr vs compact serializer")
+    parser.add_argument("--repo-path", default=".", help="Git checkout to diff")
+    parser.add_argument("--rev-range", default="HEAD~5..HEAD", help="Revision range passed to git diff")
+    parser.add_argument("--diff-file", help="Read a unified diff from this file instead of git")
+    parser.add_argument("--repeat", type=int, default=20, help="Serialization repetitions for timing")
+    args = parser.parse_args()
+
+    structured_diff = GitHubService.parse_diff(None, _load_diff(args))
+    diff_parser = DiffParser()
+
+    legacy, legacy_ms = _timed(lambda: str(diff_parser.parse(structured_diff)), args.repeat)
+    compact, compact_ms = _timed(lambda: serialize_diff(structured_diff), args.repeat)
+
+    exact = _exact_counter()
+    print(f"files: {len(structured_diff)}")
+    print(f"{'format':<10}{'chars':>12}{'est. tokens':>14}{'exact tokens':>14}{'serialize ms':>14}")
+    for name, text, ms in (("legacy", legacy, legacy_ms), ("compact", compact, compact_ms)):
+        exact_tokens = exact(text) if exact else "-"
+        print(f"{name:<10}{len(text):>12}{estimate_tokens(text):>14}{exact_tokens:>14}{ms:>14.2f}")
+    if compact:
+        print(f"token reduction: {estimate_tokens(legacy) / max(estimate_tokens(compact), 1):.2f}x "
+              f"(compact also carries context lines and hunk headers)")
+
+
+if __name__ == "__main__":
+    main()
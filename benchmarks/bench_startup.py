@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark: imports each entry point in a fresh interpreter under
+`python -X importtime` and reports the import time, a per-package breakdown
+and the heavy modules that were pulled in.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 500 --runs 10
+    python -m benchmarks.bench_startup --module auto_lgtm.cli --top 20
+
+Exits 1 when the webhook import exceeds its budget or loads a module that
+must stay lazy (see `LAZY_MODULES`), so it can gate CI. Budgets are wall
+milliseconds on the machine running the benchmark; `--save` keeps the
+numbers to track them over time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Import-time budget per entry point, in milliseconds
+BUDGETS_MS = {
+    "auto_lgtm.webhook": 600.0,
+    "auto_lgtm.cli": 800.0,
+}
+# Loaded on first use by the warm-up or the first review, never by importing the webhook
+LAZY_MODULES = ("openai", "google.cloud.secretmanager", "rich", "pyfiglet", "auto_lgtm.lgtm")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float, float]]:
+    """(module, self_ms, cumulative_ms) for every line of `-X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return rows
+
+
+def measure(module: str) -> Dict:
+    """Import `module` once in a fresh interpreter."""
+    env = {**os.environ, "SECRET_BACKEND": os.getenv("SECRET_BACKEND", "local")}
+    code = f"import sys; import {module}; print(','.join(sorted(sys.modules)))"
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             capture_output=True, text=True, env=env, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    rows = parse_importtime(process.stderr)
+    loaded = set(process.stdout.strip().split(","))
+    packages: Dict[str, float] = defaultdict(float)
+    for name, self_ms, _ in rows:
+        packages[name.split(".")[0]] += self_ms
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": next(cumulative for name, _, cumulative in rows if name == module),
+        "packages_ms": dict(packages),
+        "lazy_modules_loaded": [name for name in LAZY_MODULES if name in loaded],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time of the service entry points")
+    parser.add_argument("--module", action="append", help="Entry point to import (repeatable)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--top", type=int, default=10, help="Packages shown in the breakdown")
+    parser.add_argument("--budget-ms", type=float, help="Override the webhook import budget")
+    parser.add_argument("--save", default="benchmarks/results/startup-latest.json", help="Where to write the results")
+    args = parser.parse_args()
+
+    modules = args.module or list(BUDGETS_MS)
+    budgets = dict(BUDGETS_MS)
+    if args.budget_ms is not None:
+        budgets["auto_lgtm.webhook"] = args.budget_ms
+
+    ok = True
+    results = {}
+    for module in modules:
+        runs = [measure(module) for _ in range(args.runs)]
+        import_ms = statistics.median(run["import_ms"] for run in runs)
+        wall_ms = statistics.median(run["wall_ms"] for run in runs)
+        packages = {name: statistics.median(run["packages_ms"].get(name, 0.0) for run in runs)
+                    for name in runs[-1]["packages_ms"]}
+        lazy_loaded = runs[-1]["lazy_modules_loaded"]
+        budget = budgets.get(module)
+        results[module] = {"import_ms_median": import_ms, "process_wall_ms_median": wall_ms,
+                           "budget_ms": budget, "packages_ms_median": packages,
+                           "lazy_modules_loaded": lazy_loaded}
+
+        over_budget = budget is not None and import_ms > budget
+        print(f"{module}: import {import_ms:.0f} ms (median of {args.runs}), "
+              f"process {wall_ms:.0f} ms" + (f", budget {budget:.0f} ms" if budget else ""))
+        for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<28}{ms:>8.1f} ms")
+        if over_budget:
+            print(f"  OVER BUDGET by {import_ms - budget:.0f} ms")
+        if module == "auto_lgtm.webhook" and lazy_loaded:
+            print(f"  imported modules that must stay lazy: {', '.join(lazy_loaded)}")
+        ok = ok and not over_budget and not (module == "auto_lgtm.webhook" and lazy_loaded)
+
+    if args.save:
+        directory = os.path.dirname(args.save)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "modules": results}, f, indent=2)
+        print(f"saved to {args.save}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
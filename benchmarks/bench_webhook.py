@@ -0,0 +1,138 @@
+"""
+Requests/sec of the /webhook handler for rejected and accepted deliveries,
+next to the previous handler (verify, decode twice, then check the event).
+
+The ASGI app is driven in-process, without a server or socket, so the
+numbers isolate the handler itself. Secrets come from the local stand-in and
+accepted reviews go to a no-op coordinator.
+
+    python -m benchmarks.bench_webhook
+    python -m benchmarks.bench_webhook --requests 5000 --payload-kb 60
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+
+os.environ.setdefault("SECRET_BACKEND", "local")
+os.environ.setdefault("SECRET_ID", "bench")
+os.environ.setdefault("GITHUB_WEBHOOK_SECRET", "bench-secret")
+
+from fastapi import HTTPException, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from loguru import logger  # noqa: E402
+
+from auto_lgtm import webhook  # noqa: E402
+from auto_lgtm.common import fast_json  # noqa: E402
+from auto_lgtm.services.review_coordinator import SubmitOutcome  # noqa: E402
+
+
+class _NoopCoordinator:
+    def submit(self, *args, **kwargs):
+        return SubmitOutcome.QUEUED
+
+
+async def legacy_webhook(request: Request):
+    """The handler before the fast path, kept here as the baseline."""
+    payload_body = await request.body()
+    if not webhook.verify_github_signature(payload_body, request.headers.get("X-Hub-Signature-256"),
+                                           webhook.PROJECT_ID):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    payload = await request.json()
+    if request.headers.get("X-GitHub-Event") != "pull_request":
+        return JSONResponse(content={"message": "Not a pull request event"})
+    if payload.get("action") not in webhook.REVIEWED_PR_ACTIONS:
+        return JSONResponse(content={"message": f"Ignoring PR action '{payload.get('action')}'"})
+    repo, pr_number, head_sha, owner = webhook.extract_pr_event(payload)
+    webhook.review_coordinator.submit(owner, repo, pr_number, head_sha)
+    return JSONResponse(status_code=202, content={"message": "Review queued"})
+
+
+def make_payload(action: str, size_kb: int) -> bytes:
+    """A pull_request payload padded to roughly `size_kb`, like GitHub's ~20-60 KB deliveries."""
+    payload = {
+        "action": action,
+        "number": 42,
+        "pull_request": {
+            "number": 42,
+            "title": "Improve things",
+            "body": "x" * 2000,
+            "head": {"sha": "a" * 40, "ref": "feature", "repo": {"name": "repo"}},
+            "base": {"sha": "b" * 40, "ref": "main"},
+            "labels": [{"name": f"label-{i}", "color": "ffffff"} for i in range(10)],
+        },
+        "repository": {"name": "repo", "owner": {"login": "owner"}},
+        "sender": {"login": "someone"},
+    }
+    padding = []
+    while len(json.dumps(payload)) < size_kb * 1024:
+        padding.append({"id": len(padding), "url": f"https://api.github.com/things/{len(padding)}",
+                        "flags": [True, False, None], "count": 12345})
+        payload["pull_request"]["_links"] = padding
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def make_scope(path: str, event: str, body: bytes):
+    secret = os.environ["GITHUB_WEBHOOK_SECRET"].encode()
+    signature = "sha256=" + hmac.new(secret, body, hashlib.sha256).hexdigest()
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 8000),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"x-github-event", event.encode()),
+            (b"x-hub-signature-256", signature.encode()),
+        ],
+    }
+
+
+async def drive(path: str, event: str, body: bytes, requests: int) -> float:
+    scope = make_scope(path, event, body)
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await webhook.app(scope, receive, send)
+    assert status[0] < 300, f"{path} {event} answered {status[0]}"
+    start = time.perf_counter()
+    for _ in range(requests):
+        await webhook.app(scope, receive, send)
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook handler throughput")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--payload-kb", type=int, default=30, help="Approximate payload size")
+    args = parser.parse_args()
+
+    logger.remove()
+    webhook.review_coordinator = _NoopCoordinator()
+    webhook.app.add_api_route("/webhook-legacy", legacy_webhook, methods=["POST"])
+    webhook.get_secret_provider(webhook.PROJECT_ID).get_secrets(webhook.SECRET_ID)
+
+    scenarios = (
+        ("ping event", "ping", make_payload("created", args.payload_kb)),
+        ("PR labeled", "pull_request", make_payload("labeled", args.payload_kb)),
+        ("PR synchronize", "pull_request", make_payload("synchronize", args.payload_kb)),
+    )
+    print(f"payload ~{args.payload_kb} KB, JSON backend: {fast_json.BACKEND}")
+    print(f"{'delivery':<18}{'before req/s':>14}{'after req/s':>14}{'speedup':>10}")
+    for name, event, body in scenarios:
+        before = asyncio.run(drive("/webhook-legacy", event, body, args.requests))
+        after = asyncio.run(drive("/webhook", event, body, args.requests))
+        print(f"{name:<18}{before:>14.0f}{after:>14.0f}{after / before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Record/replay cassettes of GitHub and LLM traffic.
+
+`record` starts a local proxy that forwards to the real APIs and stores
+every request/response pair (body chunks with their arrival times) in a
+gzip'd JSON-lines cassette; `replay` serves a cassette offline with the
+recorded timing, optionally scaled. Point the application at either with
+the two URLs it prints:
+
+    python -m benchmarks.cassette record slow-review.cassette
+    GITHUB_API_URL=http://127.0.0.1:8765/github \\
+    LLM_BASE_URL=http://127.0.0.1:8765/llm/v1beta/openai/ \\
+        python -m auto_lgtm.cli --repo R --pr N --owner O
+
+    python -m benchmarks.cassette replay slow-review.cassette --latency-scale 0
+    python -m benchmarks.bench_e2e --cassette slow-review.cassette --repo O/R --pr N
+
+Replays match requests on method, path, query, Accept header and body
+hash. A request with no exact match (for example an LLM prompt that changed
+because sharding changed) gets the next unused recording for the same
+method and path, and is counted as a fuzzy match. Authorization and other
+request headers are never written to the cassette.
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple, Type
+
+import requests
+
+CASSETTE_VERSION = 1
+UPSTREAMS = {
+    "github": "https://api.github.com",
+    "llm": "https://generativelanguage.googleapis.com",
+}
+# Response headers that change client behavior; the rest is dropped to keep cassettes small
+RECORDED_RESPONSE_HEADERS = (
+    "content-type", "etag", "last-modified", "link", "retry-after",
+    "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used",
+)
+FORWARDED_REQUEST_HEADERS = ("accept", "authorization", "content-type", "if-none-match", "if-modified-since",
+                             "user-agent", "x-github-api-version")
+
+
+@dataclass
+class Interaction:
+    upstream: str
+    method: str
+    path: str
+    accept: str
+    body_sha256: str
+    status: int
+    headers: Dict[str, str]
+    # (seconds since the request was received, chunk) pairs
+    chunks: List[Tuple[float, str]] = field(default_factory=list)
+    binary: bool = False
+
+    @property
+    def key(self) -> Tuple[str, str, str, str, str]:
+        return self.upstream, self.method, self.path, self.accept, self.body_sha256
+
+    def chunk_bytes(self) -> List[Tuple[float, bytes]]:
+        if self.binary:
+            return [(offset, base64.b64decode(data)) for offset, data in self.chunks]
+        return [(offset, data.encode("utf-8")) for offset, data in self.chunks]
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:16] if body else ""
+
+
+class Cassette:
+    def __init__(self, interactions: Optional[List[Interaction]] = None, metadata: Optional[dict] = None):
+        self.interactions = interactions or []
+        self.metadata = metadata or {}
+        self._lock = threading.Lock()
+        self.matches: Counter = Counter()
+        self.rewind()
+
+    def rewind(self) -> None:
+        """Make every recording available again, e.g. before replaying the review once more."""
+        with self._lock:
+            self._used: set = set()
+            self._unused: Dict[tuple, Deque[Interaction]] = defaultdict(deque)
+            self._unused_by_path: Dict[tuple, Deque[Interaction]] = defaultdict(deque)
+            for interaction in self.interactions:
+                self._unused[interaction.key].append(interaction)
+                self._unused_by_path[(interaction.upstream, interaction.method, interaction.path)].append(interaction)
+            self.matches.clear()
+
+    def add(self, interaction: Interaction) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def match(self, upstream: str, method: str, path: str, accept: str, body: bytes) -> Optional[Interaction]:
+        """Return the next unused recording for a request, preferring an exact match."""
+        with self._lock:
+            exact = self._unused.get((upstream, method, path, accept, body_hash(body)))
+            candidates = [(exact, "exact"), (self._unused_by_path.get((upstream, method, path)), "fuzzy")]
+            for queue, kind in candidates:
+                while queue:
+                    interaction = queue.popleft()
+                    if id(interaction) in self._used:
+                        continue
+                    self._used.add(id(interaction))
+                    self.matches[kind] += 1
+                    return interaction
+            self.matches["missing"] += 1
+            return None
+
+    def save(self, path: str) -> None:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION, **self.metadata}) + "\n")
+            for interaction in self.interactions:
+                f.write(json.dumps(asdict(interaction), separators=(",", ":")) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            metadata = json.loads(f.readline())
+            if metadata.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {metadata.get('version')} in {path}")
+            interactions = []
+            for line in f:
+                data = json.loads(line)
+                data["chunks"] = [tuple(chunk) for chunk in data["chunks"]]
+                interactions.append(Interaction(**data))
+        return cls(interactions, metadata)
+
+
+def _split_upstream(path: str) -> Tuple[Optional[str], str]:
+    """`/github/repos/...` -> ("github", "/repos/...")."""
+    prefix, _, rest = path.lstrip("/").partition("/")
+    if prefix not in UPSTREAMS:
+        return None, path
+    return prefix, "/" + rest
+
+
+class _Handler(BaseHTTPRequestHandler, ABC):
+    """Relays one request at a time; subclasses decide where the response comes from."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_PATCH(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    @abstractmethod
+    def _handle(self) -> None:
+        """Answer the request in `self`, streaming the body with `_start`/`_write_chunk`/`_finish`."""
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _start(self, status: int, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        # Bodies are relayed in chunks as they arrive; 204/304 responses have none
+        self._chunked = status not in (204, 304)
+        self.send_header("Transfer-Encoding" if self._chunked else "Content-Length",
+                         "chunked" if self._chunked else "0")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        if data and self._chunked:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    def _finish(self) -> None:
+        if self._chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class _RecordingHandler(_Handler):
+    def _handle(self) -> None:
+        server: RecordingProxy = self.server.owner
+        upstream, path = _split_upstream(self.path)
+        if upstream is None:
+            self.send_error(404, "Unknown upstream prefix")
+            return
+        body = self._read_body()
+        headers = {name: value for name, value in self.headers.items()
+                   if name.lower() in FORWARDED_REQUEST_HEADERS}
+        headers["Accept-Encoding"] = "identity"
+        started = time.perf_counter()
+        try:
+            response = server.session.request(self.command, server.upstreams[upstream] + path, data=body or None,
+                                              headers=headers, stream=True, timeout=(10, 300))
+        except requests.RequestException as e:
+            self.send_error(502, f"Upstream {upstream} failed: {e}")
+            return
+        recorded_headers = {name.lower(): value for name, value in response.headers.items()
+                            if name.lower() in RECORDED_RESPONSE_HEADERS}
+        interaction = Interaction(upstream, self.command, path, self.headers.get("Accept", ""), body_hash(body),
+                                  response.status_code, recorded_headers)
+        raw_chunks = []
+        self._start(response.status_code, recorded_headers)
+        with response:
+            for chunk in response.iter_content(chunk_size=None):
+                raw_chunks.append((round(time.perf_counter() - started, 4), chunk))
+                self._write_chunk(chunk)
+        self._finish()
+        try:
+            interaction.chunks = [(offset, chunk.decode("utf-8")) for offset, chunk in raw_chunks]
+        except UnicodeDecodeError:
+            interaction.binary = True
+            interaction.chunks = [(offset, base64.b64encode(chunk).decode()) for offset, chunk in raw_chunks]
+        server.cassette.add(interaction)
+
+
+class _ReplayHandler(_Handler):
+    def _handle(self) -> None:
+        server: ReplayServer = self.server.owner
+        upstream, path = _split_upstream(self.path)
+        body = self._read_body()
+        server.count(f"{self.command} {upstream}")
+        interaction = server.cassette.match(upstream, self.command, path, self.headers.get("Accept", ""), body) \
+            if upstream else None
+        if interaction is None:
+            payload = json.dumps({"message": f"No recording for {self.command} {self.path}"}).encode()
+            self._start(599, {"content-type": "application/json"})
+            self._write_chunk(payload)
+            self._finish()
+            return
+        started = time.perf_counter()
+        self._start(interaction.status, interaction.headers)
+        for offset, chunk in interaction.chunk_bytes():
+            delay = offset * server.latency_scale - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+            self._write_chunk(chunk)
+        self._finish()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _CassetteServer:
+    handler_class: Type[_Handler]
+
+    def __init__(self, cassette: Cassette, port: int = 0):
+        self.cassette = cassette
+        self._server = _Server(("127.0.0.1", port), self.handler_class)
+        self._server.owner = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def github_url(self) -> str:
+        return f"{self.url}/github"
+
+    @property
+    def llm_url(self) -> str:
+        return f"{self.url}/llm/v1beta/openai/"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class RecordingProxy(_CassetteServer):
+    """Forwards `/github/...` and `/llm/...` to the real APIs and records every exchange."""
+    handler_class = _RecordingHandler
+
+    def __init__(self, cassette: Cassette, port: int = 0, upstreams: Optional[Dict[str, str]] = None):
+        super().__init__(cassette, port)
+        self.upstreams = {**UPSTREAMS, **(upstreams or {})}
+        self.session = requests.Session()
+
+
+class ReplayServer(_CassetteServer):
+    """Serves a cassette offline; `latency_scale` multiplies the recorded timing (0 = as fast as possible)."""
+    handler_class = _ReplayHandler
+
+    def __init__(self, cassette: Cassette, port: int = 0, latency_scale: float = 1.0):
+        super().__init__(cassette, port)
+        self.latency_scale = latency_scale
+        self.calls: Counter = Counter()
+        self._calls_lock = threading.Lock()
+
+    def count(self, route: str) -> None:
+        with self._calls_lock:
+            self.calls[route] += 1
+
+    def reset(self) -> None:
+        """Rewind the cassette and clear the call counts between replays."""
+        self.cassette.rewind()
+        with self._calls_lock:
+            self.calls.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay GitHub and LLM traffic")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    record = sub.add_parser("record", help="Proxy to the real APIs and record a cassette")
+    record.add_argument("cassette", help="Output file")
+    record.add_argument("--port", type=int, default=8765)
+    replay = sub.add_parser("replay", help="Serve a recorded cassette")
+    replay.add_argument("cassette", help="Cassette to serve")
+    replay.add_argument("--port", type=int, default=8765)
+    replay.add_argument("--latency-scale", type=float, default=1.0, help="0 replays without delays")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        server = RecordingProxy(Cassette(metadata={"recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}), args.port)
+    else:
+        server = ReplayServer(Cassette.load(args.cassette), args.port, args.latency_scale)
+    server.start()
+    print(f"{args.mode}ing on {server.url} (Ctrl-C to stop)")
+    print(f"  GITHUB_API_URL={server.github_url}")
+    print(f"  LLM_BASE_URL={server.llm_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        if args.mode == "record":
+            server.cassette.save(args.cassette)
+            print(f"saved {len(server.cassette.interactions)} interactions to {args.cassette}")
+        else:
+            print(f"matches: {dict(server.cassette.matches)}")
+
+
+if __name__ == "__main__":
+    main()
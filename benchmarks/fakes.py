@@ -0,0 +1,372 @@
+"""
+Local stand-ins for the GitHub REST API and the OpenAI-compatible Gemini
+endpoint, used by the end-to-end benchmarks. Both run on a background
+thread of the benchmark process and count the calls they serve.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from auto_lgtm.prompts.diff_serializer import estimate_tokens
+
+_WORDS = ["value", "result", "self", "return", "items", "config", "logger", "request", "None", "index"]
+
+
+@dataclass
+class SyntheticPR:
+    """A pull request of `files` files, each with `hunks` hunks of `hunk_lines` changed lines."""
+    number: int
+    files: int = 20
+    hunks: int = 5
+    hunk_lines: int = 20
+    seed: int = 1
+    head_sha: str = field(default="")
+    patches: Dict[str, str] = field(default_factory=dict)
+    # Head content of every file, consistent with its patch, and the blob SHA naming it
+    contents: Dict[str, str] = field(default_factory=dict)
+    blob_shas: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        rng = random.Random(self.seed * 1000 + self.number)
+        self.head_sha = self.head_sha or f"{rng.getrandbits(160):040x}"
+        for file_number in range(self.files):
+            path = f"src/pkg_{file_number % 7}/module_{file_number}.py"
+            rows = []
+            new_file = ["import os", "import sys", ""]
+            old_line = new_line = len(new_file) + 1
+            for _ in range(self.hunks):
+                body = [" " + self._code(rng)]
+                for _ in range(self.hunk_lines):
+                    body.append(rng.choice("++-") + self._code(rng))
+                body.append(" " + self._code(rng))
+                old_count = sum(1 for row in body if row[0] != "+")
+                new_count = sum(1 for row in body if row[0] != "-")
+                rows.append(f"@@ -{old_line},{old_count} +{new_line},{new_count} @@")
+                rows.extend(body)
+                new_file.extend(row[1:] for row in body if row[0] != "-")
+                new_file.append("")
+                new_file.append(f"def function_{new_line}(value, config):")
+                new_file.extend(self._code(rng) for _ in range(28))
+                old_line += old_count + 30
+                new_line += new_count + 30
+            self.patches[path] = "\n".join(rows)
+            self.contents[path] = "\n".join(new_file) + "\n"
+            self.blob_shas[path] = blob_sha(self.contents[path])
+
+    @staticmethod
+    def _code(rng: random.Random) -> str:
+        return f"    {rng.choice(_WORDS)} = {rng.choice(_WORDS)}({rng.choice(_WORDS)}, {rng.randint(0, 999)})"
+
+    @property
+    def diff(self) -> str:
+        parts = []
+        for path, patch in self.patches.items():
+            parts.append(f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n"
+                         f"--- a/{path}\n+++ b/{path}\n{patch}\n")
+        return "".join(parts)
+
+    @property
+    def changed_lines(self) -> int:
+        return self.files * self.hunks * self.hunk_lines
+
+    def details(self, owner: str, repo: str) -> dict:
+        return {
+            "number": self.number,
+            "title": f"Synthetic PR {self.number}",
+            "body": "Generated for benchmarking.",
+            "state": "open",
+            "head": {"sha": self.head_sha, "ref": f"feature-{self.number}"},
+            "base": {"sha": "0" * 40, "ref": "main"},
+            "base_repo": f"{owner}/{repo}",
+        }
+
+    def files_page(self, page: int, per_page: int) -> List[dict]:
+        items = [{"filename": path, "status": "modified", "sha": self.blob_shas[path], "patch": patch}
+                 for path, patch in self.patches.items()]
+        return items[(page - 1) * per_page:page * per_page]
+
+
+def blob_sha(content: str) -> str:
+    """The SHA git names a blob with."""
+    data = content.encode()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json",
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+
+class FakeServer:
+    """Base class: serve `handler_class` on 127.0.0.1 and count calls per route."""
+
+    handler_class = _Handler
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        handler = type("BoundHandler", (self.handler_class,), {"fake": self})
+        self._server = _QuietServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self.calls[route] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _GitHubHandler(_Handler):
+    _RATE_LIMIT_HEADERS = {
+        # A budget large enough that the client-side limiter never throttles the benchmark
+        "X-RateLimit-Limit": "1000000",
+        "X-RateLimit-Remaining": "999999",
+        "X-RateLimit-Reset": str(int(time.time()) + 3600),
+    }
+
+    def _json(self, status: int, payload) -> None:
+        self._send(status, json.dumps(payload).encode(), headers=self._RATE_LIMIT_HEADERS)
+
+    def do_GET(self):
+        fake: FakeGitHub = self.fake
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path == "/rate_limit":
+            fake.count("GET rate_limit")
+            return self._json(200, {"resources": {"core": {"limit": 1_000_000, "remaining": 1_000_000}}})
+        match = re.fullmatch(r"/repos/([^/]+)/([^/]+)/(.*)", parsed.path)
+        if not match:
+            fake.count("GET other")
+            return self._json(404, {"message": "Not Found"})
+        owner, repo, rest = match.groups()
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        if rest == "pulls":
+            fake.count("GET pulls")
+            page = int(query.get("page", ["1"])[0])
+            per_page = int(query.get("per_page", ["30"])[0])
+            pulls = [pr.details(owner, repo) for pr in fake.pulls.values()]
+            return self._json(200, pulls[(page - 1) * per_page:page * per_page])
+
+        pr_match = re.fullmatch(r"pulls/(\d+)(/files)?", rest)
+        if pr_match:
+            pr = fake.pulls.get(int(pr_match.group(1)))
+            if pr is None:
+                fake.count("GET pull (missing)")
+                return self._json(404, {"message": "Not Found"})
+            if pr_match.group(2):
+                fake.count("GET pull files")
+                page = int(query.get("page", ["1"])[0])
+                per_page = int(query.get("per_page", ["30"])[0])
+                return self._json(200, pr.files_page(page, per_page))
+            if "diff" in self.headers.get("Accept", ""):
+                fake.count("GET pull diff")
+                return self._send(200, pr.diff.encode(), "text/plain; charset=utf-8", self._RATE_LIMIT_HEADERS)
+            fake.count("GET pull")
+            return self._json(200, pr.details(owner, repo))
+
+        blob_match = re.fullmatch(r"git/blobs/([0-9a-f]{40})", rest)
+        if blob_match:
+            content = fake.blob(blob_match.group(1))
+            if content is None:
+                fake.count("GET blob (missing)")
+                return self._json(404, {"message": "Not Found"})
+            fake.count("GET blob")
+            return self._send(200, content.encode(), "application/vnd.github.raw; charset=utf-8",
+                              self._RATE_LIMIT_HEADERS)
+
+        if rest.startswith("contents/"):
+            fake.count("GET contents")
+            return self._json(404, {"message": "Not Found"})
+
+        fake.count("GET other")
+        return self._json(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        fake: FakeGitHub = self.fake
+        body = self._read_body()
+        if re.fullmatch(r"/repos/[^/]+/[^/]+/pulls/\d+/reviews", self.path):
+            fake.count("POST review")
+            fake.posted_comments += len(json.loads(body or b"{}").get("comments", []))
+            return self._json(200, {"id": 1, "state": "COMMENTED"})
+        if re.fullmatch(r"/repos/[^/]+/[^/]+/pulls/\d+/comments", self.path):
+            fake.count("POST comment")
+            fake.posted_comments += 1
+            return self._json(201, {"id": 1})
+        fake.count("POST other")
+        return self._json(404, {"message": "Not Found"})
+
+
+class FakeGitHub(FakeServer):
+    """Fake GitHub REST API serving synthetic pull requests; `latency` delays every GET."""
+
+    handler_class = _GitHubHandler
+
+    def __init__(self, pulls: List[SyntheticPR], latency: float = 0.0):
+        super().__init__()
+        self.pulls = {pr.number: pr for pr in pulls}
+        self.latency = latency
+        self.posted_comments = 0
+        self._blobs = {sha: pr.contents[path] for pr in pulls for path, sha in pr.blob_shas.items()}
+
+    def blob(self, sha: str) -> Optional[str]:
+        return self._blobs.get(sha)
+
+
+_PROMPT_ROW = re.compile(r"^([+-])(\d+)\|(.*)$")
+
+
+class _LLMHandler(_Handler):
+    def do_POST(self):
+        fake: FakeLLM = self.fake
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            fake.count("POST other")
+            return self._send(404, b'{"error": "not found"}')
+        request = json.loads(self._read_body())
+        prompt = "\n".join(message["content"] for message in request["messages"])
+        prompt_tokens = estimate_tokens(prompt)
+        comments = fake.comments_for(prompt)
+        content = json.dumps({"comments": comments})
+        completion_tokens = estimate_tokens(content)
+        fake.record_tokens(prompt_tokens, completion_tokens)
+
+        if fake.latency:
+            time.sleep(fake.latency)
+        if request.get("stream"):
+            fake.count("POST chat.completions (stream)")
+            return self._stream(content, fake)
+        fake.count("POST chat.completions")
+        time.sleep(fake.token_latency * completion_tokens)
+        self._send(200, json.dumps({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }).encode())
+
+    def _stream(self, content: str, fake: "FakeLLM") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = 40
+        for start in range(0, len(content), step):
+            piece = content[start:start + step]
+            time.sleep(fake.token_latency * estimate_tokens(piece))
+            self._chunk({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": "fake", "choices": [{"index": 0, "delta": {"content": piece},
+                                                       "finish_reason": None}]})
+        self._chunk({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": "fake", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, payload: dict) -> None:
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeLLM(FakeServer):
+    """
+    Fake OpenAI-compatible chat completions endpoint. It answers with one
+    comment for every `comment_every`-th changed line of the prompt, after
+    `latency` seconds plus `token_latency` per generated token.
+    """
+
+    handler_class = _LLMHandler
+
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0, comment_every: int = 25):
+        super().__init__()
+        self.latency = latency
+        self.token_latency = token_latency
+        self.comment_every = comment_every
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record_tokens(self, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self.prompt_tokens = self.completion_tokens = 0
+
+    def comments_for(self, prompt: str) -> List[dict]:
+        comments = []
+        current_file = None
+        changed = 0
+        for row in prompt.split("\n"):
+            if row.startswith("### "):
+                current_file = row[4:]
+                continue
+            match = _PROMPT_ROW.match(row)
+            if not match or current_file is None:
+                continue
+            changed += 1
+            if changed % self.comment_every:
+                continue
+            marker, line, code = match.groups()
+            comments.append({
+                "file": current_file,
+                "line_number": int(line),
+                "line_content": code,
+                "change_type": "addition" if marker == "+" else "deletion",
+                "severity": "info",
+                "comment": f"Consider naming this more clearly: `{code.strip()[:40]}`",
+            })
+        return comments
+
+
+def start_fakes(pulls: List[SyntheticPR], github_latency: float = 0.0, llm_latency: float = 0.0,
+                token_latency: float = 0.0) -> Tuple[FakeGitHub, FakeLLM]:
+    return FakeGitHub(pulls, github_latency).start(), FakeLLM(llm_latency, token_latency).start()
@@ -0,0 +1,64 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pytest
+
+from auto_lgtm.models.review_models import ChangeType, ReviewComment, SeverityLevel
+
+Row = Tuple[str, int, str]
+
+
+@pytest.fixture
+def make_hunk() -> Callable[..., Dict]:
+    """
+    Build a hunk in the dict shape the parser's `DiffFile`s read as, from
+    `(type, line, content)` rows. The start lines default to the first row.
+    """
+    def make(rows: Sequence[Row], old_start: Optional[int] = None, new_start: Optional[int] = None) -> Dict:
+        first = rows[0][1] if rows else 1
+        return {
+            'old_start': first if old_start is None else old_start,
+            'new_start': first if new_start is None else new_start,
+            'changes': [{'type': kind, 'line': line, 'content': content} for kind, line, content in rows],
+        }
+
+    return make
+
+
+@pytest.fixture
+def make_file_diff(make_hunk) -> Callable[..., Dict]:
+    """Build a `{'file', 'chunks'}` file diff; each hunk is given as a list of rows."""
+    def make(path: str, *hunks: Sequence[Row]) -> Dict:
+        return {'file': path, 'chunks': [make_hunk(rows) for rows in hunks]}
+
+    return make
+
+
+@pytest.fixture
+def make_comment() -> Callable[..., ReviewComment]:
+    def make(file: str, line: int, change_type: ChangeType = ChangeType.ADDITION, comment: str = "",
+             severity: SeverityLevel = SeverityLevel.WARNING) -> ReviewComment:
+        return ReviewComment(file=file, line_number=line, line_content="", change_type=change_type,
+                             severity=severity, comment=comment)
+
+    return make
+
+
+@pytest.fixture
+def unified_diff() -> Callable[..., List[str]]:
+    """
+    Lines of a `git diff` for one file: headers, a hunk with a context line
+    and a deletion, then `added` additions.
+    """
+    def make(path: str, added: int = 1) -> List[str]:
+        lines = [
+            f"diff --git a/{path} b/{path}",
+            "index 1111111..2222222 100644",
+            f"--- a/{path}",
+            f"+++ b/{path}",
+            f"@@ -1,2 +1,{added + 1} @@",
+            " first",
+            "-second",
+        ]
+        return lines + [f"+line {n}" for n in range(added)]
+
+    return make
@@ -0,0 +1,17 @@
+from auto_lgtm.services.bulk_review import BulkReviewer, BulkTarget
+
+
+def test_only_posted_reviews_count_as_reviewed():
+    outcomes = {1: True, 2: False, 3: RuntimeError("LLM unavailable")}
+
+    def review_fn(repo, pr_number, owner, project_id, head_sha=None):
+        outcome = outcomes[pr_number]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    reviewer = BulkReviewer("token", review_fn, "project", max_workers=2)
+    results = reviewer.run([BulkTarget("acme", "bulk-shop", n, f"sha{n}") for n in outcomes])
+
+    statuses = {result.pr_number: (result.status, result.error) for result in results}
+    assert statuses == {1: ("reviewed", ""), 2: ("skipped", ""), 3: ("failed", "LLM unavailable")}
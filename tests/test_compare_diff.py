@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+import requests
+
+from auto_lgtm.services.async_github_service import AsyncGitHubService
+from auto_lgtm.services.diff_stream import DiffLimits
+from auto_lgtm.services.github_service import GitHubService, GitHubServiceError
+
+
+class FakeClient:
+    """Serves a diff body in small chunks through `stream_text`, like the streaming clients."""
+    owner = "acme"
+
+    def __init__(self, body="", status=200):
+        self.body = body
+        self.status = status
+        self.endpoints = []
+
+    @contextmanager
+    def with_headers(self, headers):
+        yield
+
+    def _chunks(self, endpoint):
+        self.endpoints.append(endpoint)
+        if self.status != 200:
+            response = requests.Response()
+            response.status_code = self.status
+            raise requests.HTTPError(f"{self.status}", response=response)
+        return [self.body[i:i + 7] for i in range(0, len(self.body), 7)]
+
+    def stream_text(self, endpoint, **kwargs):
+        return iter(self._chunks(endpoint))
+
+
+class FakeAsyncClient(FakeClient):
+    async def stream_text(self, endpoint, **kwargs):
+        chunks = self._chunks(endpoint)
+
+        async def iterate():
+            for chunk in chunks:
+                yield chunk
+
+        return iterate()
+
+
+def test_compare_diff_is_streamed_and_parsed(unified_diff):
+    client = FakeClient("\n".join(unified_diff("a.py", 2) + unified_diff("b.py", 1)))
+
+    files = GitHubService(client).fetch_compare_diff("shop", "aaaaaaaa", "bbbbbbbb")
+
+    assert client.endpoints == ["/repos/acme/shop/compare/aaaaaaaa...bbbbbbbb"]
+    assert [f['file'] for f in files] == ["a.py", "b.py"]
+    assert len(files[0]['chunks'][0]['changes']) == 4
+
+
+def test_compare_diff_applies_the_diff_limits(unified_diff):
+    client = FakeClient("\n".join(unified_diff("big.py", 50) + unified_diff("small.py", 1)))
+    limits = DiffLimits(max_file_lines=20, max_file_bytes=None, max_total_bytes=None, oversized="skip")
+
+    sync_files = GitHubService(client).fetch_compare_diff("shop", "aaaaaaaa", "bbbbbbbb", limits)
+    async_files = asyncio.run(AsyncGitHubService(FakeAsyncClient(client.body))
+                              .fetch_compare_diff("shop", "aaaaaaaa", "bbbbbbbb", limits))
+
+    assert [f['file'] for f in sync_files] == [f['file'] for f in async_files] == ["small.py"]
+
+
+def test_missing_compare_base_is_reported():
+    with pytest.raises(GitHubServiceError, match="force-pushed"):
+        GitHubService(FakeClient(status=404)).fetch_compare_diff("shop", "aaaaaaaa", "bbbbbbbb")
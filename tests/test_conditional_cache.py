@@ -0,0 +1,56 @@
+import os
+
+from auto_lgtm.common.conditional_cache import CachedResponse, ConditionalCache
+
+
+def entry(n):
+    return CachedResponse(body=f"body {n}", etag=f'"{n}"')
+
+
+def test_revalidated_entries_survive_a_restart(tmp_path):
+    ConditionalCache(disk_path=str(tmp_path)).put("a", entry(1))
+
+    assert ConditionalCache(disk_path=str(tmp_path)).get("a") == entry(1)
+
+
+def test_entries_without_validators_are_not_cached(tmp_path):
+    cache = ConditionalCache(disk_path=str(tmp_path))
+
+    cache.put("a", CachedResponse(body="body"))
+
+    assert cache.get("a") is None and os.listdir(tmp_path) == []
+
+
+def test_evicted_entries_are_deleted_from_disk(tmp_path):
+    cache = ConditionalCache(max_entries=2, disk_path=str(tmp_path))
+
+    for n in range(5):
+        cache.put(f"key {n}", entry(n))
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert ConditionalCache(disk_path=str(tmp_path)).get("key 4") == entry(4)
+    assert ConditionalCache(disk_path=str(tmp_path)).get("key 0") is None
+
+
+def test_startup_keeps_only_the_newest_files(tmp_path):
+    cache = ConditionalCache(max_entries=10, disk_path=str(tmp_path))
+    for n in range(5):
+        cache.put(f"key {n}", entry(n))
+        os.utime(cache._disk_file(f"key {n}"), (1_000_000 + n, 1_000_000 + n))
+    (tmp_path / "leftover.json.1.tmp").write_text("{")
+
+    restarted = ConditionalCache(max_entries=2, disk_path=str(tmp_path))
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert restarted.get("key 4") == entry(4) and restarted.get("key 3") == entry(3)
+    assert restarted.get("key 0") is None
+
+
+def test_streamed_body_is_cached_once_read_to_the_end():
+    cache = ConditionalCache(max_entry_bytes=10)
+
+    assert "".join(cache.tee("a", iter(["ab", "cd"]), '"1"', None)) == "abcd"
+    assert "".join(cache.tee("b", iter(["abcdef", "ghijkl"]), '"2"', None)) == "abcdefghijkl"
+
+    assert cache.get("a").body == "abcd"
+    assert cache.get("b") is None
@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+
+import pytest
+
+from auto_lgtm.common.diff_position_index import DiffPositionIndex
+from auto_lgtm.models.diff_model import iter_change_rows
+from auto_lgtm.models.review_models import ChangeType
+from auto_lgtm.services.diff_stream import iter_parse_diff
+from auto_lgtm.services.github_service import GitHubService
+
+PATCH = "\n".join([
+    "@@ -1,4 +1,4 @@",
+    " import os",
+    "-import sys",
+    "+import re",
+    " ",
+    " def main():",
+    "@@ -20,2 +20,3 @@ def main():",
+    "     run()",
+    "+    log()",
+    "     return 0",
+    "\\ No newline at end of file",
+])
+
+
+def test_positions_count_from_first_hunk_and_across_headers():
+    index = DiffPositionIndex()
+    index.add_patch("app.py", PATCH)
+
+    assert index.position_for("app.py", 1) == 1
+    assert index.position_for("app.py", 2, "LEFT") == 2
+    assert index.position_for("app.py", 2, "RIGHT") == 3
+    assert index.position_for("app.py", 4) == 5
+    # The second "@@" header takes position 6
+    assert index.position_for("app.py", 20) == 7
+    assert index.position_for("app.py", 21) == 8
+    assert index.position_for("app.py", 22) == 9
+
+
+def test_context_lines_are_addressable_from_both_sides():
+    index = DiffPositionIndex()
+    index.add_patch("app.py", PATCH)
+
+    assert index.position_for("app.py", 3, "LEFT") == index.position_for("app.py", 3, "RIGHT") == 4
+    assert index.position_for("app.py", 21, "LEFT") == 9
+
+
+def test_lines_outside_the_diff_have_no_position():
+    index = DiffPositionIndex()
+    index.add_patch("app.py", PATCH)
+
+    assert index.position_for("app.py", 10) is None
+    assert index.position_for("other.py", 1) is None
+    assert index.position_for("app.py", 2, "LEFT") != index.position_for("app.py", 2, "RIGHT")
+
+
+def test_from_files_skips_removed_blobs_and_missing_patches():
+    index = DiffPositionIndex.from_files([
+        {"filename": "app.py", "patch": PATCH, "sha": "a1", "status": "modified"},
+        {"filename": "gone.py", "patch": "@@ -1 +0,0 @@\n-x", "sha": "b2", "status": "removed"},
+        {"filename": "logo.png", "sha": "c3", "status": "added"},
+    ])
+
+    assert index.blob_shas == {"app.py": "a1", "logo.png": "c3"}
+    assert "app.py" in index and "gone.py" in index
+    assert "logo.png" not in index
+    assert index.position_for("gone.py", 1, "LEFT") == 1
+
+
+def test_parsed_rows_map_to_positions_on_their_diff_side():
+    index = DiffPositionIndex()
+    index.add_patch("app.py", PATCH)
+    file_diff, = iter_parse_diff(["diff --git a/app.py b/app.py", *PATCH.splitlines()])
+
+    for chunk in file_diff['chunks']:
+        for kind, line, _ in iter_change_rows(chunk):
+            change_type = ChangeType.DELETION if kind == 'DELETION' else ChangeType.ADDITION
+            assert index.position_for("app.py", line, change_type.diff_side) is not None
+
+
+class RecordingClient:
+    owner = "acme"
+
+    def __init__(self):
+        self.posted = []
+
+    @contextmanager
+    def with_headers(self, headers):
+        yield
+
+    def post(self, endpoint, data):
+        self.posted.append(data)
+
+
+@pytest.mark.parametrize("change_type, side", [
+    (ChangeType.DELETION, "LEFT"),
+    ("deletion", "LEFT"),
+    (ChangeType.ADDITION, "RIGHT"),
+    ("modification", "RIGHT"),
+])
+def test_posted_comment_side_follows_the_change_type(change_type, side):
+    client = RecordingClient()
+
+    GitHubService(client).post_review_comment("shop", 1, "Typo", 2, "app.py", change_type,
+                                              pr_details={"head": {"sha": "abc"}})
+
+    assert client.posted[0]["side"] == side
@@ -0,0 +1,24 @@
+from auto_lgtm.prompts.diff_serializer import estimate_chunk_tokens, estimate_file_header_tokens
+from auto_lgtm.services.diff_sharder import DiffSharder
+
+LONG_PATH = "src/" + "deeply/nested/" * 10 + "module.py"
+
+
+def test_file_headers_count_against_the_budget(make_file_diff):
+    files = [make_file_diff(f"{LONG_PATH}{n}", [('ADDITION', 1, f"x = {n}")]) for n in range(6)]
+    per_file = estimate_chunk_tokens(files[0]['chunks'][0]) + estimate_file_header_tokens(files[0]['file'])
+
+    assert [len(shard) for shard in DiffSharder(token_budget=2 * per_file).shard(files)] == [2, 2, 2]
+    assert [len(shard) for shard in DiffSharder(token_budget=2 * per_file - 1).shard(files)] == [1] * 6
+
+
+def test_split_parts_leave_room_for_the_header(make_file_diff):
+    rows = [('ADDITION', n, f"value_{n} = compute({n})") for n in range(1, 41)]
+    budget = 200
+
+    shards = DiffSharder(token_budget=budget).shard([make_file_diff(LONG_PATH, rows)])
+
+    assert len(shards) > 1
+    header = estimate_file_header_tokens(LONG_PATH)
+    for shard in shards:
+        assert header + sum(estimate_chunk_tokens(chunk) for chunk in shard[0]['chunks']) <= budget
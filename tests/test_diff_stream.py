@@ -0,0 +1,85 @@
+import pytest
+
+from auto_lgtm.models.diff_model import iter_change_rows
+from auto_lgtm.services.diff_stream import DiffLimits, iter_parse_diff, iter_text_lines
+
+
+def test_parses_files_hunks_and_line_numbers(unified_diff):
+    files = list(iter_parse_diff(unified_diff("a.py", 2) + unified_diff("b.py", 1)))
+
+    assert [f['file'] for f in files] == ["a.py", "b.py"]
+    assert list(iter_change_rows(files[0]['chunks'][0])) == [
+        ('CONTEXT', 1, "first"),
+        ('DELETION', 2, "second"),
+        ('ADDITION', 2, "line 0"),
+        ('ADDITION', 3, "line 1"),
+    ]
+    assert 'truncated' not in files[0]
+
+
+def test_oversized_file_is_truncated_at_the_line_limit(unified_diff):
+    # The index/---/+++ headers and the "@@" line leave room for five changes
+    limits = DiffLimits(max_file_lines=9, max_file_bytes=None, max_total_bytes=None)
+
+    big, small = iter_parse_diff(unified_diff("big.py", 10) + unified_diff("small.py", 1), limits)
+
+    assert big['truncated'] is True
+    assert len(big['chunks'][0]['changes']) == 5
+    assert small['file'] == "small.py" and 'truncated' not in small
+
+
+def test_oversized_file_is_dropped_with_the_skip_policy(unified_diff):
+    limits = DiffLimits(max_file_lines=None, max_file_bytes=100, max_total_bytes=None, oversized="skip")
+
+    files = list(iter_parse_diff(unified_diff("big.py", 20) + unified_diff("small.py", 1), limits))
+
+    assert [f['file'] for f in files] == ["small.py"]
+
+
+def test_parsing_stops_at_the_total_byte_limit(unified_diff):
+    first = unified_diff("a.py", 1)
+    limits = DiffLimits(max_file_lines=None, max_file_bytes=None,
+                        max_total_bytes=sum(len(line) + 1 for line in first) + 10)
+    consumed = []
+
+    def lines():
+        for line in first + unified_diff("b.py", 1) + unified_diff("c.py", 1):
+            consumed.append(line)
+            yield line
+
+    files = list(iter_parse_diff(lines(), limits))
+
+    assert [f['file'] for f in files] == ["a.py"]
+    assert 'truncated' not in files[0]
+    assert consumed[-1] == "diff --git a/b.py b/b.py"
+
+
+def test_file_cut_by_the_total_byte_limit_is_truncated(unified_diff):
+    lines = unified_diff("a.py", 1) + unified_diff("b.py", 20)
+    limits = DiffLimits(max_file_lines=None, max_file_bytes=None,
+                        max_total_bytes=sum(len(line) + 1 for line in lines) - 50)
+
+    a, b = iter_parse_diff(lines, limits)
+
+    assert 'truncated' not in a
+    assert b['truncated'] is True
+    assert 0 < len(b['chunks'][0]['changes']) < 22
+
+
+def test_file_cut_by_the_total_byte_limit_is_dropped_with_the_skip_policy(unified_diff):
+    lines = unified_diff("a.py", 1) + unified_diff("b.py", 20)
+    limits = DiffLimits(max_file_lines=None, max_file_bytes=None, oversized="skip",
+                        max_total_bytes=sum(len(line) + 1 for line in lines) - 50)
+
+    assert [f['file'] for f in iter_parse_diff(lines, limits)] == ["a.py"]
+
+
+def test_invalid_oversized_policy_is_rejected():
+    with pytest.raises(ValueError):
+        DiffLimits(oversized="drop")
+
+
+def test_text_lines_are_reassembled_across_chunks():
+    assert list(iter_text_lines(["diff --g", "it a b\n@@ -1", " +1 @@\n", "", "+x"])) == [
+        "diff --git a b", "@@ -1 +1 @@", "+x",
+    ]
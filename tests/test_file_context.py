@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from auto_lgtm.services.file_context import ContextConfig, enclosing_scopes, import_lines, select_context
+
+SOURCE = """import os
+from typing import (
+    List,
+)
+
+
+class Cart:
+    def __init__(self):
+        self.items = []
+
+    def total(self):
+        subtotal = 0
+        for item in self.items:
+            subtotal += item.price
+        return subtotal
+""".splitlines()
+
+
+@pytest.fixture
+def source_hunk(make_hunk):
+    """A hunk adding the given lines of SOURCE."""
+    return lambda *lines: make_hunk([('ADDITION', n, SOURCE[n - 1]) for n in lines])
+
+
+def test_enclosing_scopes_are_innermost_first_and_ignore_loops():
+    assert enclosing_scopes(SOURCE, 14) == [11, 7]
+    assert enclosing_scopes(SOURCE, 1) == []
+
+
+def test_brace_scopes_skip_control_flow():
+    lines = [
+        "public int total(List<Item> items) {",
+        "    if (items == null) {",
+        "        return 0;",
+    ]
+
+    assert enclosing_scopes(lines, 3) == [1]
+
+
+def test_import_lines_include_parenthesized_continuations():
+    assert import_lines(SOURCE) == [1, 2, 3, 4]
+
+
+def test_context_prefers_scopes_then_imports_then_nearby_lines(source_hunk):
+    config = ContextConfig(radius=1, max_file_lines=5)
+
+    rows = select_context(SOURCE, [source_hunk(14)], config)
+
+    # The line after the hunk is left out once the budget is spent
+    assert [n for n, _ in rows] == [1, 2, 7, 11, 13]
+    assert rows[3] == (11, "    def total(self):")
+
+
+def test_context_skips_lines_shown_by_the_hunks(source_hunk):
+    rows = select_context(SOURCE, [source_hunk(12, 13, 14, 15)], ContextConfig(radius=1, imports=False))
+
+    assert [n for n, _ in rows] == [7, 11]
+
+
+def test_deletion_only_hunks_get_no_context(make_hunk):
+    deletion = make_hunk([('DELETION', 3, "x")])
+
+    assert select_context(SOURCE, [deletion], ContextConfig()) == []
+
+
+def test_long_lines_are_scanned_in_linear_time():
+    lines = ["int f(" + "a(" * 5000 + ") {", "    return 0;"]
+    started = time.monotonic()
+
+    enclosing_scopes(lines, 2)
+    import_lines(["import " + "x" * 100_000])
+
+    assert time.monotonic() - started < 0.5
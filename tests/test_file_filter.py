@@ -0,0 +1,108 @@
+import re
+
+import pytest
+
+from auto_lgtm.services.file_filter import FileFilter, FileFilterConfig, glob_to_regex
+
+
+@pytest.mark.parametrize("pattern, path, matches", [
+    ("*.lock", "uv.lock", True),
+    ("*.lock", "deps/poetry.lock", True),
+    ("*.lock", "uv.lock.bak", False),
+    ("vendor/**", "vendor/lib/a.go", True),
+    ("vendor/**", "src/vendor/a.go", False),
+    ("**/__snapshots__/**", "web/src/__snapshots__/app.snap", True),
+    ("**/__snapshots__/**", "__snapshots__/app.snap", True),
+    ("src/*.py", "src/app.py", True),
+    ("src/*.py", "src/pkg/app.py", False),
+    ("/build/", "build", True),
+    ("file?.txt", "file1.txt", True),
+    ("file?.txt", "file10.txt", False),
+    ("[!a]*.js", "b.js", True),
+    ("[!a]*.js", "a.js", False),
+    ("a+b.py", "a+b.py", True),
+])
+def test_glob_to_regex(pattern, path, matches):
+    assert bool(re.fullmatch(glob_to_regex(pattern), path)) is matches
+
+
+@pytest.fixture
+def diff(make_file_diff):
+    def make(path, changed=1, context=0):
+        rows = [('CONTEXT', n, "x") for n in range(1, context + 1)]
+        rows += [('ADDITION', context + n, "y") for n in range(1, changed + 1)]
+        return make_file_diff(path, rows)
+
+    return make
+
+
+def test_default_exclusions_and_binary_files_are_skipped(diff):
+    file_filter = FileFilter()
+
+    assert file_filter.skip_reason(diff("package-lock.json")) == "excluded"
+    assert file_filter.skip_reason(diff("node_modules/left-pad/index.js")) == "excluded"
+    assert file_filter.skip_reason({'file': "logo.svg", 'chunks': []}) == "binary or no text changes"
+    assert file_filter.skip_reason(diff("src/app.py")) is None
+
+
+def test_include_globs_restrict_the_review(diff):
+    file_filter = FileFilter(FileFilterConfig(include=("src/**",)))
+
+    assert file_filter.skip_reason(diff("docs/readme.md")) == "not included"
+    assert file_filter.skip_reason(diff("src/app.py")) is None
+
+
+def test_thresholds_count_changed_lines_and_bytes(diff):
+    file_filter = FileFilter(FileFilterConfig(max_changed_lines=3, max_diff_bytes=None))
+
+    assert file_filter.skip_reason(diff("a.py", changed=3, context=50)) is None
+    assert file_filter.skip_reason(diff("a.py", changed=4)) == "4 changed lines"
+    assert FileFilter(FileFilterConfig(max_changed_lines=None, max_diff_bytes=10)) \
+        .skip_reason(diff("a.py", changed=6)) == "12 bytes of diff"
+
+
+def test_gitattributes_linguist_markers_later_rules_win(diff):
+    gitattributes = "\n".join([
+        "# generated code",
+        "gen/** linguist-generated",
+        "gen/keep.py -linguist-generated",
+        "third/** linguist-vendored=false",
+        "*.py text",
+    ])
+    file_filter = FileFilter(FileFilterConfig(exclude=()), gitattributes=gitattributes)
+
+    assert file_filter.skip_reason(diff("gen/api.py")) == "linguist-generated/vendored"
+    assert file_filter.skip_reason(diff("gen/keep.py")) is None
+    assert file_filter.skip_reason(diff("third/lib.py")) is None
+
+
+def test_gitattributes_attributes_are_tracked_separately(diff):
+    gitattributes = "\n".join([
+        "vendor/** linguist-vendored",
+        "vendor/** -linguist-generated",
+        "gen/** linguist-generated linguist-vendored",
+        "gen/hand.py -linguist-generated",
+    ])
+    file_filter = FileFilter(FileFilterConfig(exclude=()), gitattributes=gitattributes)
+
+    assert file_filter.skip_reason(diff("vendor/lib.py")) == "linguist-generated/vendored"
+    assert file_filter.skip_reason(diff("gen/hand.py")) == "linguist-generated/vendored"
+
+
+def test_gitattributes_can_be_ignored(diff):
+    file_filter = FileFilter(FileFilterConfig(exclude=(), use_gitattributes=False),
+                             gitattributes="gen/** linguist-generated")
+
+    assert file_filter.skip_reason(diff("gen/api.py")) is None
+
+
+def test_filter_records_kept_and_skipped_files(diff):
+    file_filter = FileFilter()
+
+    kept = list(file_filter.filter([diff("src/app.py"), diff("go.sum", changed=40)]))
+
+    assert [f['file'] for f in kept] == ["src/app.py"]
+    assert file_filter.report.kept == 1
+    assert [(s.path, s.reason) for s in file_filter.report.skipped] == [("go.sum", "excluded")]
+    assert file_filter.report.tokens_saved > 0
+    assert "go.sum (excluded)" in file_filter.report.summary()
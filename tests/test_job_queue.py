@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from auto_lgtm.services.job_queue import SQLiteJobQueue
+from auto_lgtm.services.review_coordinator import SubmitOutcome
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=60, max_attempts=2,
+                           coalesce_seconds=0, retry_base=0.05, retry_max=0.05)
+    yield queue
+    queue.close()
+
+
+def test_duplicates_are_ignored_and_newer_shas_replace_queued_jobs(queue):
+    assert queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d1") == SubmitOutcome.QUEUED
+    assert queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d1") == SubmitOutcome.DUPLICATE_DELIVERY
+    assert queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d2") == SubmitOutcome.DUPLICATE_SHA
+    assert queue.enqueue("acme", "shop", 1, "bbb", delivery_id="d3") == SubmitOutcome.REPLACED
+
+    job = queue.claim("w1")
+    assert job.head_sha == "bbb"
+    assert queue.claim("w2") is None
+    assert queue.stats().jobs["superseded"] == 1
+
+
+def test_claim_leases_a_job_until_complete(queue):
+    queue.enqueue("acme", "shop", 1, "aaa")
+
+    job = queue.claim("w1")
+
+    assert (job.attempts, job.lease_owner) == (1, "w1")
+    assert queue.claim("w2") is None
+    assert queue.heartbeat(job)
+    assert queue.complete(job)
+    assert not queue.complete(job)
+    stats = queue.stats()
+    assert stats.jobs["done"] == 1 and stats.depth == 0
+    assert stats.finished_in_window == 1
+
+
+def test_expired_lease_is_reclaimed_and_the_old_owner_loses_it(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=0.05, max_attempts=3, coalesce_seconds=0)
+    queue.enqueue("acme", "shop", 1, "aaa")
+    stale = queue.claim("w1")
+
+    time.sleep(0.1)
+    job = queue.claim("w2")
+
+    assert (job.id, job.attempts, job.lease_owner) == (stale.id, 2, "w2")
+    assert not queue.heartbeat(stale)
+    assert not queue.complete(stale)
+    assert queue.complete(job)
+    queue.close()
+
+
+def test_lease_expiry_after_the_last_attempt_marks_the_job_dead(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=0.05, max_attempts=1, coalesce_seconds=0)
+    queue.enqueue("acme", "shop", 1, "aaa")
+    queue.claim("w1")
+
+    time.sleep(0.1)
+
+    assert queue.claim("w2") is None
+    assert queue.stats().jobs["dead"] == 1
+    queue.close()
+
+
+def test_failed_job_is_retried_after_backoff_then_dead(queue):
+    queue.enqueue("acme", "shop", 1, "aaa")
+    job = queue.claim("w1")
+
+    delay = queue.fail(job, "GitHub returned 502")
+
+    assert 0.025 <= delay <= 0.05
+    assert queue.claim("w1") is None
+    time.sleep(delay + 0.01)
+    retry = queue.claim("w1")
+    assert retry.attempts == 2
+    assert queue.fail(retry, "GitHub returned 502") is None
+    assert queue.stats().jobs["dead"] == 1
+
+
+def test_retry_delay_grows_exponentially_up_to_the_cap(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite"), retry_base=10, retry_max=60)
+
+    for attempt, step in ((1, 10), (2, 20), (3, 40), (4, 60), (8, 60)):
+        assert step / 2 <= queue.retry_delay(attempt) <= step
+    queue.close()
+
+
+def test_is_current_follows_the_newest_head_sha(queue):
+    queue.enqueue("acme", "shop", 1, "aaa")
+    job = queue.claim("w1")
+
+    assert queue.is_current(job)
+    queue.enqueue("acme", "shop", 1, "bbb")
+    assert not queue.is_current(job)
+    assert queue.complete(job, status="superseded")
+
+
+def test_redelivery_of_a_dead_job_queues_it_again(queue):
+    queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d1")
+    job = queue.claim("w1")
+    queue.fail(job, "GitHub returned 502")
+    time.sleep(0.06)
+    assert queue.fail(queue.claim("w1"), "GitHub returned 502") is None
+
+    assert queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d1") == SubmitOutcome.QUEUED
+    retry = queue.claim("w1")
+    assert (retry.head_sha, retry.attempts) == ("aaa", 1)
+
+
+def test_redelivery_of_a_superseded_job_stays_a_duplicate(queue):
+    queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d1")
+    queue.enqueue("acme", "shop", 1, "bbb", delivery_id="d2")
+
+    assert queue.enqueue("acme", "shop", 1, "aaa", delivery_id="d1") == SubmitOutcome.DUPLICATE_DELIVERY
+    assert queue.claim("w1").head_sha == "bbb"
@@ -0,0 +1,58 @@
+from auto_lgtm.common.json_stream import JsonArrayStreamParser
+
+
+def feed_all(parser, pieces):
+    objects = []
+    for piece in pieces:
+        objects.extend(parser.feed(piece))
+    return objects
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = JsonArrayStreamParser()
+
+    assert parser.feed('[{"line": 1, "comment": "a"}, {"li') == [{"line": 1, "comment": "a"}]
+    assert parser.feed('ne": 2}') == [{"line": 2}]
+    assert not parser.finished
+    assert parser.feed("]") == []
+    assert parser.finished
+
+
+def test_array_wrapped_in_an_object_and_split_character_by_character():
+    document = 'Sure! {"comments": [{"text": "a } in a string ]"}, {"nested": {"x": [1, 2]}}]}'
+    parser = JsonArrayStreamParser()
+
+    objects = feed_all(parser, document)
+
+    assert objects == [{"text": "a } in a string ]"}, {"nested": {"x": [1, 2]}}]
+    assert parser.finished
+
+
+def test_escaped_quotes_do_not_end_strings():
+    parser = JsonArrayStreamParser()
+
+    objects = feed_all(parser, ['[{"text": "say \\"', '}\\" twice"}]'])
+
+    assert objects == [{"text": 'say "}" twice'}]
+
+
+def test_malformed_objects_are_dropped_without_losing_the_rest():
+    parser = JsonArrayStreamParser()
+
+    objects = parser.feed('[{"a": 1}, {"b": tru}, {"c": 3}]')
+
+    assert objects == [{"a": 1}, {"c": 3}]
+
+
+def test_text_after_the_array_is_ignored():
+    parser = JsonArrayStreamParser()
+
+    assert parser.feed('[{"a": 1}] trailing {"b": 2}') == [{"a": 1}]
+    assert parser.feed('[{"c": 3}]') == []
+
+
+def test_unclosed_array_is_not_finished():
+    parser = JsonArrayStreamParser()
+
+    assert parser.feed('[{"a": 1}, {"b": ') == [{"a": 1}]
+    assert not parser.finished
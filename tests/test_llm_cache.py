@@ -0,0 +1,95 @@
+import pytest
+
+from auto_lgtm.models.review_models import ChangeType
+from auto_lgtm.services.llm_cache import InMemoryReviewCache, ReviewCache, SQLiteReviewCache
+from auto_lgtm.services.diff_sharder import DiffSharder
+
+
+@pytest.fixture
+def cart_hunk(make_hunk):
+    """The same three-line change to `total`, wherever it sits in the file."""
+    def make(old_start, new_start, addition="    return sum(i.price for i in items)"):
+        return make_hunk([
+            ('CONTEXT', new_start, "def total(items):"),
+            ('DELETION', old_start + 1, "    return sum(items)"),
+            ('ADDITION', new_start + 1, addition),
+        ], old_start=old_start, new_start=new_start)
+
+    return make
+
+
+def test_comments_are_reanchored_on_a_moved_hunk(cart_hunk, make_comment):
+    cache = ReviewCache(InMemoryReviewCache(), namespace="v1")
+    cache.store("cart.py", cart_hunk(10, 10), [
+        make_comment("cart.py", 11, ChangeType.ADDITION, "prices may be None"),
+        make_comment("cart.py", 11, ChangeType.DELETION, "old behaviour"),
+    ])
+
+    moved = cache.lookup("cart.py", cart_hunk(40, 52))
+
+    assert [(c.line_number, c.change_type, c.comment) for c in moved] == [
+        (53, ChangeType.ADDITION, "prices may be None"),
+        (41, ChangeType.DELETION, "old behaviour"),
+    ]
+    assert all(c.file == "cart.py" for c in moved)
+
+
+def test_key_ignores_line_numbers_and_trailing_whitespace_only(cart_hunk):
+    cache = ReviewCache(InMemoryReviewCache(), namespace="v1")
+    key = cache.key_for("cart.py", cart_hunk(1, 1))
+
+    assert key == cache.key_for("cart.py", cart_hunk(7, 9))
+    assert key == cache.key_for("cart.py", cart_hunk(1, 1, addition="    return sum(i.price for i in items)   "))
+    assert key != cache.key_for("cart.py", cart_hunk(1, 1, addition="    return 0"))
+    assert key != cache.key_for("shop.py", cart_hunk(1, 1))
+    assert key != ReviewCache(InMemoryReviewCache(), namespace="v2").key_for("cart.py", cart_hunk(1, 1))
+
+
+def test_misses_and_hits_are_counted(cart_hunk):
+    cache = ReviewCache(InMemoryReviewCache(), namespace="v1")
+
+    assert cache.lookup("cart.py", cart_hunk(1, 1)) is None
+    cache.store("cart.py", cart_hunk(1, 1), [])
+    assert cache.lookup("cart.py", cart_hunk(3, 3)) == []
+
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (1, 1, 1)
+    assert cache.stats.hit_ratio == 0.5
+
+
+def test_in_memory_backend_evicts_least_recently_used():
+    backend = InMemoryReviewCache(max_entries=2)
+    backend.put("a", [])
+    backend.put("b", [])
+    backend.get("a")
+
+    assert backend.put("c", []) == 1
+    assert backend.get("b") is None
+    assert backend.get("a") == [] and backend.get("c") == []
+
+
+def test_sqlite_backend_persists_entries(tmp_path, cart_hunk, make_comment):
+    path = str(tmp_path / "review-cache.sqlite")
+    ReviewCache(SQLiteReviewCache(path), namespace="v1").store(
+        "cart.py", cart_hunk(10, 10), [make_comment("cart.py", 11, ChangeType.ADDITION, "prices may be None")])
+
+    reopened = ReviewCache(SQLiteReviewCache(path), namespace="v1")
+
+    assert [c.line_number for c in reopened.lookup("cart.py", cart_hunk(20, 30))] == [31]
+
+
+def test_parts_of_an_oversized_hunk_hit_the_cache_after_a_move(make_hunk, make_comment):
+    def big_hunk(start):
+        return make_hunk([('ADDITION', start + n, f"value_{n} = compute({n})") for n in range(40)])
+
+    sharder = DiffSharder(token_budget=60)
+    cache = ReviewCache(InMemoryReviewCache(), namespace="v1")
+    parts = sharder.split_oversized("calc.py", [big_hunk(1)])
+    assert len(parts) > 1
+    for part in parts:
+        cache.store("calc.py", part, [make_comment("calc.py", part['changes'][0]['line'], comment="check")])
+
+    moved = [cache.lookup("calc.py", part) for part in sharder.split_oversized("calc.py", [big_hunk(101)])]
+
+    assert cache.stats.misses == 0
+    assert [comments[0].line_number for comments in moved] == \
+        [part['changes'][0]['line'] + 100 for part in parts]
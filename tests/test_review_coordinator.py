@@ -0,0 +1,53 @@
+import threading
+import time
+
+from auto_lgtm.services.review_coordinator import ReviewCoordinator, SubmitOutcome
+
+
+def test_finished_reviews_forget_the_pr_head():
+    done = threading.Event()
+    coordinator = ReviewCoordinator(lambda job: done.set(), coalesce_seconds=0.01)
+
+    assert coordinator.submit("acme", "shop", 1, "aaa", delivery_id="d1") == SubmitOutcome.QUEUED
+    assert done.wait(2)
+    coordinator.shutdown()
+
+    assert coordinator._latest_sha == {} and coordinator._in_flight == {}
+
+
+def test_running_review_is_superseded_until_the_newest_one_finishes():
+    started, newest_done, release = threading.Event(), threading.Event(), threading.Event()
+    current = {}
+
+    def review(job):
+        if job.head_sha == "aaa":
+            started.set()
+            release.wait(2)
+        else:
+            newest_done.set()
+        current[job.head_sha] = job.is_current()
+
+    coordinator = ReviewCoordinator(review, coalesce_seconds=0.01)
+    coordinator.submit("acme", "shop", 1, "aaa")
+    assert started.wait(2)
+    assert coordinator.submit("acme", "shop", 1, "bbb") == SubmitOutcome.QUEUED
+    assert newest_done.wait(2)
+    release.set()
+    coordinator.shutdown()
+
+    assert current == {"bbb": True, "aaa": False}
+    assert coordinator._latest_sha == {} and coordinator._in_flight == {}
+
+
+def test_replaced_pending_review_is_not_counted():
+    reviewed = []
+    coordinator = ReviewCoordinator(lambda job: reviewed.append(job.head_sha), coalesce_seconds=0.05)
+
+    coordinator.submit("acme", "shop", 1, "aaa")
+    assert coordinator.submit("acme", "shop", 1, "bbb") == SubmitOutcome.REPLACED
+    assert coordinator._in_flight == {("acme", "shop", 1): 1}
+    time.sleep(0.2)
+    coordinator.shutdown()
+
+    assert reviewed == ["bbb"]
+    assert coordinator._latest_sha == {}
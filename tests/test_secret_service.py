@@ -0,0 +1,74 @@
+import threading
+import time
+
+from auto_lgtm.services.secret_service import SecretProvider
+
+
+class FakeSource:
+    """Returns a new version of the secret on every load; `gate` can hold loads back."""
+
+    def __init__(self):
+        self.loads = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def load(self, secret_id):
+        self.gate.wait()
+        self.loads += 1
+        return {"github_token": f"v{self.loads}"}
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_reads_are_served_from_the_cache():
+    source = FakeSource()
+    provider = SecretProvider(source, ttl=60, refresh_margin=10)
+
+    assert provider.get_secret("app", "github_token") == "v1"
+    assert provider.get_secret("app", "github_token") == "v1"
+    assert source.loads == 1
+
+
+def test_read_near_expiry_refreshes_in_the_background():
+    source = FakeSource()
+    provider = SecretProvider(source, ttl=0.2, refresh_margin=0.15)
+    provider.get_secrets("app")
+    time.sleep(0.1)
+
+    assert provider.get_secret("app", "github_token") == "v1"
+    wait_for(lambda: provider.get_secret("app", "github_token") == "v2")
+
+
+def test_read_after_idling_past_the_ttl_does_not_wait_for_the_source():
+    source = FakeSource()
+    provider = SecretProvider(source, ttl=0.05, refresh_margin=0.01)
+    provider.get_secrets("app")
+    time.sleep(0.1)
+    source.gate.clear()
+
+    served = []
+    reader = threading.Thread(target=lambda: served.append(provider.get_secret("app", "github_token")))
+    reader.start()
+    reader.join(0.5)
+    source.gate.set()
+    reader.join()
+
+    assert served == ["v1"]
+    wait_for(lambda: provider.get_secret("app", "github_token") == "v2")
+
+
+def test_failed_refresh_keeps_serving_the_cached_value():
+    source = FakeSource()
+    provider = SecretProvider(source, ttl=0.05, refresh_margin=0.01)
+    provider.get_secrets("app")
+    source.load = lambda secret_id: (_ for _ in ()).throw(ValueError("Secret Manager unavailable"))
+    time.sleep(0.1)
+
+    assert provider.get_secret("app", "github_token") == "v1"
+    wait_for(lambda: "app" not in provider._refreshing)
+    assert provider.get_secret("app", "github_token") == "v1"